@@ -1,3 +1 @@
-from .config import AppConfig, ToolsConfig, OllamaConfig
-
-
+from .config import AppConfig, ToolsConfig, OllamaConfig, SheetsConfig, RateLimitConfig, LLMLimitsConfig, RetryConfig
@@ -1,40 +1,60 @@
-
 import   logging
 logger = logging.getLogger(__name__)
-from     utils.import_package_modules import import_package_modules
-from     langchain.agents.load_tools  import load_tools
-import   langchain_community.utilities    as lcutils
-import   langchain_community.tools        as lctools  
-import   crewai_tools
-import   tools 
+import   os
 
 class AppConfig:
     version = "0.5.3"
     name= "crewai-sheets-ui"
     template_sheet_url = "https://docs.google.com/spreadsheets/d/1J975Flh82qPjiyUmDE_oKQ2l4iycUq6B3457G5kCD18/copy"
+    cache_dir = os.environ.get("CREWAI_SHEETS_CACHE_DIR",
+                               os.path.join(os.path.expanduser("~"), ".cache", "crewai-sheets-ui"))
+    build_workers = 8                                                   # Agents built concurrently, see --build_workers
     pass
 
+class SheetsConfig:
+    request_timeout = 30                                                # Seconds per worksheet download
+    cache_dir       = os.path.join(AppConfig.cache_dir, "sheets")       # Worksheet CSVs, per sheet ID and tab
+    cache_ttl       = 0                                                 # Seconds a cached worksheet is used without revalidation
+
 class ToolsConfig:
-    # DEFINE MODULES FROM WHICH TO IMPORT TOOLS
-    # [package, "alias",]
-    modules_list        = [(tools, "tools"),]
-    callables_list      = [load_tools,]                                 # Define specific callables to register e.g. in case they are not callable without specific parameters  
-    integration_dict    = {}                                            # Dictionary to which public module members are added   
-    import_package_modules(crewai_tools, modules_list, integration_dict)                  # Add to modules listAdd all tool modules from crewai_tools
-    import_package_modules(lctools,      modules_list, integration_dict, recursive = True) 
-    import_package_modules(lcutils,      modules_list, integration_dict, recursive = True)    # Add to modules list all tool modules from langchain_community.tools 
+    # DEFINE PACKAGES FROM WHICH TO REGISTER TOOLS
+    # [package, "alias", recursive]. Packages are scanned, not imported. A module is only imported
+    # when a tool from the sheet references one of its members.
+    packages_list       = [("tools",                        "tools", False),
+                           ("crewai_tools",                 None,    True),   # All tool modules from crewai_tools
+                           ("langchain_community.tools",    None,    True),   # All tool modules from langchain_community.tools
+                           ("langchain_community.utilities",None,    True),]
+    callables_list      = ["langchain.agents.load_tools.load_tools",]  # Define specific callables to register e.g. in case they are not callable without specific parameters
+    integration_dict    = {}                                            # Extra names for tool Args: name -> object or module path
+    manifest_cache_path = os.path.join(AppConfig.cache_dir, "registry_manifest.json")  # Reused until package versions change
     pass                                                                
 
 class OllamaConfig:
     #patch_stop_words = True
     #patch_num_ctx = True
     stop_words = []     
+    pull_workers = 4                                                    # Missing models pulled concurrently
+    pull_retries = 3                                                    # Attempts per model, a retried pull resumes its layers
+    base_url     = None                                                 # Server of Models rows without a base_url. None: OLLAMA_HOST, else client default
+    docker_base_url = "http://host.docker.internal:11434"              # Used instead when running in a container that can reach the host
+    in_docker    = os.environ.get("CREWAI_SHEETS_IN_DOCKER")            # "true"/"false" skips detection, unset detects once per process
+    warm_up      = False                                                # Load the crew's models into server memory at startup
+    keep_alive   = None                                                 # How long the server keeps a model loaded, e.g. "30m" or -1. None: server default
 
 class HuggingFaceConfig:
     stop_sequences = ['\nObservation'] 
 
+class RateLimitConfig:
+    # Where token buckets live: "memory" (this process), "file" (fcntl locked JSON files),
+    # "sqlite" or "shared_memory". All but "memory" are shared by every process on the host,
+    # so set one when several runs share an API key.
+    backend = os.environ.get("CREWAI_SHEETS_RATE_LIMIT_BACKEND", "memory")
+    path    = os.environ.get("CREWAI_SHEETS_RATE_LIMIT_PATH", os.path.join(AppConfig.cache_dir, "rate_limits"))
+
 class GroqConfig:
     max_tokens = 1000
+    base_url   = os.environ.get("GROQ_API_BASE")                         # e.g. a local fake server. None: api.groq.com
+    token_estimator = os.environ.get("CREWAI_SHEETS_TOKEN_ESTIMATOR", "tiktoken")   # or "approximate": length based
     stop = []
     def get_rate_limit(model_name:str):
         model_rate_dict = {
@@ -48,4 +68,32 @@ class GroqConfig:
             return model_rate_dict[model_name]
         else:
             return 5000
-    
\ No newline at end of file
+    def get_request_limit(model_name:str):
+        """Requests per minute until the response headers report the real limit."""
+        return 30
+    
+class LLMLimitsConfig:
+    # Client side limits of every LLM from get_llm, used when the RPM, TPM or Max concurrent cell of its
+    # Models row is empty: provider -> {'rpm': ..., 'tpm': ..., 'max_concurrent': ...}. None: no limit.
+    # Groq models take RPM and TPM as the start values of their own throttle, see utils/groq.py.
+    defaults        = {
+        'ollama': {'max_concurrent': 4},                                # Requests the server runs in parallel by default
+    }
+    token_estimator = GroqConfig.token_estimator                        # How TPM counts tokens, see utils/token_count.py
+
+    def get_limits(provider, rpm=None, tpm=None, max_concurrent=None):
+        """The limits of a Models row: its cells, with the provider defaults for the empty ones."""
+        defaults = LLMLimitsConfig.defaults.get((provider or '').lower(), {})
+        return (rpm or defaults.get('rpm'), tpm or defaults.get('tpm'),
+                max_concurrent or defaults.get('max_concurrent'))
+
+class RetryConfig:
+    # Retries of LLM calls that failed with 429, 5xx or a dropped connection, see utils/llm_retry.py.
+    max_attempts    = 6                                                 # Per call, the first one included
+    base_delay      = 1.0                                               # Seconds, doubled per retry, full jitter
+    max_delay       = 60.0                                              # Cap of the exponential delay
+    max_retry_after = 300.0                                             # A longer Retry-After gives up instead
+    budget          = 100                                               # Retries per run shared by all LLMs, see --retry_budget
+    decrease_factor = 0.5                                               # Concurrency kept when a provider is saturated
+    decrease_cooldown = 2.0                                             # Seconds before the concurrency is cut again
+    max_concurrency = 16                                                # Ceiling when the Models row has no Max concurrent
@@ -1,6 +1,8 @@
 import logging
 import os
 import sys
+import pickle
+from concurrent.futures import ThreadPoolExecutor
 import signal
 
 from rich.console import Console
@@ -30,112 +32,80 @@ def signal_handler(sig, frame):
 signal.signal(signal.SIGINT, signal_handler)
 signal.signal(signal.SIGTERM, signal_handler)
 ###
-from rich.table import Table
-from textwrap import dedent
-from crewai import Crew, Task, Agent, Process
-
-from utils.agent_crew_llm import get_llm
-from utils.tools_mapping import ToolsMapping
-from utils.cli_parser import get_parser
-from utils.helpers import load_env, is_valid_google_sheets_url, get_sheet_url_from_user
-from utils import Sheets, helpers
-
-import pandas as pd
-import sentry_sdk
-from config.config import AppConfig
-
-
-def create_agents_from_df(row, models_df=None, tools_df=None):
-    def get_agent_tools(tools_string):
-        tool_names = [tool.strip() for tool in tools_string.split(',')]
-        tools_mapping = ToolsMapping(tools_df, models_df)  # Get the ToolsMapping instance
-        tools_dict = tools_mapping.get_tools()  # Get the dictionary of tools from the instance
-        return [tools_dict[tool] for tool in tool_names if tool in tools_dict]
-
-    role = row.get('Agent Role', "Assistant")
-    goal = row.get('Goal', "To assist the human in their tasks")
-    model_name = row.get('Model Name', 'gpt-4-turbo-preview').strip()
-    backstory = row.get('Backstory', "...")
-    temperature = row.get('Temperature', 0.8)
-    max_iter = row.get('Max_iter', 15)
-    verbose = row.get('Verbose', True)
-    memory = row.get('Memory', True)
-    tools_string = row.get('Tools')
-    tools = get_agent_tools(tools_string)
-    allow_delegation = row.get('Allow delegation', False)
+from utils.startup_profiler import profiler
+
+if any(arg.startswith('--profile-startup') for arg in sys.argv[1:]):  # Before the heavy imports, so they are timed
+    profiler.enable()
+
+with profiler.phase("import config.config"):
+    from config.config import AppConfig, OllamaConfig
+
+with profiler.phase("import crewai, utils"):
+    from rich.table import Table
+    from textwrap import dedent
+    from crewai import Crew, Task, Agent, Process
+
+    from utils.agent_crew_llm import get_llm, llm_pool
+    from utils.llm_retry import retry_budget, backoff_stats
+    from utils.llm_limits import limiters
+    from utils.tools_mapping import ToolsMapping
+    from utils.cli_parser import get_parser
+    from utils.helpers import load_env, is_valid_google_sheets_url, is_local_workbook, get_sheet_url_from_user
+    from utils import Sheets, helpers
+    from utils.sheet_cache import SheetCache
+    from utils.crew_spec import CrewSpec
+
+    import sentry_sdk
+
+
+def get_model_llm(model_name, temperature, spec, num_ctx=None):
+    """Creates the LLM of a Models row, or returns None if the model is not in the Models sheet.
+    num_ctx overrides the context size of the row."""
+    model = spec.get_model(model_name)
+    if model is None:
+        return None
+    if num_ctx is None and model.num_ctx is not None:
+        num_ctx = int(model.num_ctx)
+    return get_llm(
+        model_name=model_name.strip(),
+        temperature=temperature,
+        num_ctx=num_ctx,
+        provider=model.provider,
+        base_url=model.base_url,
+        deployment=model.deployment,
+        rpm=model.rpm,
+        tpm=model.tpm,
+        max_concurrent=model.max_concurrent,
+    )
 
-    # Retrieve Agent model details
-    model_details = models_df[
-        models_df['Model'].str.strip() == model_name]  # Filter the models dataframe for the specific model
 
-    if model_details.empty:
-        llm = None
-        raise ValueError(f"Failed to retrieve or initialize the language model for {model_name}")
-    else:
-        # Retrieve each attribute, ensuring it exists and is not NaN; otherwise, default to None
-        num_ctx = int(model_details['Context size (local only)'].iloc[
-                          0]) if 'Context size (local only)' in model_details.columns and not pd.isna(
-            model_details['Context size (local only)'].iloc[0]) else None
-        provider = str(model_details['Provider'].iloc[0]) if 'Provider' in model_details.columns and not pd.isna(
-            model_details['Provider'].iloc[0]) else None
-        base_url = str(model_details['base_url'].iloc[0]) if 'base_url' in model_details.columns and not pd.isna(
-            model_details['base_url'].iloc[0]) else None
-        deployment = str(model_details['Deployment'].iloc[0]) if 'Deployment' in model_details.columns and not pd.isna(
-            model_details['Deployment'].iloc[0]) else None
-
-        llm = get_llm(
-            model_name=model_name,
-            temperature=temperature,
-            num_ctx=num_ctx,
-            provider=provider,
-            base_url=base_url,
-            deployment=deployment,
-        )
+def create_agent_from_record(agent, spec, builder):
+    role = agent.role or "Assistant"
+    model_name = (agent.model_name or 'gpt-4-turbo-preview').strip()
+    tools = builder.get_tools(agent.tools, spec)
 
-        # Retrieve function calling model details
-    function_calling_model_name = row.get('Function Calling Model', model_name)
-    if isinstance(function_calling_model_name, str):
-        # print(function_calling_model_name)
-        function_calling_model_name = function_calling_model_name.strip()
-        function_calling_model_details = models_df[models_df['Model'].str.strip() == function_calling_model_name]
-    else:
-        function_calling_model_details = None
+    # Retrieve Agent model details
+    if spec.get_model(model_name) is None:
+        raise ValueError(f"Failed to retrieve or initialize the language model for {model_name}")
+    llm = builder.get_llm(model_name, agent.temperature, spec)
 
-    if function_calling_model_details is None or function_calling_model_details.empty:
+    # Retrieve function calling model details
+    function_calling_model_name = agent.function_calling_model
+    if spec.get_model(function_calling_model_name) is None:
         function_calling_llm = llm
     else:
-        num_ctx = int(function_calling_model_details['Context size (local only)'].iloc[
-                          0]) if 'Context size (local only)' in function_calling_model_details.columns and not pd.isna(
-            function_calling_model_details['Context size (local only)'].iloc[0]) else None
-        provider = function_calling_model_details['Provider'].iloc[
-            0] if 'Provider' in function_calling_model_details.columns and not pd.isna(
-            function_calling_model_details['Provider'].iloc[0]) else None
-        base_url = function_calling_model_details['base_url'].iloc[
-            0] if 'base_url' in function_calling_model_details.columns and not pd.isna(
-            function_calling_model_details['base_url'].iloc[0]) else None
-        deployment = function_calling_model_details['Deployment'].iloc[
-            0] if 'Deployment' in function_calling_model_details.columns and not pd.isna(
-            function_calling_model_details['Deployment'].iloc[0]) else None
-
-        function_calling_llm = get_llm(
-            model_name=function_calling_model_name,
-            temperature=temperature,
-            num_ctx=num_ctx,
-            provider=provider,
-            base_url=base_url,
-            deployment=deployment,
-        )
+        function_calling_llm = builder.get_llm(function_calling_model_name, agent.temperature, spec)
 
     agent_config = {
             # agent_executor:                                            #An instance of the CrewAgentExecutor class.
             'role':                 role,
-            'goal':                 goal,
-            'backstory':            backstory,
-            'allow_delegation':     allow_delegation,  # Whether the agent is allowed to delegate tasks to other agents.
-            'verbose':              verbose,  # Whether the agent execution should be in verbose mode.
+            'goal':                 agent.goal or "To assist the human in their tasks",
+            'backstory':            agent.backstory or "...",
+            'allow_delegation':     agent.allow_delegation,  # Whether the agent is allowed to delegate tasks to other agents.
+            'verbose':              agent.verbose,  # Whether the agent execution should be in verbose mode.
             'tools':                tools,  # Tools at agents disposal
-            'memory':               memory,  # Whether the agent should have memory or not.
-            'max_iter':             max_iter,
+            'memory':               agent.memory,  # Whether the agent should have memory or not.
+            'max_iter':             agent.max_iter,
             # TODO: Remove hardcoding #Maximum number of iterations for an agent to execute a task.
             'llm':                  llm,  # The language model that will run the agent.
             'function_calling_llm': function_calling_llm
@@ -144,35 +114,30 @@ def create_agents_from_df(row, models_df=None, tools_df=None):
             # callbacks:                                                 #A list of callback functions from the langchain library that are triggered during the agent's execution process
     }
     if llm is None:
-        print(f"I couldn't manage to create an llm model for the agent. {role}. The model was supposed to be {model_name}.")
-        print(f"Please check the api keys and model name and the configuration in the sheet. Exiting...")
-        sys.exit(0)
-    else:
-        return Agent(config=agent_config)
+        raise ValueError(f"I couldn't manage to create an llm model for the agent. The model was supposed to be "
+                         f"{model_name}. Please check the api keys and model name and the configuration in the sheet.")
+    return Agent(config=agent_config)
     
 
 
-def get_agent_by_role(agents, desired_role):
-    return next((agent for agent in agents if agent.role == desired_role), None)
-
-
-def create_tasks_from_df(row, assignment, created_agents, **kwargs):
-    description = row['Instructions'].replace('{assignment}', assignment)
-    desired_role = row['Agent']
+def create_task_from_record(task, assignment, agents_by_role):
+    description = (task.instructions or '').replace('{assignment}', assignment or '')
 
     return Task(
         description=dedent(description),
-        expected_output=row['Expected Output'],
-        agent=get_agent_by_role(created_agents, desired_role)
+        expected_output=task.expected_output,
+        agent=agents_by_role.get(task.agent)
     )
 
 
-def create_crew(created_agents, created_tasks, crew_df):
+def create_crew(created_agents, created_tasks, spec, builder):
+    crew = spec.crew[0]
     # Embedding model (Memory)
-    memory = crew_df['Memory'][0]
-    embedding_model = crew_df['Embedding model'].get(0)
+    memory = crew.memory
+    embedding_model = crew.embedding_model
+    embedding_details = spec.get_model(embedding_model)
     
-    if embedding_model is None or pd.isna(embedding_model):
+    if embedding_details is None:
         logger.info("No embedding model for crew specified in the sheet. Turning off memory.")
         deployment_name = None
         provider = None
@@ -180,9 +145,9 @@ def create_crew(created_agents, created_tasks, crew_df):
         memory = False
         embedder_config = None
     else:
-        deployment_name = models_df.loc[models_df['Model'] == embedding_model, 'Deployment'].values[0]
-        provider = models_df.loc[models_df['Model'] == embedding_model, 'Provider'].values[0]
-        base_url = models_df.loc[models_df['Model'] == embedding_model, 'base_url'].values[0]
+        deployment_name = embedding_details.deployment
+        provider = embedding_details.provider
+        base_url = embedding_details.base_url
 
         # Create provider specific congig and load proveder specific ENV variables if it can't be avoided
         embedder_config = {
@@ -211,30 +176,19 @@ def create_crew(created_agents, created_tasks, crew_df):
     # Groq doesn't have an embedder
 
     # Manager LLM
-    manager_model = crew_df['Manager LLM'][0]
-    manager_provider = models_df.loc[models_df['Model'] == manager_model, 'Provider'].values[0]
-    manager_temperature = crew_df['t'][0]
-    manager_num_ctx = crew_df['num_ctx'][0]
-    manager_base_url = models_df.loc[models_df['Model'] == manager_model, 'base_url'].values[0]
-    manager_deployment = models_df.loc[models_df['Model'] == manager_model, 'Deployment'].values[0]
-
-    if manager_model and manager_provider is not None:
-        manager_llm = get_llm(
-            model_name=manager_model,
-            temperature=manager_temperature,
-            num_ctx=manager_num_ctx,
-            provider=manager_provider,
-            base_url=manager_base_url,
-            deployment=manager_deployment
-        )
+    manager_model = crew.manager_llm
+    manager_details = spec.get_model(manager_model)
+    manager_llm = None
+
+    if manager_details is not None and manager_details.provider is not None:
+        manager_llm = builder.get_llm(manager_model, crew.temperature, spec, num_ctx=crew.num_ctx)
 
-    verbose = crew_df['Verbose'][0]
-    process = Process.hierarchical if crew_df['Process'][0] == 'hierarchical' else Process.sequential
+    process = Process.hierarchical if crew.process == 'hierarchical' else Process.sequential
 
     return Crew(
         agents=created_agents,
         tasks=created_tasks,
-        verbose=verbose,
+        verbose=crew.verbose,
         process=process,
         memory=memory,
         manager_llm=manager_llm,
@@ -245,6 +199,188 @@ def create_crew(created_agents, created_tasks, crew_df):
     )
 
 
+def ollama_preflight(spec, warm_up=False, keep_alive=None):
+    """
+    Lists each Ollama server once and pulls all missing Ollama models of the spec concurrently.
+    With warm_up, also starts loading the models into server memory and returns the futures of the warm-ups.
+    """
+    if not any((model.provider or '').lower() == 'ollama' for model in spec.models):
+        return []
+    from utils.ollama_loader import OllamaLoader                        # Only crews with local models need ollama
+    with profiler.phase("Ollama preflight"):
+        try:
+            errors = OllamaLoader.preflight(spec)
+        except Exception as e:
+            errors = {"Ollama": e}
+    for model_name, error in errors.items():
+        console.print(f"[yellow]I couldn't make the Ollama model '{model_name}' available: {error}")
+    return OllamaLoader.warm_up(spec, keep_alive=keep_alive) if warm_up else []
+
+
+def warm_up_report(futures):
+    """Waits for the model warm-ups and prints how long each model took to load."""
+    if not futures:
+        return
+    with profiler.phase("Ollama warm-up wait"):
+        results = [future.result() for future in futures]
+    warm_up_table = Table(title="Model warm-up", show_header=True, header_style="bold magenta")
+    for column in ("Model", "Server", "Load (s)", "Request (s)", "Status"):
+        warm_up_table.add_column(column, justify="right" if "(s)" in column else "left")
+    for result in results:
+        load_seconds = result['load_seconds']
+        warm_up_table.add_row(result['model'], result['base_url'] or "default",
+                              f"{load_seconds:.2f}" if load_seconds is not None else "-", f"{result['wall_seconds']:.2f}",
+                              "[green]hot" if result['error'] is None else f"[red]{result['error']}")
+    console.print(warm_up_table)
+
+
+def backoff_report():
+    """Prints how often each model was retried and how long the crew spent backing off, if it had to."""
+    if not backoff_stats.models:
+        return
+    backoff_table = Table(title="LLM retries", show_header=True, header_style="bold magenta")
+    for column in ("Model", "Retries", "Backoff (s)", "Saturated", "Gave up", "Concurrency"):
+        backoff_table.add_column(column, justify="left" if column == "Model" else "right")
+    for key, stats in backoff_stats.models.items():
+        limiter = limiters.get(key)
+        concurrency = limiter.concurrency.limit if limiter is not None and limiter.concurrency else None
+        backoff_table.add_row(key, str(stats['retries']), f"{stats['seconds']:.1f}", str(stats['saturated']),
+                              str(stats['gave_up']), str(concurrency) if concurrency is not None else "-")
+    console.print(backoff_table)
+    console.print(f"Backed off for {backoff_stats.total('seconds'):.1f}s in total, "
+                  f"{retry_budget.used} of {retry_budget.retries} retries of the budget used.")
+
+
+class CrewBuildError(ValueError):
+    """Raised with every agent that could not be built, so they can be fixed in one go."""
+
+    def __init__(self, errors):
+        self.errors = errors                                            # (role, exception) tuples
+        super().__init__("\n".join(f"- Agent '{role}': {error}" for role, error in errors))
+
+
+class CrewBuilder:
+    """
+    Builds the crew of a CrewSpec. Agents and tools whose rows did not change since the previous build
+    are reused, so running an edited sheet again only rebuilds the changed rows. LLMs come from llm_pool.
+    Reused agents are shared with the previous Crew, so only one Crew built by a CrewBuilder may run at a time.
+    """
+
+    def __init__(self, workers=AppConfig.build_workers):
+        self.workers = workers                                          # Agents built concurrently
+        self.tools = {}                                                 # ToolsMapping.tool_fingerprint -> tool
+        self.tools_mapping = None                                       # Of the spec being built
+        self.agents = {}                                                # agent_key -> Agent
+        self.built = self.reused = 0
+
+    def get_llm(self, model_name, temperature, spec, num_ctx=None):
+        """
+        LLM of a Models row. It is a shallow copy of the pooled instance: the client and its HTTP pool are
+        shared with every other user of the same model, the callbacks are not. crewai only attaches an agent's
+        TokenCalcHandler when the LLM has none, so a shared callbacks list would count every agent's usage
+        for the first agent.
+        """
+        llm = get_model_llm(model_name, temperature, spec, num_ctx=num_ctx)
+        if llm is None or not hasattr(llm, 'copy'):
+            return llm
+        return llm.copy(update={'callbacks': list(llm.callbacks) if isinstance(llm.callbacks, list) else llm.callbacks})
+
+    def get_tools(self, tools_string, spec):
+        """Instances of the tools an agent references. Each tool is created once per run and shared by its agents."""
+        tools = []
+        for tool_name in filter(None, (tool.strip() for tool in (tools_string or '').split(','))):
+            with profiler.phase(f"ToolsMapping {tool_name}"):
+                tool = self.tools_mapping.get_tool(tool_name)
+            if tool is not None:
+                tools.append(tool)
+        return tools
+
+    @staticmethod
+    def reset_agent(agent):
+        """
+        Zeroes the token usage of an Agent reused from the previous build, in place: the TokenCalcHandler on the
+        agent's LLM keeps counting into the same TokenProcess. The new Crew gives the agent a fresh tools cache
+        and executor itself. Reused agents are mutated, so an agent belongs to one live Crew at a time: the
+        previous crew must have finished before the next build.
+        """
+        token_process = getattr(agent, '_token_process', None)
+        for name, value in list(vars(token_process).items()) if token_process is not None else ():
+            if isinstance(value, (int, float)):
+                setattr(token_process, name, 0)
+
+    @staticmethod
+    def agent_key(agent, spec):
+        """Fingerprints of everything an Agent is built from: its row, its models and its tools."""
+        tool_records = [spec.tools_by_name.get(tool.strip()) for tool in (agent.tools or '').split(',')]
+        return (agent.fingerprint(), spec.model_fingerprint(agent.model_name),
+                spec.model_fingerprint(agent.function_calling_model),
+                tuple(ToolsMapping.tool_fingerprint(tool, spec) for tool in tool_records if tool is not None))
+
+    def _create_agent(self, agent, spec):
+        with profiler.phase(f"create_agent {agent.role}"):
+            return create_agent_from_record(agent, spec, self)
+
+    def build_agents(self, spec):
+        """
+        Builds the agents of a spec in a thread pool, so agents waiting on the network (model checks, pulls,
+        SDK clients, tools) don't wait for each other. Raises CrewBuildError listing every agent that failed.
+        """
+        keys, current, seen = [], {}, {}
+        for agent in spec.agents:
+            key = self.agent_key(agent, spec)
+            seen[key] = seen.get(key, 0) + 1
+            keys.append((key, seen[key]))                               # Identical rows still get their own Agent
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="build") as executor:
+            manager, manager_future = spec.crew[0].manager_llm if spec.crew else None, None
+            if spec.get_model(manager) is not None:                     # Pooled by the time create_crew asks for it
+                manager_future = executor.submit(self.get_llm, manager, spec.crew[0].temperature, spec,
+                                                 num_ctx=spec.crew[0].num_ctx)
+            futures = {key: executor.submit(self._create_agent, agent, spec)
+                       for agent, key in zip(spec.agents, keys) if key not in self.agents}
+
+        if manager_future is not None and manager_future.exception() is not None:
+            logger.warning(f"Failed to prepare the manager LLM '{manager}', create_crew tries again: "
+                           f"{manager_future.exception()}")
+        errors = []
+        for agent, key in zip(spec.agents, keys):
+            if key in futures:
+                try:
+                    current[key] = futures[key].result()
+                    self.built += 1
+                except Exception as e:
+                    logger.debug(f"Failed to build agent '{agent.role}'", exc_info=True)
+                    errors.append((agent.role, e))
+            else:
+                current[key] = self.agents[key]
+                self.reset_agent(current[key])
+                self.reused += 1
+        if errors:
+            raise CrewBuildError(errors)
+
+        self.agents = current                                           # Forget agents of changed or removed rows
+        current_tools = {ToolsMapping.tool_fingerprint(tool, spec) for tool in spec.tools_by_name.values()}
+        for key in [key for key in self.tools if key not in current_tools]:
+            del self.tools[key]                                         # In place, the ToolsMapping shares the dict
+        return [current[key] for key in keys]
+
+    def build(self, spec):
+        self.built = self.reused = 0
+        self.tools_mapping = ToolsMapping(spec, cache=self.tools)
+        created_agents = self.build_agents(spec)
+        agents_by_role = {}
+        for created_agent in created_agents:
+            agents_by_role.setdefault(created_agent.role, created_agent)
+
+        # Create Tasks
+        assignment = spec.crew[0].assignment
+        created_tasks = [create_task_from_record(task, assignment, agents_by_role) for task in spec.tasks]
+
+        # Creating crew
+        with profiler.phase("create_crew"):
+            return create_crew(created_agents, created_tasks, spec, self)
+
+
 if __name__ == "__main__":
     release = f"{AppConfig.name}@{AppConfig.version}"
     if os.environ.get("CREWAI_SHEETS_SENRY") != "False":
@@ -261,43 +397,93 @@ if __name__ == "__main__":
 
     load_env(args.env_path, ["OPENAI_API_KEY", ])
 
-    if hasattr(args, "sheet_url") and args.sheet_url and is_valid_google_sheets_url(args.sheet_url):
-        sheet_url = args.sheet_url
-    else:
-        sheet_url = get_sheet_url_from_user()
-
     # Define a function to handle termination signals
     terminal_width = console.width
     terminal_width = max(terminal_width, 120)
 
     # Enter main process
-    agents_df, tasks_df, crew_df, models_df, tools_df = Sheets.parse_table(sheet_url)
-    helpers.after_read_sheet_print(agents_df, tasks_df)  # Print overview of agents and tasks
-
-    # Create Agents
-    agents_df['crewAIAgent'] = agents_df.apply(
-        lambda row: create_agents_from_df(row, models_df=models_df, tools_df=tools_df), axis=1)
-    created_agents = agents_df['crewAIAgent'].tolist()
-
-    # Create Tasks
-    assignment = crew_df['Assignment'][0]
-    tasks_df['crewAITask'] = tasks_df.apply(lambda row: create_tasks_from_df(row, assignment, created_agents), axis=1)
-    created_tasks = tasks_df['crewAITask'].tolist()
-
-    # Creating crew
-    crew = create_crew(created_agents, created_tasks, crew_df)
-    console.print("[green]I've created the crew for you. Let's start working on these tasks! :rocket: [/green]")
-
-    try:
-        results = crew.kickoff()
-    except Exception as e:
-        console.print(f"[red]I'm sorry, I couldn't complete the tasks :( Here's the error I encountered: {e}")
+    def load_spec():
+        if args.spec:
+            with profiler.phase("CrewSpec.load"):
+                try:
+                    return CrewSpec.load(args.spec)
+                except (OSError, ValueError, pickle.UnpicklingError) as e:
+                    console.print(f"[red]I couldn't load the compiled crew spec '{args.spec}': {e}")
+                    sys.exit(0)
+        with profiler.phase("Sheets.parse_table"):
+            return CrewSpec.from_frames(*Sheets.parse_table(sheet_url, cache=sheet_cache), source=sheet_url)
+
+    if not args.spec:
+        if hasattr(args, "sheet_url") and args.sheet_url and (is_local_workbook(args.sheet_url) or
+                                                              is_valid_google_sheets_url(args.sheet_url)):
+            sheet_url = args.sheet_url
+        else:
+            sheet_url = get_sheet_url_from_user()
+        sheet_cache = None if args.no_sheet_cache else SheetCache(ttl=args.sheet_cache_ttl, offline=args.offline)
+    spec = load_spec()
+
+    if args.compile_spec and not args.spec:
+        try:
+            spec.save(args.compile_spec)
+        except (OSError, ValueError) as e:
+            console.print(f"[red]I couldn't compile the sheet to '{args.compile_spec}': {e}")
+            sys.exit(0)
+        console.print(f"[green]I've compiled the sheet to '{args.compile_spec}'. Start from it with --spec {args.compile_spec}")
         sys.exit(0)
 
-    # Create a table for results
-    result_table = Table(show_header=True, header_style="bold magenta")
-    result_table.add_column("Here are the results, see you soon =) ", style="green", width=terminal_width)
-
-    result_table.add_row(str(results))
-    console.print(result_table)
-    console.print("[bold green]\n\n")
+    OllamaConfig.keep_alive = args.keep_alive                           # Used by every Ollama LLM of the crew
+    builder = CrewBuilder(workers=args.build_workers)
+    while True:
+        warm_ups = ollama_preflight(spec, warm_up=args.warm_up, keep_alive=args.keep_alive)
+        helpers.after_read_sheet_print(spec.agents, spec.tasks)  # Print overview of agents and tasks, models warm up meanwhile
+
+        # Create Agents, Tasks and the Crew, reusing whatever did not change since the previous run
+        try:
+            crew = builder.build(spec)
+        except CrewBuildError as e:
+            console.print(f"[red]I couldn't build {len(e.errors)} of the agents. Please check the api keys, model names "
+                          f"and the configuration in the sheet:\n{e}")
+            profiler.finish(args.profile_startup, console)
+            if not args.watch:
+                sys.exit(0)
+            crew = None
+
+        warm_up_report(warm_ups)
+
+        if crew is not None:
+            if builder.reused:
+                console.print(f"[green]I've rebuilt {builder.built} agent(s) and reused {builder.reused} unchanged one(s).")
+            for line in llm_pool.summary():
+                logger.info(f"LLM pool: {line}")
+            console.print("[green]I've created the crew for you. Let's start working on these tasks! :rocket: [/green]")
+
+            retry_budget.reset(args.retry_budget)                       # Every run gets the whole budget
+            backoff_stats.reset()
+            try:
+                with profiler.phase("crew.kickoff"):
+                    results = crew.kickoff()
+            except Exception as e:
+                backoff_report()
+                console.print(f"[red]I'm sorry, I couldn't complete the tasks :( Here's the error I encountered: {e}")
+                profiler.finish(args.profile_startup, console)
+                if not args.watch:
+                    sys.exit(0)
+            else:
+                # Create a table for results
+                result_table = Table(show_header=True, header_style="bold magenta")
+                result_table.add_column("Here are the results, see you soon =) ", style="green", width=terminal_width)
+
+                result_table.add_row(str(results))
+                console.print(result_table)
+                backoff_report()
+                for limiter in limiters.values():
+                    logger.info(f"LLM limits: {limiter.summary()}")
+                profiler.finish(args.profile_startup, console)
+                console.print("[bold green]\n\n")
+
+        if not args.watch:
+            break
+        answer = console.input("[bold]Edit the sheet and press Enter to run the changed crew again, or 'q' to quit: ")
+        if answer.strip().lower() in ('q', 'quit', 'exit'):
+            break
+        spec = load_spec()
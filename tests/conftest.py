@@ -0,0 +1,34 @@
+import threading
+
+import pytest
+
+from fake_groq_server import FakeGroqServer
+from fake_sheet_server import FakeSheetServer
+
+
+def _serve(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def _stop(server):
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def fake_groq(request):
+    """A FakeGroqServer on a free port. Parametrize indirectly with a dict of its arguments to change the limits."""
+    options = {'rpm': 10, 'tpm': 10000, 'period': 2.0, 'completion_tokens': 5, **getattr(request, 'param', {})}
+    server = _serve(FakeGroqServer(('127.0.0.1', 0), **options))
+    yield server
+    _stop(server)
+
+
+@pytest.fixture
+def fake_sheet(request):
+    """A FakeSheetServer on a free port, serving a small valid sheet. Parametrize indirectly to set its latency."""
+    server = _serve(FakeSheetServer(('127.0.0.1', 0), **getattr(request, 'param', {})))
+    yield server
+    _stop(server)
@@ -0,0 +1,130 @@
+import   logging
+logger = logging.getLogger(__name__)
+from     http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import   json
+import   threading
+import   time
+
+# Stdlib only. A stand-in for the Groq chat completions API that enforces requests and tokens per period
+# like the real one and reports them in x-ratelimit-* headers. Served by the fake_groq fixture of conftest.py.
+
+
+class _Window:
+    """Linear refill bucket, the way the server side limits are modelled."""
+
+    def __init__(self, limit, period):
+        self.limit, self.rate = float(limit), float(limit) / period
+        self.available, self.updated_at = float(limit), time.time()
+
+    def refill(self, now):
+        self.available = min(self.limit, self.available + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reset_seconds(self):
+        return (self.limit - self.available) / self.rate
+
+
+class FakeGroqServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, rpm=30, tpm=6000, period=60.0, completion_tokens=50, latency=0.0):
+        super().__init__(address, _Handler)
+        self.requests_window, self.tokens_window = _Window(rpm, period), _Window(tpm, period)
+        self.completion_tokens, self.latency = completion_tokens, latency
+        self.lock = threading.Lock()
+        self.stats = {'ok': 0, 'rate_limited': 0, 'tokens': 0}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def admit(self, tokens):
+        """Takes a request and its tokens. Returns (ok, headers)."""
+        with self.lock:
+            now = time.time()
+            requests, tokens_window = self.requests_window, self.tokens_window
+            requests.refill(now)
+            tokens_window.refill(now)
+            ok = requests.available >= 1 and tokens_window.available >= tokens
+            if ok:
+                requests.available -= 1
+                tokens_window.available -= tokens
+                self.stats['ok'] += 1
+                self.stats['tokens'] += tokens
+            else:
+                self.stats['rate_limited'] += 1
+            headers = {
+                'x-ratelimit-limit-requests':     f"{requests.limit:.0f}",
+                'x-ratelimit-remaining-requests': f"{max(0, int(requests.available))}",     # Whole ones, never rounded up
+                'x-ratelimit-reset-requests':     f"{requests.reset_seconds():.2f}s",
+                'x-ratelimit-limit-tokens':       f"{tokens_window.limit:.0f}",
+                'x-ratelimit-remaining-tokens':   f"{max(0, int(tokens_window.available))}",
+                'x-ratelimit-reset-tokens':       f"{tokens_window.reset_seconds():.2f}s",
+            }
+            if not ok:
+                missing = max((1 - requests.available) / requests.rate, (tokens - tokens_window.available) / tokens_window.rate)
+                headers['retry-after'] = f"{max(missing, 0.0):.2f}"
+            return ok, headers
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            return self._send(404, {'error': {'message': 'not found'}})
+        prompt_tokens = sum(len(str(message.get('content', ''))) for message in body.get('messages', [])) // 4 + 1
+        completion_tokens = min(self.server.completion_tokens, body.get('max_tokens') or self.server.completion_tokens)
+        ok, headers = self.server.admit(prompt_tokens + completion_tokens)
+        if not ok:
+            return self._send(429, {'error': {'message': 'Rate limit reached', 'type': 'tokens',
+                                              'code': 'rate_limit_exceeded'}}, headers)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                 'total_tokens': prompt_tokens + completion_tokens}
+        if body.get('stream'):
+            return self._send_stream(body.get('model'), completion_tokens, usage, headers)
+        self._send(200, {
+            'id': 'chatcmpl-fake', 'object': 'chat.completion', 'created': int(time.time()),
+            'model': body.get('model'), 'system_fingerprint': 'fake',
+            'choices': [{'index': 0, 'finish_reason': 'stop', 'logprobs': None,
+                         'message': {'role': 'assistant', 'content': 'ok ' * completion_tokens}}],
+            'usage': usage,
+        }, headers)
+
+    def _send_stream(self, model, completion_tokens, usage, headers):
+        """Server-sent events with one chunk per token. The last chunk reports the usage in x_groq, like Groq."""
+        def event(delta, finish_reason=None, x_groq=None):
+            chunk = {'id': 'chatcmpl-fake', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                     'model': model, 'system_fingerprint': 'fake',
+                     'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason, 'logprobs': None}]}
+            if x_groq:
+                chunk['x_groq'] = x_groq
+            return f"data: {json.dumps(chunk)}\n\n"
+        events = [event({'role': 'assistant', 'content': ''})]
+        events += [event({'content': 'ok '}) for _ in range(completion_tokens)]
+        events += [event({}, 'stop', {'id': 'req-fake', 'usage': usage}), "data: [DONE]\n\n"]
+        data = "".join(events).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
@@ -0,0 +1,77 @@
+import   logging
+logger = logging.getLogger(__name__)
+from     http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from     urllib.parse import urlsplit, parse_qs
+import   threading
+import   time
+
+# Stdlib only. A stand-in for the CSV export of a Google sheet (/spreadsheets/d/<id>/gviz/tq?tqx=out:csv&sheet=<tab>)
+# that answers conditional requests with 304. Served by the fake_sheet fixture of conftest.py.
+
+worksheets = {
+    'Agents': "Agent Role,Goal,Backstory,Tools,Allow delegation,Verbose,Memory,Max_iter,Model Name,Temperature,Function Calling Model\n"
+              "Writer,Write well,Seasoned,Folder,FALSE,TRUE,TRUE,5,gpt-4,0.2,\n",
+    'Tasks':  "Task Name,Agent,Instructions,Expected Output\n"
+              "Draft,Writer,Write about {assignment},A draft\n",
+    'Crew':   "Team Name,Assignment,Verbose,Process,Memory,Embedding model,Manager LLM,t,num_ctx\n"
+              "Team,Bees,TRUE,sequential,FALSE,,gpt-4,0.1,0\n",
+    'Models': "Model,Context size (local only),Provider,base_url,Deployment\n"
+              "gpt-4,0,openai,None,None\n",
+    'Tools':  "Tool,On,Class,Args,Model,Embedding Model\n"
+              "Folder,TRUE,FolderTool(),,,\n",
+}
+
+
+class FakeSheetServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0):
+        super().__init__(address, _Handler)
+        self.worksheets = dict(worksheets)                              # Tab -> CSV, change it to edit the sheet
+        self.version = 1                                                # Bump it with a change, the ETag follows
+        self.latency = latency
+        self.requests = []                                              # (tab, If-None-Match) per request
+        self.in_flight = self.peak_in_flight = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/spreadsheets/d/fake-sheet-id/edit#gid=0"
+
+    def requested(self, tab):
+        return [etag for name, etag in self.requests if name == tab]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send(self, status, data=b'', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        server = self.server
+        tab = parse_qs(urlsplit(self.path).query).get('sheet', [None])[0]
+        with server.lock:
+            server.requests.append((tab, self.headers.get('If-None-Match')))
+            server.in_flight += 1
+            server.peak_in_flight = max(server.peak_in_flight, server.in_flight)
+        try:
+            time.sleep(server.latency)
+            if tab not in server.worksheets:
+                return self._send(404)
+            etag = f'"v{server.version}"'
+            if self.headers.get('If-None-Match') == etag:
+                return self._send(304, headers={'ETag': etag})
+            self._send(200, server.worksheets[tab].encode(), {'Content-Type': 'text/csv', 'ETag': etag})
+        finally:
+            with server.lock:
+                server.in_flight -= 1
@@ -0,0 +1,70 @@
+import pickle
+
+import pytest
+
+from utils.crew_spec import (AgentRecord, CrewRecord, CrewSpec, ModelRecord, TaskRecord, ToolRecord, spec_format_version,
+                             spec_magic)
+
+
+def _spec(**changes):
+    records = {
+        'agents': [AgentRecord(role='Writer', tools='Folder', model_name='gpt-4 ')],
+        'tasks':  [TaskRecord(name='Draft', agent='Writer', instructions='Write', expected_output='A draft')],
+        'crew':   [CrewRecord(team_name='Team', assignment='Bees', process='sequential', manager_llm='gpt-4')],
+        'models': [ModelRecord(model='gpt-4', provider='openai', rpm=60.0)],
+        'tools':  [ToolRecord(tool='Folder', on=True, class_spec='FolderTool()')],
+    }
+    return CrewSpec(**{**records, **changes}, source='test', created=0.0)
+
+
+def test_round_trips_through_save_and_load(tmp_path):
+    path = tmp_path / 'crew.spec'
+    spec = _spec()
+    spec.save(path)
+    loaded = CrewSpec.load(path)
+
+    assert loaded == spec
+    assert loaded.get_model(' gpt-4').rpm == 60.0                       # Indexes survive the round trip
+    assert loaded.agents_by_role['Writer'] is loaded.agents[0]
+    assert loaded.model_fingerprint('gpt-4') == spec.model_fingerprint('gpt-4')
+
+
+def test_save_refuses_references_that_do_not_resolve(tmp_path):
+    spec = _spec(tasks=[TaskRecord(name='Draft', agent='Editor')])
+    with pytest.raises(ValueError, match="assigned to 'Editor'"):
+        spec.save(tmp_path / 'crew.spec')
+    assert not (tmp_path / 'crew.spec').exists()
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / 'crew.spec'
+    with open(path, 'wb') as spec_file:
+        pickle.dump({'magic': 'something else'}, spec_file)
+    with pytest.raises(ValueError, match="not a compiled crew spec"):
+        CrewSpec.load(path)
+
+
+def test_load_rejects_other_format_versions(tmp_path):
+    path = tmp_path / 'crew.spec'
+    with open(path, 'wb') as spec_file:
+        pickle.dump({'magic': spec_magic, 'format': spec_format_version - 1}, spec_file)
+        pickle.dump(_spec(), spec_file)
+    with pytest.raises(ValueError, match="incompatible format"):
+        CrewSpec.load(path)
+
+
+class _Payload:
+    """Runs code when it's unpickled."""
+    def __reduce__(self):
+        return (exec, ("import builtins; builtins.spec_payload_ran = True",))
+
+
+def test_load_refuses_to_unpickle_anything_but_records(tmp_path):
+    import builtins
+    path = tmp_path / 'crew.spec'
+    with open(path, 'wb') as spec_file:
+        pickle.dump({'magic': spec_magic, 'format': spec_format_version}, spec_file)
+        pickle.dump(_Payload(), spec_file)
+    with pytest.raises(pickle.UnpicklingError, match="builtins.exec"):
+        CrewSpec.load(path)
+    assert not hasattr(builtins, 'spec_payload_ran')
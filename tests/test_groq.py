@@ -0,0 +1,77 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+
+from utils.groq import TokenThrottledChatGroq
+
+prompt = "Summarise the plan for the next sprint. " * 10                   # About 100 tokens for the server
+limits = [
+    pytest.param({'rpm': 10, 'tpm': 100000}, id='requests'),
+    pytest.param({'rpm': 1000, 'tpm': 1100}, id='tokens'),             # About ten requests
+]
+
+
+def _llm(server, **kwargs):
+    """A throttled client with the server's limits and its own buckets."""
+    return TokenThrottledChatGroq(rate_limit=server.tokens_window.limit, request_limit=server.requests_window.limit,
+                                  model='llama3-8b-8192', max_tokens=server.completion_tokens, base_url=server.url,
+                                  groq_api_key=f"fake-{uuid.uuid4()}", max_retries=0, **kwargs)
+
+
+def _min_seconds(server, calls):
+    """How long the server needs to admit calls requests: the first burst is free, the rest refill."""
+    windows = [(server.requests_window, 1)]
+    if server.tokens_window.limit < 100000:
+        windows.append((server.tokens_window, server.stats['tokens'] / max(1, server.stats['ok'])))
+    return max((calls * amount - window.limit) / window.rate for window, amount in windows)
+
+
+@pytest.mark.parametrize('fake_groq', limits, indirect=True)
+def test_sync_calls_are_never_rate_limited(fake_groq):
+    llm = _llm(fake_groq)
+    start = time.time()
+    for _ in range(15):
+        assert llm.invoke(prompt).content.strip() == "ok ok ok ok ok"
+    assert fake_groq.stats['rate_limited'] == 0
+    assert time.time() - start >= _min_seconds(fake_groq, 15) * 0.9
+
+
+@pytest.mark.parametrize('fake_groq', limits, indirect=True)
+def test_concurrent_async_calls_are_never_rate_limited(fake_groq):
+    llm = _llm(fake_groq)
+
+    async def run():
+        return await asyncio.gather(*[llm.ainvoke(prompt) for _ in range(20)])
+
+    start = time.time()
+    results = asyncio.run(run())
+    assert len(results) == 20
+    assert fake_groq.stats == {**fake_groq.stats, 'ok': 20, 'rate_limited': 0}
+    assert time.time() - start >= _min_seconds(fake_groq, 20) * 0.9
+
+
+@pytest.mark.parametrize('fake_groq', limits, indirect=True)
+def test_streams_are_never_rate_limited(fake_groq):
+    llm = _llm(fake_groq)
+
+    async def astreams():
+        return [await astream() for _ in range(8)]
+
+    async def astream():
+        return "".join([chunk.content async for chunk in llm.astream(prompt)])
+
+    for _ in range(8):
+        assert "".join(chunk.content for chunk in llm.stream(prompt)).strip() == "ok ok ok ok ok"
+    assert [text.strip() for text in asyncio.run(astreams())] == ["ok ok ok ok ok"] * 8
+    assert fake_groq.stats['rate_limited'] == 0
+    assert fake_groq.stats['ok'] == 16
+
+
+@pytest.mark.parametrize('fake_groq', [{'period': 3600.0}], indirect=True)        # Refills ~3 tokens a second
+def test_settles_the_reservation_with_the_reported_usage(fake_groq):
+    llm = _llm(fake_groq)
+    llm.invoke(prompt)
+    used = fake_groq.stats['tokens']
+    assert llm.throttle.tokens_bucket.available() == pytest.approx(fake_groq.tokens_window.limit - used, abs=5)
@@ -0,0 +1,109 @@
+import threading
+from email.utils import formatdate
+from types import SimpleNamespace
+
+import pytest
+
+from config.config import RetryConfig
+from utils.llm_retry import RetryBudget, backoff_delay, classify, next_delay, retry_after, retry_budget, status_code
+
+
+class StatusError(Exception):
+    def __init__(self, status_code=None, response=None):
+        super().__init__(f"status {status_code}")
+        self.status_code, self.response = status_code, response
+
+
+class APIConnectionError(Exception):
+    """Named like the openai, anthropic and groq connection errors."""
+
+
+class Limiter:
+    key = 'test:model'
+
+    def __init__(self):
+        self.cuts = 0
+
+    def saturated(self):
+        self.cuts += 1
+
+
+@pytest.mark.parametrize('exc, expected', [
+    (StatusError(429), (True, True)),
+    (StatusError(503), (True, True)),
+    (StatusError(500), (True, False)),
+    (StatusError(400), (False, False)),
+    (StatusError(response=SimpleNamespace(status_code=529)), (True, True)),
+    (ValueError("Ollama call failed with status code 503. Details: busy"), (True, True)),
+    (ValueError("Ollama call failed with status code 404. Details: model not found"), (False, False)),
+    (APIConnectionError("reset"), (True, False)),
+    (TimeoutError(), (True, False)),
+    (ValueError("bad prompt"), (False, False)),
+])
+def test_classifies_errors_as_retryable_and_saturated(exc, expected):
+    assert classify(exc) == expected
+
+
+def test_reads_the_status_from_the_exception_before_its_message():
+    assert status_code(StatusError(429)) == 429
+    assert status_code(ValueError("status code: 502")) == 502
+    assert status_code(ValueError("no status here")) is None
+
+
+@pytest.mark.parametrize('headers, expected', [
+    ({'retry-after': '7'}, 7.0),
+    ({'retry-after-ms': '1500', 'retry-after': '9'}, 1.5),
+    ({'retry-after': 'soon'}, None),
+    ({}, None),
+])
+def test_reads_retry_after_headers(headers, expected):
+    assert retry_after(StatusError(429, SimpleNamespace(headers=headers))) == expected
+
+
+def test_reads_retry_after_dates():
+    after = retry_after(StatusError(429, SimpleNamespace(headers={'retry-after': formatdate(usegmt=True)})))
+    assert 0 <= after <= 1
+
+
+@pytest.mark.parametrize('attempt', [0, 1, 3, 10])
+def test_backoff_is_jittered_below_the_capped_exponential_delay(attempt):
+    cap = min(RetryConfig.max_delay, RetryConfig.base_delay * 2 ** attempt)
+    delays = [backoff_delay(attempt) for _ in range(200)]
+    assert all(0 <= delay <= cap for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_backoff_honours_retry_after_with_a_little_jitter():
+    assert all(20 <= backoff_delay(0, after=20) <= 21 for _ in range(100))
+    assert all(2 <= backoff_delay(5, after=2) <= 2.2 for _ in range(100))
+
+
+def test_budget_is_shared_by_threads_and_can_be_reset():
+    budget, taken = RetryBudget(50), []
+    threads = [threading.Thread(target=lambda: taken.append(budget.take())) for _ in range(80)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert taken.count(True) == 50
+    assert not budget.take()
+
+    budget.reset(2)
+    assert [budget.take() for _ in range(3)] == [True, True, False]
+
+
+def test_next_delay_cuts_a_saturated_limiter_and_gives_up_after_the_last_attempt():
+    retry_budget.reset(RetryConfig.budget)
+    limiter = Limiter()
+    assert next_delay(limiter, StatusError(503), 0) is not None
+    assert next_delay(limiter, StatusError(503), RetryConfig.max_attempts - 1) is None
+    assert limiter.cuts == 2
+    assert next_delay(limiter, StatusError(400), 0) is None
+
+
+def test_next_delay_gives_up_when_the_budget_is_spent():
+    retry_budget.reset(0)
+    try:
+        assert next_delay(Limiter(), StatusError(500), 0) is None
+    finally:
+        retry_budget.reset(RetryConfig.budget)
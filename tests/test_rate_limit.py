@@ -0,0 +1,146 @@
+import asyncio
+import multiprocessing
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from utils.rate_limit import AsyncRateLimiter, MemoryBackend, TokenBucket, get_backend
+
+shared_backends = ['file', 'sqlite', 'shared_memory']
+
+
+def _worker(backend_name, path, key, capacity, period, requests, results):
+    bucket = TokenBucket(key, capacity, period, backend=get_backend(backend_name, path))
+    for _ in range(requests):
+        bucket.acquire(1)
+        results.put(time.time())
+
+
+@pytest.mark.parametrize('backend_name', shared_backends)
+def test_processes_share_the_bucket(backend_name, tmp_path):
+    """Several processes draw from one bucket: together they must not exceed its rate."""
+    workers, requests, capacity, period = 4, 10, 20, 2.0
+    key = f"test:{backend_name}:{time.time()}"
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_worker, args=(backend_name, str(tmp_path), key, capacity, period,
+                                                               requests, results))
+                 for _ in range(workers)]
+    start = time.time()
+    for process in processes:
+        process.start()
+    times = sorted(results.get(timeout=30) for _ in range(workers * requests))
+    for process in processes:
+        process.join(timeout=30)
+    backend = get_backend(backend_name, str(tmp_path))
+    if backend_name == 'shared_memory':
+        backend.unlink(key)
+
+    assert all(process.exitcode == 0 for process in processes)
+    expected = (workers * requests - capacity) / (capacity / period)    # The first capacity tokens are free
+    elapsed = times[-1] - start
+    assert expected * 0.95 <= elapsed < expected + 5
+
+
+def test_reservations_queue_up_and_release_refunds():
+    bucket = TokenBucket('test:memory', 10, 10.0, backend=MemoryBackend())
+    assert bucket.reserve(10) == 0
+    assert bucket.reserve(5) == pytest.approx(5, abs=0.1)                 # The balance goes negative
+    bucket.release(5)
+    assert bucket.wait_time(1) == pytest.approx(1, abs=0.1)
+
+
+def test_async_waiters_are_served_in_arrival_order():
+    bucket = TokenBucket('test:fifo', 1, 0.2, backend=MemoryBackend())  # One token every 0.2s
+    limiter, served = AsyncRateLimiter(), []
+    limiter.recheck_seconds = 0.05
+
+    async def take(name):
+        await limiter.acquire([(bucket, 1)])
+        served.append(name)
+
+    async def run():
+        tasks = []
+        for name in range(4):
+            tasks.append(asyncio.create_task(take(name)))
+            await asyncio.sleep(0)                                      # Queue up in this order
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert served == [0, 1, 2, 3]
+
+
+def test_a_cancelled_waiter_takes_no_tokens_and_lets_the_next_one_in():
+    bucket = TokenBucket('test:cancel', 2, 2.0, backend=MemoryBackend())
+    limiter = AsyncRateLimiter()
+    limiter.recheck_seconds = 0.05
+
+    async def run():
+        await limiter.acquire([(bucket, 2)])                           # Empty now
+        head = asyncio.create_task(limiter.acquire([(bucket, 2)]))
+        second = asyncio.create_task(limiter.acquire([(bucket, 1)]))
+        await asyncio.sleep(0.2)
+        head.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await head
+        await asyncio.wait_for(second, timeout=2)
+        return bucket.available()
+
+    assert asyncio.run(run()) < 1                                       # Only the second waiter's token is gone
+
+
+def test_a_locked_shared_backend_does_not_block_the_event_loop(tmp_path):
+    bucket = TokenBucket('test:locked', 10, 60.0, backend=get_backend('sqlite', str(tmp_path)))
+    bucket.available()
+    locked, released = threading.Event(), threading.Event()
+
+    def hold_lock():
+        connection = sqlite3.connect(str(tmp_path / 'buckets.sqlite'), timeout=30, isolation_level=None)
+        connection.execute("BEGIN IMMEDIATE")
+        locked.set()
+        released.wait(5)
+        connection.execute("ROLLBACK")
+        connection.close()
+
+    async def run():
+        gaps = []
+
+        async def tick():
+            while True:
+                start = time.monotonic()
+                await asyncio.sleep(0.05)
+                gaps.append(time.monotonic() - start)
+
+        ticker = asyncio.create_task(tick())
+        acquire = asyncio.create_task(AsyncRateLimiter().acquire([(bucket, 3)]))
+        await asyncio.sleep(0.5)
+        released.set()
+        await acquire
+        ticker.cancel()
+        return max(gaps)
+
+    holder = threading.Thread(target=hold_lock)
+    holder.start()
+    locked.wait(5)
+    assert asyncio.run(run()) < 0.3
+    holder.join()
+    assert bucket.available() == pytest.approx(7, abs=0.5)
+
+
+def test_tokens_reserved_for_a_cancelled_waiter_are_given_back(tmp_path):
+    bucket = TokenBucket('test:release', 10, 60.0, backend=get_backend('sqlite', str(tmp_path)))
+    reserve, gate = bucket.reserve, threading.Event()
+    bucket.reserve = lambda amount: gate.wait(5) and reserve(amount)  # The reservation finishes after the cancel
+
+    async def run():
+        acquire = asyncio.create_task(AsyncRateLimiter().acquire([(bucket, 4)]))
+        await asyncio.sleep(0.2)
+        acquire.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await acquire
+        gate.set()
+        await asyncio.sleep(0.3)
+
+    asyncio.run(run())
+    assert bucket.available() == pytest.approx(10, abs=0.5)
@@ -0,0 +1,51 @@
+import pytest
+
+from utils.safe_argment_parser import max_length, parse_arguments, split_arguments
+
+
+@pytest.mark.parametrize('arg_str, expected', [
+    ("", ()),
+    ("1, 'two'", ((None, "1"), (None, "'two'"))),
+    ("path='a,b', pattern='x=y'", (('path', "'a,b'"), ('pattern', "'x=y'"))),
+    ("items=[1, 2], options={'a': (1, 2)}", (('items', "[1, 2]"), ('options', "{'a': (1, 2)}"))),
+    ("f(1, 2), g=h(x=1)", ((None, "f(1, 2)"), ('g', "h(x=1)"))),
+    ("a=1, b", (('a', "1"), (None, "b"))),                              # Accepted by the original splitter too
+    ("a=1,, b,", (('a', "1"), (None, "b"))),
+    ("a=1,\n    b=2,\n  c=3", (('a', "1"), ('b', "2"), ('c', "3"))),     # Multi-line cells
+])
+def test_splits_at_top_level_commas(arg_str, expected):
+    assert split_arguments(arg_str) == expected
+
+
+@pytest.mark.parametrize('arg_str, message', [
+    ("a b", "key=value"),
+    ("a=(1", "key=value"),
+    ("'unterminated", "key=value"),
+    ("*items", r"\*args"),
+    ("**options", r"\*\*kwargs"),
+])
+def test_rejects_malformed_arguments(arg_str, message):
+    with pytest.raises(ValueError, match=message):
+        split_arguments(arg_str)
+
+
+def test_evaluates_positional_and_keyword_arguments():
+    args, kwargs = parse_arguments(" 1, 'x', items=[1, 2], n=len('abc') ")
+    assert args == [1, 'x']
+    assert kwargs == {'items': [1, 2], 'n': 3}
+
+
+def test_empty_cells_have_no_arguments():
+    assert parse_arguments(float('nan')) == ([], {})
+    assert parse_arguments(None) == ([], {})
+
+
+@pytest.mark.parametrize('arg_str', ["__import__('os')", "().__class__", "open('/etc/passwd')", "undefined_name"])
+def test_refuses_unsafe_or_unknown_expressions(arg_str):
+    with pytest.raises(ValueError, match="Error evaluating expression"):
+        parse_arguments(arg_str)
+
+
+def test_refuses_long_argument_strings():
+    with pytest.raises(ValueError, match="Input too long"):
+        parse_arguments("x" * (max_length + 1))
@@ -0,0 +1,64 @@
+from urllib.error import URLError
+
+from utils.sheet_cache import SheetCache
+from utils.sheets_loader import Sheets, worksheets
+
+offline_url = "http://127.0.0.1:1/spreadsheets/d/fake-sheet-id/edit"  # Same sheet, nothing listening
+
+
+def _read(url, cache):
+    result = Sheets.read_google_sheet(url, cache=cache)
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def test_revalidates_cached_worksheets_with_their_etag(fake_sheet, tmp_path):
+    cache = SheetCache(cache_dir=str(tmp_path))
+    first = _read(fake_sheet.url, cache)
+    second = _read(fake_sheet.url, cache)
+
+    assert all(frame.equals(cached) for frame, cached in zip(first, second))
+    assert all(fake_sheet.requested(tab) == [None, '"v1"'] for tab in worksheets)
+
+
+def test_downloads_a_changed_worksheet_again(fake_sheet, tmp_path):
+    cache = SheetCache(cache_dir=str(tmp_path))
+    _read(fake_sheet.url, cache)
+    fake_sheet.worksheets['Agents'] = fake_sheet.worksheets['Agents'].replace('Writer,', 'Editor,')
+    fake_sheet.version += 1
+
+    agents = _read(fake_sheet.url, cache)[0]
+    assert agents.loc[0, 'Agent Role'] == 'Editor'
+
+
+def test_trusts_worksheets_younger_than_the_ttl(fake_sheet, tmp_path):
+    cache = SheetCache(cache_dir=str(tmp_path), ttl=60)
+    _read(fake_sheet.url, cache)
+    _read(fake_sheet.url, cache)
+    assert len(fake_sheet.requests) == len(worksheets)
+
+
+def test_offline_reads_only_the_cache(fake_sheet, tmp_path):
+    _read(fake_sheet.url, SheetCache(cache_dir=str(tmp_path)))
+    agents = _read(fake_sheet.url, SheetCache(cache_dir=str(tmp_path), offline=True))[0]
+
+    assert agents.loc[0, 'Agent Role'] == 'Writer'
+    assert len(fake_sheet.requests) == len(worksheets)
+
+
+def test_offline_without_a_cached_copy_fails(tmp_path):
+    result = Sheets.read_google_sheet(offline_url, cache=SheetCache(cache_dir=str(tmp_path), offline=True))
+    assert isinstance(result, URLError)
+
+
+def test_falls_back_to_the_cache_when_the_network_is_down(fake_sheet, tmp_path):
+    cache = SheetCache(cache_dir=str(tmp_path))
+    _read(fake_sheet.url, cache)
+    agents = _read(offline_url, cache)[0]
+    assert agents.loc[0, 'Agent Role'] == 'Writer'
+
+
+def test_network_down_without_a_cached_copy_fails(tmp_path):
+    result = Sheets.read_google_sheet(offline_url, cache=SheetCache(cache_dir=str(tmp_path)))
+    assert isinstance(result, URLError)
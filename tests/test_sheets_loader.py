@@ -0,0 +1,86 @@
+import time
+from urllib.error import URLError
+
+import pandas as pd
+import pytest
+
+from utils.sheets_loader import Sheets, SheetSchemaError, worksheets
+
+
+@pytest.mark.parametrize('fake_sheet', [{'latency': 0.3}], indirect=True)
+def test_fetches_all_worksheets_concurrently(fake_sheet):
+    start = time.monotonic()
+    frames = Sheets.read_google_sheet(fake_sheet.url)
+    elapsed = time.monotonic() - start
+
+    assert [frame.columns.tolist() for frame in frames] == list(worksheets.values())
+    assert sorted(tab for tab, _ in fake_sheet.requests) == sorted(worksheets)
+    assert fake_sheet.peak_in_flight == len(worksheets)
+    assert elapsed < 0.3 * len(worksheets) / 2
+
+
+def test_parses_the_worksheets_in_order(fake_sheet):
+    agents, tasks, crew, models, tools = Sheets.read_google_sheet(fake_sheet.url)
+    assert agents.loc[0, 'Agent Role'] == 'Writer'
+    assert agents.loc[0, 'Max_iter'] == 5
+    assert tasks.loc[0, 'Agent'] == 'Writer'
+    assert crew.loc[0, 'num_ctx'] is None                               # 0 means not set
+    assert models.loc[0, 'Model'] == 'gpt-4'
+    assert tools.loc[0, 'On'] is True
+
+
+def test_downloads_through_the_given_session(fake_sheet):
+    session, urls = Sheets.new_session(), []
+    get = session.get
+    session.get = lambda url, **kwargs: urls.append(url) or get(url, **kwargs)
+    assert not isinstance(Sheets.read_google_sheet(fake_sheet.url, session=session), Exception)
+    assert len(urls) == len(worksheets)
+    session.close()
+
+
+def test_returns_a_missing_worksheet_as_url_error(fake_sheet):
+    del fake_sheet.worksheets['Tools']
+    result = Sheets.read_google_sheet(fake_sheet.url)
+    assert isinstance(result, URLError)
+
+
+def _agents(**columns):
+    rows = {column: [None, None] for column in worksheets['Agents']}
+    rows.update({'Agent Role': ['Writer', 'Editor'], 'Max_iter': ['5', '7'], 'Temperature': ['0.2', '0.4'], **columns})
+    return pd.DataFrame(rows)
+
+
+def test_sanitize_reports_every_bad_cell_with_its_coordinates():
+    data = _agents(**{'Max_iter': ['5', 'many'], 'Temperature': ['warm', '0.4']})
+    with pytest.raises(SheetSchemaError) as error:
+        Sheets.sanitize_worksheet('Agents', data, worksheets['Agents'])
+    assert error.value.errors == [                                      # Sheet rows: the header is row 1
+        "Agents, row 3, column 'Max_iter': 'many' is not of type int.",
+        "Agents, row 2, column 'Temperature': 'warm' is not of type float.",
+    ]
+
+
+def test_sanitize_applies_defaults_and_drops_rows_without_required_cells():
+    data = _agents(**{'Agent Role': ['Writer', None], 'Max_iter': ['None', '7'], 'Verbose': ['no', 'yes']})
+    agents = Sheets.sanitize_worksheet('Agents', data, worksheets['Agents'])
+    assert agents['Agent Role'].tolist() == ['Writer']
+    assert agents.loc[0, 'Max_iter'] == 15
+    assert agents.loc[0, 'Verbose'] is False
+    assert agents.loc[0, 'Goal'] is None
+
+
+def test_sanitize_requires_all_but_optional_columns():
+    models = pd.DataFrame({'Model': ['gpt-4'], 'Context size (local only)': [0], 'Provider': ['openai'],
+                           'base_url': [None], 'Deployment': [None]})
+    assert Sheets.sanitize_worksheet('Models', models, worksheets['Models']).loc[0, 'RPM'] is None
+    with pytest.raises(ValueError, match="missing the columns \\['Provider'\\]"):
+        Sheets.sanitize_worksheet('Models', models.drop(columns='Provider'), worksheets['Models'])
+
+
+def test_reports_the_bad_cells_of_all_worksheets_at_once(fake_sheet):
+    fake_sheet.worksheets['Agents'] = fake_sheet.worksheets['Agents'].replace(',5,', ',five,')
+    fake_sheet.worksheets['Tools'] = fake_sheet.worksheets['Tools'].replace('TRUE', 'maybe')
+    result = Sheets.read_google_sheet(fake_sheet.url)
+    assert isinstance(result, SheetSchemaError)
+    assert result.errors == ["Agents, row 2, column 'Max_iter': 'five' is not of type int.",
+                             "Tools, row 2, column 'On': 'maybe' is not of type bool."]
@@ -1,12 +1,27 @@
-from .sheets_loader          import Sheets
-from .import_package_modules import import_package_modules
-from .safe_argment_parser    import parse_arguments
-from .callable_registry      import CallableRegistry
-from .helpers                import load_env
-from .helpers                import get_sheet_url_from_user
-from .tools_mapping          import ToolsMapping
-from .tools_llm_config       import ConfigurationManager
-from .cli_parser             import get_parser
-from .agent_crew_llm         import get_llm
-from .ollama_loader          import OllamaLoader
-from .groq                   import TokenThrottledChatGroq
\ No newline at end of file
+import importlib
+
+# Public name -> submodule. Submodules are imported on first access, so importing utils does not pull in
+# pandas, langchain or the LLM provider SDKs until they are actually needed.
+_lazy_exports = {
+    'Sheets':                  '.sheets_loader',
+    'parse_arguments':         '.safe_argment_parser',
+    'CallableRegistry':        '.callable_registry',
+    'load_env':                '.helpers',
+    'get_sheet_url_from_user': '.helpers',
+    'ToolsMapping':            '.tools_mapping',
+    'ConfigurationManager':    '.tools_llm_config',
+    'get_parser':              '.cli_parser',
+    'get_llm':                 '.agent_crew_llm',
+    'OllamaLoader':            '.ollama_loader',
+    'TokenThrottledChatGroq':  '.groq',
+}
+
+__all__ = list(_lazy_exports)
+
+
+def __getattr__(name):
+    if name in _lazy_exports:
+        value = getattr(importlib.import_module(_lazy_exports[name], __name__), name)
+        globals()[name] = value                                         # Resolve only once
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,21 +1,247 @@
 import logging
 logger = logging.getLogger(__name__)
 
-#from langchain_community.llms  import Ollama
-from utils.ollama_loader  import OllamaLoader
 import config.config as config
-from langchain_community.llms import HuggingFaceEndpoint
-from langchain_anthropic import ChatAnthropic
-from langchain_openai import ChatOpenAI, AzureOpenAI, AzureChatOpenAI
-#from langchain_groq import ChatGroq
-from utils.groq import TokenThrottledChatGroq
-from utils.helpers import load_env
-from ollama  import pull, list
+from utils.startup_profiler import profiler
+from utils.llm_limits import get_limiter, limit_llm
+import importlib.metadata
+import threading
+import time
 import os
-from tqdm import tqdm
+
+provider_entry_point_group = "crewai_sheets_ui.llm_providers"    # Third-party providers register factories here
+
+
+#Anthropic.
+def _load_anthropic(model_name=None, temperature=0.7, **kwargs):
+    logger.info(f"Using Anthropic model '{model_name}' with temperature {temperature}.")
+    try:
+        from langchain_anthropic import ChatAnthropic
+        return ChatAnthropic(
+            model_name  = model_name,                            #use model_name as endpoint
+            api_key     = os.environ.get("ANTHROPIC_API_KEY"),
+            temperature = temperature,
+            max_retries = 0,                                     #retried by utils/llm_retry.py
+            #stop = ["\nObservation"] 
+        )
+    except Exception as e:
+        print(f"Hey, I've failed to configure Anthropic model '{model_name}'. Could you check if the API KEY is set? :\n{e}")
+        return None
+
+#Azure OpenaI   
+def _load_azure_openai(model_name=None, temperature=0.7, base_url=None, deployment=None, **kwargs):
+    logger.info(f"Trying azure_openai model '{model_name}' with temperature {temperature}," \
+            f"deployment {deployment}, azure_andpoint {base_url}, AZURE_OPENAI_KEY, AZURE_OPENAI_VERSION.")
+    try:
+        from langchain_openai import AzureChatOpenAI
+        return AzureChatOpenAI(
+            azure_deployment = deployment,                            
+            azure_endpoint   = base_url,                           
+            api_key          = os.environ.get("AZURE_OPENAI_KEY"),
+            api_version=os.environ.get("AZURE_OPENAI_VERSION"),
+            temperature=temperature,
+            max_retries=0,                                      #retried by utils/llm_retry.py
+            )
+    except Exception as e:
+        print(f"Hey, I've failed to configure Azure OpenAI model '{model_name}'. Could you check if the API KEY is set? :\n{e}")
+        return None
+
+#OpenAI
+def _load_openai(model_name=None, temperature=0.7, base_url=None, **kwargs):
+    logger.info(f"Trying openai model '{model_name}' with temperature {temperature}," 
+            f"base_url {base_url}, api_key via env.")
+    try:
+        from langchain_openai import ChatOpenAI
+        os.environ['OPENAI_API_KEY'] = os.environ.get("SECRET_OPENAI_API_KEY")
+        if base_url is None: 
+            base_url= "https://api.openai.com/v1"                      
+        return ChatOpenAI(
+            model           = model_name, 
+            temperature     = temperature,
+            base_url        = base_url,
+            max_retries     = 0,                                #retried by utils/llm_retry.py
+            )
+    except Exception as e:
+        print(f"Hey, I've failed to configure OpenAI model '{model_name}'. Could you check if the API KEY is set? :\n{e}")
+        return None
+
+#OpenAI comatipble via /v1 protocol LM Studio, llamacpp, ollama, etc
+def _load_openai_compatible(model_name=None, temperature=0.7, base_url=None, **kwargs):
+    logger.info(f"Trying openai_compatible model '{model_name}' with temperature {temperature}, base_url {base_url}")
+    try:
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(
+            model           = model_name, 
+            temperature     = temperature,
+            base_url        = base_url,
+            openai_api_key  = 'NA', #TODO suppoert for local llm API key's
+            max_retries     = 0,                                #retried by utils/llm_retry.py
+            )
+    except Exception as e:
+        print(f"Hey, I've failed to configure OpenAI model '{model_name}'. Could you check if the API KEY is set? :\n{e}")
+        return None
+
+#Groq
+def _load_groq(model_name=None, temperature=0.7, base_url=None, rpm=None, tpm=None, **kwargs):
+    max_tokens = config.GroqConfig.max_tokens
+    rate_limit = tpm or config.GroqConfig.get_rate_limit(model_name)         # The Models row wins
+    request_limit = rpm or config.GroqConfig.get_request_limit(model_name)
+    logger.info(f"Trying groq model '{model_name}' with temperature {temperature}") 
+    try:
+        from utils.groq import TokenThrottledChatGroq
+        return TokenThrottledChatGroq( #custom class to throttle tokens
+            rate_limit       = rate_limit,
+            request_limit    = request_limit,
+            model            = model_name, 
+            temperature      = temperature,
+            max_tokens       = max_tokens,
+            base_url         = base_url or config.GroqConfig.base_url,
+            max_retries      = 0,                               #retried by utils/llm_retry.py
+            )
+    except Exception as e:
+        print(f"Hey, I've failed to configure Groq model '{model_name}'. Could you check if the API KEY is set?\n{e}")
+        return None
+
+#huggingface
+def _load_huggingface(model_name=None, **kwargs):
+    logger.info(f"Trying huggingface repo_id '{model_name}' with hugingfacehub_api_token. via env")       
+    try:
+        from langchain_community.llms import HuggingFaceEndpoint
+        return HuggingFaceEndpoint(
+            repo_id=model_name,
+            huggingfacehub_api_token=os.environ.get("HUGGINGFACEHUB_API_TOKEN"),
+            stop_sequences = config.HuggingFaceConfig.stop_sequences,
+            #model_kwargs = {"max_length": 10000}                #need to read documentation
+            #max_new_tokens = 1000,                              #need to read documentation
+            #max_length = 1000,                                  #need to read documentation
+            #task="text-generation",
+        )
+    except Exception as e:
+        print(f"Hey, I've failed to configure HuggingFace model '{model_name}'. Could you check if the API KEY is set? \n{e}")  
+        return None
+
+#Ollama
+def _load_ollama(model_name=None, temperature=0.7, num_ctx=None, base_url=None, **kwargs):
+    logger.info(f"Trying ollama model '{model_name}' with num_ctx {num_ctx}.")
+    try:
+        from utils.ollama_loader import OllamaLoader
+        return OllamaLoader.load(
+            model_name  = model_name, 
+            temperature = temperature, 
+            num_ctx = num_ctx, 
+            base_url = base_url,
+            stop = config.OllamaConfig.stop_words #don't pass - crewai aleady does this itself.
+        )
+    except Exception as e:
+        print(f"Hey, I've failed to configure Ollama model '{model_name}':\n{e}")
+        return None
+
+
+# Provider name -> factory(model_name, temperature, num_ctx, base_url, deployment, **kwargs).
+# Factories import their SDK on first use, so a crew only pays for the providers its Models sheet uses.
+_providers = {
+    'anthropic':         _load_anthropic,
+    'azure_openai':      _load_azure_openai,
+    'openai':            _load_openai,
+    'openai_compatible': _load_openai_compatible,
+    'groq':              _load_groq,
+    'huggingface':       _load_huggingface,
+    'ollama':            _load_ollama,
+}
+_entry_points_loaded = False
+
+
+def register_provider(name, factory):
+    """Registers an LLM factory for a provider name, replacing any built-in factory with the same name."""
+    _providers[name.lower()] = factory
+
+
+def _load_entry_point_providers():
+    """Registers the providers of installed plugins, once per process."""
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+    for entry_point in importlib.metadata.entry_points(group=provider_entry_point_group):
+        try:
+            register_provider(entry_point.name, entry_point.load())
+            logger.info(f"Registered LLM provider '{entry_point.name}' from {entry_point.value}.")
+        except Exception as e:
+            logger.error(f"Failed to load LLM provider plugin '{entry_point.name}': {e}")
+
+
+def get_provider(provider):
+    """Returns the factory for a provider, looking at installed plugins when it's not built in."""
+    if provider is None:
+        return None
+    factory = _providers.get(provider.lower())
+    if factory is None:
+        _load_entry_point_providers()
+        factory = _providers.get(provider.lower())
+    return factory
+
+
+class LLMPool:
+    """
+    Hands out one shared LLM instance per (provider, model, temperature, num_ctx, base_url, deployment),
+    so agents, function calling LLMs and the manager that use the same model share its client and HTTP pool.
+    Failed creations are not pooled and are retried on the next request.
+    """
+
+    def __init__(self):
+        self.llms = {}                                                  # key -> llm
+        self.stats = {}                                                 # key -> {'requests', 'created', 'failed', 'seconds'}
+        self._locks = {}                                                # key -> lock, concurrent requests build once
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(provider, model_name, temperature, num_ctx, base_url, deployment, **kwargs):
+        """Pool key of a get_llm call, or None if the extra arguments can't be part of a key."""
+        key = ((provider or '').lower(), (model_name or '').strip(), temperature, num_ctx, base_url, deployment,
+               tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def get(self, key, create):
+        """Returns the pooled LLM of key, calling create() to build it if it's not pooled yet."""
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+            stats = self.stats.setdefault(key, {'requests': 0, 'created': 0, 'failed': 0, 'seconds': 0.0})
+            stats['requests'] += 1
+        with lock:
+            llm = self.llms.get(key)
+            if llm is not None:
+                return llm
+            start = time.perf_counter()
+            llm = create()
+            stats['seconds'] += time.perf_counter() - start
+            if llm is None:
+                stats['failed'] += 1
+                return None
+            stats['created'] += 1
+            self.llms[key] = llm
+            return llm
+
+    def clear(self):
+        """Drops all pooled instances, e.g. after API keys changed. Stats are kept."""
+        with self._lock:
+            self.llms.clear()
+
+    def summary(self):
+        """One line per pooled model: requests, instances created and creation time."""
+        return [f"{key[0]}:{key[1]} (t={key[2]}, num_ctx={key[3]}): {stats['requests']} request(s), "
+                f"{stats['created']} created, {stats['failed']} failed, {stats['seconds']:.2f}s"
+                for key, stats in self.stats.items()]
+
+
+llm_pool = LLMPool()                                                    # Process wide, see get_llm(pool=...)
+
 
 def get_llm(model_name= None, temperature=0.7, num_ctx = None, provider  = None, base_url = None, 
-            deployment=None,  **kwargs):
+            deployment=None, pool=llm_pool, rpm=None, tpm=None, max_concurrent=None, **kwargs):
     """
     Retrieves an appropriate LLM based on specified parameters, including provider and model specifics.
     The function checks if the specific model or a base model already exists in Ollama and does not pull
@@ -28,6 +254,9 @@ def get_llm(model_name= None, temperature=0.7, num_ctx = None, provider  = None,
     - provider (str): The provider of the model ('openai', 'azure_openai', 'anthropic', etc.).
     - base_url (str): Base URL for the API requests, applicable for some providers like OpenAI and Azure.
     - deployment (str): Deployment specifics, primarily used for Azure.
+    - pool (LLMPool): Pool to share the instance from. Pass None to always create a new instance.
+    - rpm, tpm, max_concurrent: Client side limits, see utils/llm_limits.py. None: the LLMLimitsConfig default.
+      Calls failing with 429, 5xx or a dropped connection are retried with backoff, see utils/llm_retry.py.
     - progress (object): Progress tracking object, usually a UI element to indicate progress to the user.
     - llm_task (object): Task identifier for updating progress status.
     #TODO: - **kwargs: Additional keyword arguments that may be required by specific providers. Pass 
@@ -40,125 +269,28 @@ def get_llm(model_name= None, temperature=0.7, num_ctx = None, provider  = None,
     - 'azure_openai': Uses 'deployment', 'base_url', 'temperature'.
     - 'openai': Uses 'model_name', 'temperature', 'base_url'.
     - 'huggingface': Uses 'model_name' and might use API token configurations internally.
-    """
-
-    #load_env("../../ENV/.env", ["OPENAI_API_KEY","OPENAI_BASE_URL"])
-
-    #Anthropic. 
-    if provider.lower() == "anthropic":
-        logger.info(f"Using Anthropic model '{model_name}' with temperature {temperature}.")
-        try:  
-            return ChatAnthropic(
-                model_name  = model_name,                            #use model_name as endpoint
-                api_key     = os.environ.get("ANTHROPIC_API_KEY"),
-                temperature = temperature,
-                #stop = ["\nObservation"] 
-            )
-        except Exception as e:
-            print(f"Hey, I've failed to configure Anthropic model '{model_name}'. Could you check if the API KEY is set? :\n{e}")
-            return None
-    
-    #Azure OpenaI   
-    if provider.lower() == "azure_openai":
-        logger.info(f"Trying {provider} model '{model_name}' with temperature {temperature}," \
-                f"deployment {deployment}, azure_andpoint {base_url}, AZURE_OPENAI_KEY, AZURE_OPENAI_VERSION.")
-        try:
-            return AzureChatOpenAI(
-                azure_deployment = deployment,                            
-                azure_endpoint   = base_url,                           
-                api_key          = os.environ.get("AZURE_OPENAI_KEY"),
-                api_version=os.environ.get("AZURE_OPENAI_VERSION"),
-                temperature=temperature
-                )
-        except Exception as e:
-            print(f"Hey, I've failed to configure Azure OpenAI model '{model_name}'. Could you check if the API KEY is set? :\n{e}")
-            return None
-        
-    #OpenAI
-    if provider.lower() == "openai":
-        logger.info(f"Trying {provider} model '{model_name}' with temperature {temperature}," 
-                f"base_url {base_url}, api_key via env.")
-        try:
-            os.environ['OPENAI_API_KEY'] = os.environ.get("SECRET_OPENAI_API_KEY")
-            if base_url is None: 
-                base_url= "https://api.openai.com/v1"                      
-            return ChatOpenAI(
-                model           = model_name, 
-                temperature     = temperature,
-                base_url        = base_url,
-                )
-        except Exception as e:
-            print(f"Hey, I've failed to configure OpenAI model '{model_name}'. Could you check if the API KEY is set? :\n{e}")
-            return None
-    
-    #OpenAI comatipble via /v1 protocol LM Studio, llamacpp, ollama, etc
-    if provider.lower() == "openai_compatible":
-        logger.info(f"Trying {provider} model '{model_name}' with temperature {temperature}, base_url {base_url}")
-        try:
-            return ChatOpenAI(
-                model           = model_name, 
-                temperature     = temperature,
-                base_url        = base_url,
-                openai_api_key  = 'NA' #TODO suppoert for local llm API key's
-                )
-        except Exception as e:
-            print(f"Hey, I've failed to configure OpenAI model '{model_name}'. Could you check if the API KEY is set? :\n{e}")
-            return None
-    
-    #Groq
-    if provider.lower() == "groq":
-        max_tokens = config.GroqConfig.max_tokens
-        rate_limit = config.GroqConfig.get_rate_limit(model_name)
-        logger.info(f"Trying {provider} model '{model_name}' with temperature {temperature}") 
-        try:
-            return TokenThrottledChatGroq( #custom class to throttle tokens
-                rate_limit       = rate_limit,
-                model            = model_name, 
-                temperature      = temperature,
-                max_tokens       = max_tokens,
-                
-                #base_url        = base_url,
-                )
-        except Exception as e:
-            print(f"Hey, I've failed to configure Groq model '{model_name}'. Could you check if the API KEY is set?\n{e}")
-            return None
-        
-    #huggingface
-    if provider.lower() == "huggingface":   
-        logger.info(f"Trying {provider} repo_id '{model_name}' with hugingfacehub_api_token. via env")       
-        try:
-            return HuggingFaceEndpoint(
-                repo_id=model_name,
-                huggingfacehub_api_token=os.environ.get("HUGGINGFACEHUB_API_TOKEN"),
-                stop_sequences = config.HuggingFaceConfig.stop_sequences,
-                #model_kwargs = {"max_length": 10000}                #need to read documentation
-                #max_new_tokens = 1000,                              #need to read documentation
-                #max_length = 1000,                                  #need to read documentation
-                #task="text-generation",
-            )
-        except Exception as e:
-            print(f"Hey, I've failed to configure HuggingFace model '{model_name}'. Could you check if the API KEY is set? \n{e}")  
-            return None
-    #Ollama
-    if provider.lower() == "ollama":
-        logger.info(f"Trying {provider} model '{model_name}' with num_ctx {num_ctx}.")
-        try:
-           return OllamaLoader.load(
-                model_name  = model_name, 
-                temperature = temperature, 
-                num_ctx = num_ctx, 
-                base_url = base_url,
-                stop = config.OllamaConfig.stop_words #don't pass - crewai aleady does this itself.
-            )
-        except Exception as e:
-            print(f"Hey, I've failed to configure Ollama model '{model_name}':\n{e}")
-            return None
-
-    logger.error(f"Provider '{provider}' not recognized. Please use one of the supported providers: 'anthropic', 'azure_openai', 'openai', 'huggingface', 'ollama'.")   
-    return None
-
 
+    Providers are looked up in a plugin table and each provider's SDK is imported the first time it's
+    needed. Other providers can be added with register_provider() or by installing a package that exposes
+    a factory in the 'crewai_sheets_ui.llm_providers' entry point group.
+    """
 
+    factory = get_provider(provider)
+    if factory is None:
+        logger.error(f"Provider '{provider}' not recognized. Please use one of the supported providers: {', '.join(repr(p) for p in _providers)}.")   
+        return None
 
+    def create():
+        with profiler.phase(f"get_llm {provider}:{model_name}"):
+            llm = factory(model_name=model_name, temperature=temperature, num_ctx=num_ctx, base_url=base_url,
+                          deployment=deployment, rpm=rpm, tpm=tpm, **kwargs)
+        own_throttle = getattr(llm, 'throttle', None) is not None      # e.g. Groq takes rpm and tpm itself
+        limiter = get_limiter(provider, model_name, base_url, deployment, max_concurrent=max_concurrent,
+                              rpm=None if own_throttle else rpm, tpm=None if own_throttle else tpm)
+        return limit_llm(llm, limiter)
 
-    
\ No newline at end of file
+    key = pool.key(provider, model_name, temperature, num_ctx, base_url, deployment,
+                   rpm=rpm, tpm=tpm, max_concurrent=max_concurrent, **kwargs) if pool else None
+    if key is None:
+        return create()
+    return pool.get(key, create)
@@ -1,11 +1,16 @@
-
 import   logging
 logger = logging.getLogger(__name__)
 from     config.config import ToolsConfig
-import   inspect
+from     utils.import_package_modules import load_package_manifest
+from     collections.abc import Mapping
+import   importlib
+import   sys
 
 callables_list = ToolsConfig.callables_list
-modules_list   = ToolsConfig.modules_list
+packages_list  = ToolsConfig.packages_list
+manifest_cache_path = ToolsConfig.manifest_cache_path
+
+_kind_priority = {"class": 0, "function": 0, "callable": 0, "attribute": 1, "import": 2}  # Prefer definitions over re-exports
 
 class CallableRegistry:
     _instance = None                                                    # Singleton
@@ -14,54 +19,96 @@ class CallableRegistry:
         """Implement Singleton pattern. Only one instance of this class is created."""
         if cls._instance is None:
             cls._instance = super(CallableRegistry, cls).__new__(cls)
-            cls._instance.callable_dict = {}
-            cls._instance.simple_name_dict = {}
-            cls._instance.register_modules(modules_list)
+            cls._instance.callable_dict = {}                            # qualified name -> resolved object
+            cls._instance.manifest = {}                                 # qualified name -> (qualified_name, name, module_path, kind)
+            cls._instance.simple_name_dict = {}                         # simple name -> [qualified names]
+            cls._instance.register_packages(packages_list)
             cls._instance.register_callables(callables_list)
         return cls._instance
 
-    def register_modules(self, modules_list):
-        """Registers all methods, functions, and classes from specified modules."""
-        for module, alias in modules_list:
-            
-            for name, obj in inspect.getmembers(module, predicate=lambda x: callable(x) or inspect.isclass(x)):
-                qualified_name = f"{alias}.{name}"
-                self._register_callable(name, qualified_name, obj)
-                logger.info(f"Registered {qualified_name} as callable.")
+    def register_packages(self, packages_list):
+        """Registers all public members of the specified packages from a (cached) manifest. Nothing is imported here."""
+        self.register_manifest(load_package_manifest(packages_list, cache_path=manifest_cache_path))
 
     def register_callables(self, callables_list):                           #e.gg loat_tools is not callable without parameters
-        """Registers specific callables provided in a list."""
-        for callable_item in callables_list:
-            try:
-                if callable(callable_item):
-                    callable_name = getattr(callable_item, '__name__', type(callable_item).__name__)
-                    callable_module = getattr(callable_item, '__module__', 'unknown_module')
-                    qualified_name = f"{callable_module}.{callable_name}"
-                    self._register_callable(callable_name, qualified_name, callable_item)
-            except AttributeError as e:
-                logging.error(f"Failed to register {callable_item}: {str(e)}")
-
-    def _register_callable(self, name, qualified_name, callable_item):
-        """Helper method to register a callable under both its full and simple names."""
-        self.callable_dict[qualified_name] = callable_item
-        if name in self.simple_name_dict:
-            # Handle name collisions: store multiple callables under the same simple name in a list
-            if isinstance(self.simple_name_dict[name], list):
-                self.simple_name_dict[name].append(callable_item)
-            else:
-                self.simple_name_dict[name] = [self.simple_name_dict[name], callable_item]
-        else:
-            self.simple_name_dict[name] = callable_item
-        logger.info(f"Successfully registered callable: {qualified_name} as '{name}'.")
+        """Registers specific callables provided as dotted paths."""
+        for callable_path in callables_list:
+            module_path, _, callable_name = callable_path.rpartition('.')
+            if not module_path:
+                logger.error(f"Failed to register {callable_path}: not a dotted path.")
+                continue
+            self.register_manifest([(callable_path, callable_name, module_path, "callable")])
+
+    def register_manifest(self, manifest):
+        """Registers manifest entries under both their qualified and simple names."""
+        for entry in manifest:
+            qualified_name, name = entry[0], entry[1]
+            if qualified_name in self.manifest:
+                continue
+            self.manifest[qualified_name] = entry
+            candidates = self.simple_name_dict.setdefault(name, [])
+            candidates.append(qualified_name)
+            candidates.sort(key=lambda q: _kind_priority.get(self.manifest[q][3], 3))  # Stable, keeps registration order
+            logger.debug(f"Registered {qualified_name} as '{name}'.")
+
+    def _resolve(self, qualified_name):
+        """Imports the module of a manifest entry and returns the member, or None if it can't be imported."""
+        if qualified_name in self.callable_dict:
+            return self.callable_dict[qualified_name]
+        _, name, module_path, _ = self.manifest[qualified_name]
+        try:
+            module = importlib.import_module(module_path)
+            obj = getattr(module, name)
+        except (ImportError, AttributeError) as e:
+            logger.warning(f"Failed to import {qualified_name}: {e}")
+            return None
+        self.callable_dict[qualified_name] = obj
+        logger.info(f"Imported {qualified_name} from {module_path}.")
+        return obj
 
     def get_callable(self, name):
-        """Retrieves a callable by its full name or simple name."""
-        if name in self.callable_dict:
-            return self.callable_dict[name]
-        elif name in self.simple_name_dict:
-            result = self.simple_name_dict[name]
-            if isinstance(result, list):
-                logging.warning(f"Multiple callables found for '{name}'. Returning the first one.")
-                return result[0]  # Return the first callable from the list
-            return result
+        """Retrieves a callable by its full name or simple name, importing its module on first use."""
+        if name in self.manifest:
+            return self._resolve(name)
+        candidates = self.simple_name_dict.get(name, [])
+        if len(candidates) > 1:
+            logger.info(f"Multiple callables found for '{name}'. Returning the first one that can be imported.")
+        for qualified_name in candidates:
+            obj = self._resolve(qualified_name)
+            if obj is not None:
+                return obj
         return None
+
+
+class LazyNamespace(Mapping):
+    """
+    Read-only mapping of the simple names of registered members to the members. A member's module is only
+    imported when its name is looked up, e.g. by an evaluated tool Args expression. Names in extra take
+    precedence over the registry; their values may be objects or dotted module paths to resolve on lookup.
+    """
+
+    def __init__(self, registry=None, extra=None):
+        self.registry = registry or CallableRegistry()
+        self.extra = extra if extra is not None else {}
+
+    def __getitem__(self, name):
+        if name in self.extra:
+            value = self.extra[name]
+            if isinstance(value, str):                                  # Module path, e.g. from ToolsConfig.integration_dict
+                module = sys.modules.get(value) or importlib.import_module(value)
+                return getattr(module, name)
+            return value
+        obj = self.registry.get_callable(name) if not name.startswith('_') else None
+        if obj is None:
+            raise KeyError(name)
+        return obj
+
+    def __contains__(self, name):
+        return name in self.extra or name in self.registry.simple_name_dict
+
+    def __iter__(self):
+        yield from self.extra
+        yield from (name for name in self.registry.simple_name_dict if name not in self.extra)
+
+    def __len__(self):
+        return len(set(self.extra) | set(self.registry.simple_name_dict))
@@ -2,11 +2,19 @@ import logging
 
 logger = logging.getLogger(__name__)
 import argparse
-from config.config import AppConfig
+from config.config import AppConfig, OllamaConfig, RetryConfig
 
 name, version = AppConfig.name, AppConfig.version
 
 
+def keep_alive_type(value):
+    """Ollama takes a number of seconds as a number and anything else as a duration string like 30m."""
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
 def get_parser():
     # ANSI escape codes for coloring
     green = '\033[92m'
@@ -20,7 +28,9 @@ def get_parser():
         formatter_class=argparse.RawTextHelpFormatter)
 
     parser.add_argument('--sheet_url',
-                        help='The URL of the Google Sheet.\nExample: https://docs.google.com/spreadsheets/d/123abc/ \n')
+                        help='The URL of the Google Sheet, or the path to a local .xlsx/.ods workbook or\n'
+                             'a directory with Agents.csv, Tasks.csv, Crew.csv, Models.csv and Tools.csv.\n'
+                             'Example: https://docs.google.com/spreadsheets/d/123abc/ \n')
 
     parser.add_argument("--loglevel", type=str, default="ERROR", help=
     """Set the log level to control logging output. \nChoices include:
@@ -32,6 +42,43 @@ def get_parser():
     """)
     parser.add_argument("--env_path", type=str, default="../../ENV/.env")
 
+    parser.add_argument("--compile_spec", type=str, default=None, metavar="PATH",
+                        help="Validate the sheet, write it as a compiled crew spec to PATH and exit.\n")
+    parser.add_argument("--spec", type=str, default=None, metavar="PATH",
+                        help="Start from a compiled crew spec instead of reading the sheet.\n")
+
+    parser.add_argument("--offline", action="store_true",
+                        help="Use the cached copy of the sheet and don't touch the network.\n")
+    parser.add_argument("--sheet_cache_ttl", type=float, default=None, metavar="SECONDS",
+                        help="Use a cached worksheet without revalidating it while it is younger than SECONDS.\n")
+    parser.add_argument("--no_sheet_cache", action="store_true",
+                        help="Always download the sheet and don't cache it.\n")
+
+    parser.add_argument("--build_workers", type=int, default=AppConfig.build_workers, metavar="N",
+                        help=f"Build up to N agents with their LLMs and tools concurrently. Default: {AppConfig.build_workers}\n")
+
+    parser.add_argument("--retry_budget", type=int, default=RetryConfig.budget, metavar="N",
+                        help="Allow up to N retries per run of LLM calls that failed with 429, 5xx or a dropped connection,\n"
+                             f"backing off between attempts. 0 disables retrying. Default: {RetryConfig.budget}\n")
+
+    parser.add_argument("--warm_up", action="store_true", default=OllamaConfig.warm_up,
+                        help="Load the crew's Ollama models into server memory in the background at startup,\n"
+                             "so the first agent step doesn't wait for a cold load.\n")
+    parser.add_argument("--keep_alive", type=keep_alive_type, default=OllamaConfig.keep_alive, metavar="DURATION",
+                        help="How long Ollama keeps the crew's models loaded, e.g. 30m, 2h or -1 for ever.\n"
+                             "Default: the server's default\n")
+
+    parser.add_argument("--watch", action="store_true",
+                        help="After the crew finishes, wait for the sheet to be edited and run it again,\n"
+                             "rebuilding only the agents, tools and models whose rows changed.\n")
+
+    parser.add_argument("--profile-startup", dest="profile_startup", nargs="?", const="startup_profile.json",
+                        default=None, metavar="JSON_PATH", help=
+    """Record wall time and memory of each startup phase and the time spent importing
+    the heaviest modules. Prints the report as tables and writes it as JSON.
+    Default path: startup_profile.json
+    """)
+
     parser.add_argument("--version", action="version", version=version_string,
                         help="Show program's version number and exit")
 
@@ -39,5 +86,11 @@ def get_parser():
     args = parser.parse_args()
     if getattr(logging, args.loglevel.upper(), None) is None:
         parser.error(f"{red}Invalid log level: {args.loglevel}{reset}")
+    if args.build_workers < 1:
+        parser.error(f"{red}--build_workers must be at least 1{reset}")
+    if args.retry_budget < 0:
+        parser.error(f"{red}--retry_budget can't be negative{reset}")
+    if args.offline and args.no_sheet_cache:
+        parser.error(f"{red}--offline reads the sheet from its cache, it can't be combined with --no_sheet_cache{reset}")
 
     return args
@@ -0,0 +1,229 @@
+import   logging
+logger = logging.getLogger(__name__)
+from     config.config import AppConfig
+from     dataclasses import dataclass, field
+import   hashlib
+import   pickle
+import   math
+import   time
+
+# Stdlib only: loading a compiled spec must not need pandas.
+
+spec_magic          = "crewai-sheets-ui/spec"
+spec_format_version = 3                                                 # Bump when a record layout changes
+
+
+def _plain(value):
+    """Converts numpy scalars to python values and NaN to None, so records pickle without numpy."""
+    if value is None:
+        return None
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+class _SheetRecord:
+    """Mixin for records that map one row of a worksheet. _columns maps sheet columns to fields."""
+    __slots__ = ()
+    _columns = {}
+
+    @classmethod
+    def from_row(cls, row):
+        """Builds a record from a row dict. Empty cells keep the record's default."""
+        values = {name: _plain(row.get(column)) for column, name in cls._columns.items()}
+        return cls(**{name: value for name, value in values.items() if value is not None})
+
+    def to_row(self):
+        return {column: getattr(self, name) for column, name in self._columns.items()}
+
+    def fingerprint(self):
+        """Hash of the row's cells. It changes whenever any cell of the row changes."""
+        return hashlib.sha1(repr(tuple(getattr(self, name) for name in self._columns.values())).encode()).hexdigest()
+
+
+@dataclass(slots=True)
+class AgentRecord(_SheetRecord):
+    role:                   str = None
+    goal:                   str = None
+    backstory:              str = None
+    tools:                  str = None
+    allow_delegation:       bool = False
+    verbose:                bool = True
+    memory:                 bool = True
+    max_iter:               int = 15
+    model_name:             str = None
+    temperature:            float = 0.8
+    function_calling_model: str = None
+    _columns = {'Agent Role': 'role', 'Goal': 'goal', 'Backstory': 'backstory', 'Tools': 'tools',
+                'Allow delegation': 'allow_delegation', 'Verbose': 'verbose', 'Memory': 'memory',
+                'Max_iter': 'max_iter', 'Model Name': 'model_name', 'Temperature': 'temperature',
+                'Function Calling Model': 'function_calling_model'}
+
+
+@dataclass(slots=True)
+class TaskRecord(_SheetRecord):
+    name:            str = None
+    agent:           str = None
+    instructions:    str = None
+    expected_output: str = None
+    _columns = {'Task Name': 'name', 'Agent': 'agent', 'Instructions': 'instructions',
+                'Expected Output': 'expected_output'}
+
+
+@dataclass(slots=True)
+class CrewRecord(_SheetRecord):
+    team_name:       str = None
+    assignment:      str = None
+    verbose:         bool = True
+    process:         str = None
+    memory:          bool = False
+    embedding_model: str = None
+    manager_llm:     str = None
+    temperature:     float = None
+    num_ctx:         int = None
+    _columns = {'Team Name': 'team_name', 'Assignment': 'assignment', 'Verbose': 'verbose', 'Process': 'process',
+                'Memory': 'memory', 'Embedding model': 'embedding_model', 'Manager LLM': 'manager_llm',
+                't': 'temperature', 'num_ctx': 'num_ctx'}
+
+
+@dataclass(slots=True)
+class ModelRecord(_SheetRecord):
+    model:          str = None
+    num_ctx:        int = None
+    provider:       str = None
+    base_url:       str = None
+    deployment:     str = None
+    rpm:            float = None                                        # Requests per minute, None: no limit
+    tpm:            float = None                                        # Tokens per minute
+    max_concurrent: int = None                                          # Requests in flight
+    _columns = {'Model': 'model', 'Context size (local only)': 'num_ctx', 'Provider': 'provider',
+                'base_url': 'base_url', 'Deployment': 'deployment', 'RPM': 'rpm', 'TPM': 'tpm',
+                'Max concurrent': 'max_concurrent'}
+
+
+@dataclass(slots=True)
+class ToolRecord(_SheetRecord):
+    tool:            str = None
+    on:              bool = False
+    class_spec:      str = None
+    args:            str = None
+    model:           str = None
+    embedding_model: str = None
+    _columns = {'Tool': 'tool', 'On': 'on', 'Class': 'class_spec', 'Args': 'args', 'Model': 'model',
+                'Embedding Model': 'embedding_model'}
+
+
+_record_types = {'agents': AgentRecord, 'tasks': TaskRecord, 'crew': CrewRecord, 'models': ModelRecord,
+                 'tools': ToolRecord}
+
+
+@dataclass(slots=True)
+class CrewSpec:
+    """Typed snapshot of a sanitised sheet: one list of records per worksheet."""
+    agents:  list = field(default_factory=list)
+    tasks:   list = field(default_factory=list)
+    crew:    list = field(default_factory=list)
+    models:  list = field(default_factory=list)
+    tools:   list = field(default_factory=list)
+    source:  str = None
+    created: float = None
+    models_by_name: dict = field(default=None, init=False, repr=False, compare=False)   # Stripped model name -> record
+    agents_by_role: dict = field(default=None, init=False, repr=False, compare=False)   # Role -> record
+    tools_by_name:  dict = field(default=None, init=False, repr=False, compare=False)   # Tool name -> enabled record
+
+    def __post_init__(self):
+        self.reindex()
+
+    def reindex(self):
+        """Builds the name -> record indexes. Call it after changing the record lists."""
+        self.models_by_name = {}
+        for model in self.models:
+            if model.model:
+                self.models_by_name.setdefault(model.model.strip(), model)    # First row wins, like the sheet lookups
+        self.agents_by_role = {}
+        for agent in self.agents:
+            self.agents_by_role.setdefault(agent.role, agent)
+        self.tools_by_name = {tool.tool: tool for tool in self.tools if tool.on and tool.tool}
+
+    def get_model(self, name):
+        """The Models row of a model name, or None."""
+        return self.models_by_name.get(name.strip()) if isinstance(name, str) else None
+
+    def model_fingerprint(self, name):
+        """Fingerprint of the Models row of a model name, None if the model is not in the sheet."""
+        model = self.get_model(name)
+        return model.fingerprint() if model is not None else None
+
+    @classmethod
+    def from_frames(cls, agents_df, tasks_df, crew_df, models_df, tools_df, source=None):
+        """Builds a spec from the DataFrames returned by Sheets.parse_table."""
+        frames = {'agents': agents_df, 'tasks': tasks_df, 'crew': crew_df, 'models': models_df, 'tools': tools_df}
+        return cls(**{name: [_record_types[name].from_row(row) for row in frame.to_dict('records')]
+                      for name, frame in frames.items()},
+                   source=source, created=time.time())
+
+    def validate(self):
+        """Returns (errors, warnings) for references between worksheets that don't resolve."""
+        errors, warnings = [], []
+        models, roles, tools = self.models_by_name, self.agents_by_role, self.tools_by_name
+
+        if not self.crew:
+            errors.append("The Crew worksheet is empty.")
+        for agent in self.agents:
+            if not agent.model_name or agent.model_name.strip() not in models:
+                errors.append(f"Agent '{agent.role}' uses model '{agent.model_name}', which is not in the Models worksheet.")
+            if agent.function_calling_model and agent.function_calling_model.strip() not in models:
+                warnings.append(f"Agent '{agent.role}' uses function calling model '{agent.function_calling_model}', "
+                                f"which is not in the Models worksheet. The agent model will be used instead.")
+            for tool_name in (agent.tools or '').split(','):
+                if tool_name.strip() and tool_name.strip() not in tools:
+                    warnings.append(f"Agent '{agent.role}' uses tool '{tool_name.strip()}', which is not enabled in the Tools worksheet.")
+        for task in self.tasks:
+            if task.agent not in roles:
+                errors.append(f"Task '{task.name}' is assigned to '{task.agent}', which is not in the Agents worksheet.")
+        for crew in self.crew[:1]:
+            if crew.manager_llm and crew.manager_llm.strip() not in models:
+                errors.append(f"Manager LLM '{crew.manager_llm}' is not in the Models worksheet.")
+            if crew.embedding_model and crew.embedding_model.strip() not in models:
+                errors.append(f"Embedding model '{crew.embedding_model}' is not in the Models worksheet.")
+        for tool in self.tools:
+            for model in (tool.model, tool.embedding_model):
+                if tool.on and model and model.strip() not in models:
+                    errors.append(f"Tool '{tool.tool}' uses model '{model}', which is not in the Models worksheet.")
+        return errors, warnings
+
+    def save(self, path):
+        """Validates the spec and writes it to path. Raises ValueError listing every problem found."""
+        errors, warnings = self.validate()
+        for warning in warnings:
+            logger.warning(warning)
+        if errors:
+            raise ValueError("The sheet can't be compiled:\n" + "\n".join(f"- {error}" for error in errors))
+        header = {'magic': spec_magic, 'format': spec_format_version, 'app_version': AppConfig.version}
+        with open(path, 'wb') as spec_file:
+            pickle.dump(header, spec_file, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(self, spec_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        """Reads a spec written by save(). Raises ValueError if the file is not a spec of this format."""
+        with open(path, 'rb') as spec_file:
+            header = _SpecUnpickler(spec_file).load()
+            if not isinstance(header, dict) or header.get('magic') != spec_magic:
+                raise ValueError(f"'{path}' is not a compiled crew spec.")
+            if header.get('format') != spec_format_version:
+                raise ValueError(f"'{path}' was compiled by {AppConfig.name} {header.get('app_version')} in an "
+                                 f"incompatible format. Please compile the sheet again.")
+            return _SpecUnpickler(spec_file).load()
+
+
+class _SpecUnpickler(pickle.Unpickler):
+    """Only allows the record types of this module, so a spec file can't run arbitrary code when it's loaded."""
+
+    def find_class(self, module, name):
+        allowed = {cls.__name__ for cls in (CrewSpec, *_record_types.values())}
+        if module == __name__ and name in allowed:
+            return globals()[name]
+        raise pickle.UnpicklingError(f"Compiled crew specs can't contain {module}.{name}.")
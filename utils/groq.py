@@ -1,7 +1,9 @@
 from __future__ import annotations
+import os
 import time
 import logging
 import asyncio
+import re
 from typing import (Any,AsyncIterator,Iterator,List,Optional,Union)
 from langchain_core.callbacks import (AsyncCallbackManagerForLLMRun,CallbackManagerForLLMRun,)
 from langchain_core.language_models.chat_models import (agenerate_from_stream,generate_from_stream)
@@ -11,7 +13,9 @@ from langchain_core.pydantic_v1 import BaseModel
 from langchain_groq import ChatGroq
 from langchain_groq.chat_models import _convert_delta_to_message_chunk, _convert_dict_to_message 
 from rich.console import Console
-import tiktoken
+from utils.rate_limit import TokenBucket, AsyncRateLimiter, bucket_key, _off_loop
+from utils.token_count import get_token_counter
+from config.config import GroqConfig
 #from tiktoken.core import Encoding
 #from tiktoken.model import encoding_for_model, encoding_name_for_model
 #from tiktoken.registry import get_encoding, list_encoding_names
@@ -19,8 +23,28 @@ import tiktoken
 console = Console()
 logger = logging.getLogger(__name__)
 
+def parse_duration(value):
+    """Seconds of a rate limit reset header like '7.66s', '2m59.56s' or '120ms', None if it can't be parsed."""
+    if value is None:
+        return None
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", str(value))
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(number) * {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}[unit] for number, unit in parts)
+
+
 class Throttle:
-    def __init__(self, rate_limit:int = None, average_token_length:int=5, model_name='gpt-4'):
+    """
+    Limits the requests and the tokens per minute sent to a model with two TokenBuckets, shared by every
+    process on the host that uses the same API key and model (see RateLimitConfig for the backend).
+    The buckets start from GroqConfig and calibrate themselves from the x-ratelimit-* response headers.
+    """
+    def __init__(self, rate_limit:int = None, average_token_length:int=5, model_name='gpt-4', api_key=None, backend=None,
+                 request_limit:int = None, estimator:str = None):
+        self.rate_limit = None
         try:
             if rate_limit is None:
                 logger.debug("Rate limit for Grog is not set. Not throtelling.")
@@ -28,134 +52,157 @@ class Throttle:
                 logger.debug("Rate limit for Grog is set. Setting up throtelling.")
                 self.model_name = model_name
                 self.rate_limit = rate_limit
-                self.enc = tiktoken.encoding_for_model(model_name)
+                # Estimate only, Groq models have no tiktoken encoding. Counts are memoised per message
+                self.counter = get_token_counter(estimator or GroqConfig.token_estimator)
                 self.average_token_length = average_token_length
-                self.last_time_called = time.time()
-                self.ratelimit_remaining_tokens = self.rate_limit
-                
+                key = bucket_key(api_key, model_name)
+                self.tokens_bucket = TokenBucket(f"{key}:tokens", capacity=rate_limit, period=60, backend=backend)
+                self.requests_bucket = TokenBucket(f"{key}:requests", capacity=request_limit, period=60,
+                                                   backend=backend) if request_limit else None
+                self.async_limiter = AsyncRateLimiter()                 # FIFO queue for _agenerate and _astream
+
                 logger.debug(f"/nThrottle Rate limit: {self.rate_limit}")
                 logger.debug(f"Average token length : {self.average_token_length}")
         except Exception as e:
+            self.rate_limit = None
             logger.error(f"Failed to configure Throttle: {e}")
 
-        
     def calculate_tokens(self, text=None):
         """Estimate number of tokens using the specific encoding model."""
-        if text is None:
+        if text is None or self.rate_limit is None:
             return 0
-        try:
-            encoded_text = self.enc.encode(text)
-            token_count = len(encoded_text)* 1.1                        #10$ safety margin
-            logging.debug(f"Text: {text}")
-            logging.debug(f"Token count: {token_count}")
-            if token_count > self.rate_limit:
-                exception = Exception(f"Token count exceeds rate limit: Token count:{token_count} Rate limit: {self.rate_limit} \n\
-                                      Please reduce the text length or increase the rate limit.")   
-                raise exception
-
-            return token_count
-        except Exception as e:
-            logging.error(f"Failed to calculate tokens: {e}")
+        return self._checked(self.counter.count_text(text))
+
+    def count_messages(self, messages):
+        """Estimated tokens of a conversation. Only messages not seen before are encoded."""
+        if self.rate_limit is None:
             return 0
+        return self._checked(self.counter.count_messages(messages))
 
-        
-    # def calculate_tokens(self, text = None):
-    #     """Estimate number of tokens based on text length."""       #Todo, use a better tokenization method
-    #     try:
-    #         if text is None:
-    #             return 0
-    #         else:
-    #             #logger.debug(text)
-    #             #logger.debug(f"Token length: {len(text) // self.average_token_length}")
-    #             return len(str(text)) // self.average_token_length
-    #     except Exception as e:
-    #         logger.error(f"Failed to calculate tokens: {e}")
-    #         return 0
-        
-    def _update_tokens(self):
-        """Update tokens based on elapsed time."""
-        try:
-            if self.rate_limit is None:                                     #Don't throttle if rate limit is not set
-                return
-            
-            now = time.time() 
-            elapsed = int(now - self.last_time_called)                      #Elapsed time in seconds 
-            tps = self.rate_limit // 60                                     #Tokens per second accumulated
-            self.ratelimit_remaining_tokens += elapsed * tps                        #Accumulated tokens sine last call   
-            self.last_time_called = now                                     #Update last call time
-            logger.debug(f"ratelimit_remaining_tokens:{self.ratelimit_remaining_tokens}")
-        except Exception as e:
-            logger.error(f"Failed to update tokens: {e}")
+    def _checked(self, token_count):
+        logging.debug(f"Token count: {token_count}")
+        if token_count > self.rate_limit:
+            logging.error(f"Failed to calculate tokens: Token count exceeds rate limit: Token count:{token_count} "
+                          f"Rate limit: {self.rate_limit}. Please reduce the text length or increase the rate limit.")
             return 0
+        return token_count
+
+    def _reserve(self, tokens_needed):
+        """Reserves a request and the tokens, returns the seconds to wait until both are available."""
+        wait = self.tokens_bucket.reserve(tokens_needed)
+        if self.requests_bucket is not None:
+            wait = max(wait, self.requests_bucket.reserve(1))
+        return wait
 
     def wait(self, tokens_needed: int):
         """Delay execution to respect the throttle limit."""
+        if self.rate_limit is None:                                     #Don't throttle if rate limit is not set
+            return
         try:
-            if self.rate_limit is None:                                     #Don't throttle if rate limit is not set    
-                return
-            
-            self._update_tokens()
-
-            if self.ratelimit_remaining_tokens >= tokens_needed:                    # If accumulated tokens exceed the needed
-                self.ratelimit_remaining_tokens -= tokens_needed                    # Deduct the tokens needed
-                return                                                      # No need to wait
-
-            # Calculate sleep time to accumulate needed tokens
-            tps = self.rate_limit // 60                                     # Tokens per second
-            tokens_defecit = tokens_needed - self.ratelimit_remaining_tokens         
-            sleep_time = tokens_defecit // tps                              
-            logger.debug(f"tokens_needed: {tokens_needed}")
-            logger.debug(f"sleep_time: {sleep_time}")
-            time.sleep(sleep_time)
-
-            self._update_tokens()                                           # Update tokens after sleep
-            self.ratelimit_remaining_tokens -= tokens_needed
+            sleep_time = self._reserve(tokens_needed)
+            logger.debug(f"tokens_needed: {tokens_needed}, sleep_time: {sleep_time}")
         except Exception as e:
             logger.error(f"Failed to wait: {e}")
-            return 0
+            return
+        if sleep_time > 0:
+            time.sleep(sleep_time)
 
     async def await_(self, tokens_needed: int):
-        """Asynchronous version of the wait."""
+        """Asynchronous version of the wait. Coroutines are served in FIFO order and can be cancelled while waiting."""
+        if self.rate_limit is None:                                     #Don't throttle if rate limit is not set
+            return
+        demands = [(self.tokens_bucket, tokens_needed)]
+        if self.requests_bucket is not None:
+            demands.append((self.requests_bucket, 1))
         try:
-            if self.rate_limit is None:                                     #Don't throttle if rate limit is not set    
-                return
-            
-            self._update_tokens()
-
-            if self.ratelimit_remaining_tokens >= tokens_needed:                    # If accumulated tokens exceed the needed
-                self.ratelimit_remaining_tokens -= tokens_needed                    # Deduct the tokens needed
-                return                                                      # No need to wait
-
-            # Calculate sleep time to accumulate needed tokens
-            tps = self.rate_limit // 60                                     # Tokens per second
-            tokens_defecit = tokens_needed - self.ratelimit_remaining_tokens         
-            sleep_time = tokens_defecit // tps                              
-            logger.debug(f"tokens_needed: {tokens_needed}")
-            logger.debug(f"sleep_time: {sleep_time}")
-            
-            await asyncio.sleep(sleep_time)
-
-            # Update tokens after sleep and adjust for token usage
-            self._update_tokens()
-            self.ratelimit_remaining_tokens -= tokens_needed
+            sleep_time = await self.async_limiter.acquire(demands)
+            logger.debug(f"tokens_needed: {tokens_needed}, sleep_time: {sleep_time}")
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logger.error(f"Failed to await: {e}")
-            return 0    
+
+    def settle(self, tokens_reserved, token_usage):
+        """Corrects the reservation with the tokens the API reports as used: returns unused ones, takes extra ones."""
+        if self.rate_limit is None or not token_usage or token_usage.get('total_tokens') is None:
+            return
+        try:
+            difference = tokens_reserved - token_usage['total_tokens']
+            if difference > 0:
+                self.tokens_bucket.release(difference)
+            elif difference < 0:
+                self.tokens_bucket.reserve(-difference)                 # Already used, only lowers the balance
+        except Exception as e:
+            logger.error(f"Failed to settle tokens: {e}")
+
+    async def asettle(self, tokens_reserved, token_usage):
+        """Asynchronous version of settle. A shared backend is called from a worker thread."""
+        if self.rate_limit is not None:
+            await _off_loop(self.tokens_bucket.backend, self.settle, tokens_reserved, token_usage)
+
+    def calibrate(self, headers):
+        """Adjusts both buckets to the x-ratelimit-limit/remaining/reset-* headers of a response."""
+        if self.rate_limit is None or not headers:
+            return
+        for kind, bucket in (('tokens', self.tokens_bucket), ('requests', self.requests_bucket)):
+            limit, remaining = headers.get(f'x-ratelimit-limit-{kind}'), headers.get(f'x-ratelimit-remaining-{kind}')
+            if bucket is None or limit is None or remaining is None:
+                continue
+            try:
+                bucket.calibrate(float(limit), float(remaining), parse_duration(headers.get(f'x-ratelimit-reset-{kind}')))
+            except (ValueError, TypeError) as e:
+                logger.debug(f"Ignoring rate limit headers for {kind}: {e}")
+
+    async def acalibrate(self, headers):
+        """Asynchronous version of calibrate."""
+        if self.rate_limit is not None and headers:
+            await _off_loop(self.tokens_bucket.backend, self.calibrate, headers)
 
 
 class TokenThrottledChatGroq(ChatGroq):
-    def __init__(self, *args, rate_limit: Optional[int], **kwargs):
+    def __init__(self, *args, rate_limit: Optional[int], request_limit: Optional[int] = None, **kwargs):
         super().__init__(*args, **kwargs)                   # Call the parent class constructor with additional arguments
         
         # SET UP THROTTLE
         self.rate_limit = rate_limit if rate_limit else None
-        self.throttle = Throttle(rate_limit=self.rate_limit)
+        api_key = self.groq_api_key.get_secret_value() if self.groq_api_key else os.environ.get("GROQ_API_KEY")
+        self.throttle = Throttle(rate_limit=self.rate_limit, model_name=self.model_name, api_key=api_key,
+                                 request_limit=request_limit)
     
     # OVERRIDE pydantic_v1 BaseModel
     rate_limit: Optional[int] = None 
     throttle: Throttle = Throttle(rate_limit=None)
     """Throttle settings for token generation."""    
 
+    def _tokens_needed(self, messages: List[BaseMessage]) -> float:
+        """Tokens to reserve for a request: the estimated input plus max_tokens, assuming we will get them all."""
+        return self.throttle.count_messages(messages) + (self.max_tokens or 0)
+
+    def _streamed_usage(self, tokens_reserved, texts):
+        """Usage of a stream that didn't report it: the reservation minus the max_tokens that were not generated."""
+        if self.throttle.rate_limit is None:
+            return None
+        completion_tokens = self.throttle.counter.count_text("".join(texts))
+        return {'total_tokens': tokens_reserved - max(0.0, (self.max_tokens or 0) - completion_tokens)}
+
+    def _create(self, message_dicts, params):
+        """Sends a request and calibrates the throttle from the rate limit headers of the response."""
+        raw_client = getattr(self.client, 'with_raw_response', None)
+        if raw_client is None:
+            return self.client.create(messages=message_dicts, **params)
+        raw_response = raw_client.create(messages=message_dicts, **params)
+        self.throttle.calibrate(raw_response.headers)
+        return raw_response.parse()
+
+    async def _acreate(self, message_dicts, params):
+        """Asynchronous version of _create."""
+        raw_client = getattr(self.async_client, 'with_raw_response', None)
+        if raw_client is None:
+            return await self.async_client.create(messages=message_dicts, **params)
+        raw_response = await raw_client.create(messages=message_dicts, **params)
+        await self.throttle.acalibrate(raw_response.headers)
+        return await raw_response.parse() if asyncio.iscoroutinefunction(raw_response.parse) else raw_response.parse()
+
     def _generate(
         self,
         messages: List[BaseMessage],
@@ -163,29 +210,26 @@ class TokenThrottledChatGroq(ChatGroq):
         run_manager: Optional[CallbackManagerForLLMRun] = None,
         **kwargs: Any,
     ) -> ChatResult:
-        
-        #Throttle
-        #for message in messages:
-        #    logger.debug("Debug: Type of message.content is", type(message.content))
-        #    logger.debug("Debug: message.content is", message.content)
-
-        input_text = ""
-        for message in messages:
-            input_text = input_text + message.content
-        input_tokens = self.throttle.calculate_tokens(input_text)  # Simplistic token count for input
-        total_tokens = input_tokens + self.max_tokens                       #Assume we will get max_tokens
-        self.throttle.wait(total_tokens)
-        
-        if self.streaming:
+        if self.streaming:                                              # _stream throttles itself
             stream_iter = self._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
             return generate_from_stream(stream_iter)
+
+        #Throttle
+        total_tokens = self._tokens_needed(messages)
+        self.throttle.wait(total_tokens)
+
         message_dicts, params = self._create_message_dicts(messages, stop)
         params = {**params, **kwargs}
-        response = self.client.create(messages=message_dicts, **params)
+        try:
+            response = self._create(message_dicts, params)
+        except Exception:
+            self.throttle.settle(total_tokens, {'total_tokens': 0})     # Rejected, e.g. 429, or lost: retried later
+            raise
         #logger.debug("Response: ", response)
 
-
-        return self._create_chat_result(response)
+        result = self._create_chat_result(response)
+        self.throttle.settle(total_tokens, result.llm_output.get("token_usage"))
+        return result
 
     async def _agenerate(
         self,
@@ -194,31 +238,29 @@ class TokenThrottledChatGroq(ChatGroq):
         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
         **kwargs: Any,
     ) -> ChatResult:
-        #Throttle
-        #for message in messages:
-        #    logger.debug("Debug: Type of message.content is", type(message.content))
-        #    logger.debug("Debug: message.content is", message.content)
-
-        input_text = ""
-        for message in messages:
-            input_text = input_text + message.content
-        input_tokens = self.throttle.calculate_tokens(input_text)  # Simplistic token count for input
-        total_tokens = input_tokens + self.max_tokens
-        self.throttle.await_(total_tokens)  
-        
-        if self.streaming:
+        if self.streaming:                                              # _astream throttles itself
             stream_iter = self._astream(messages, stop=stop, run_manager=run_manager, **kwargs)
             return await agenerate_from_stream(stream_iter)
 
+        #Throttle
+        total_tokens = self._tokens_needed(messages)
+        await self.throttle.await_(total_tokens)
+
         message_dicts, params = self._create_message_dicts(messages, stop)
         params = {
             **params,
             **kwargs,
         }
-        response = await self.async_client.create(messages=message_dicts, **params)
+        try:
+            response = await self._acreate(message_dicts, params)
+        except Exception:
+            await self.throttle.asettle(total_tokens, {'total_tokens': 0})
+            raise
         #logger.debug("Response: ", response)
         #logger.debug("Response type: ", type(response))
-        return self._create_chat_result(response)
+        result = self._create_chat_result(response)
+        await self.throttle.asettle(total_tokens, result.llm_output.get("token_usage"))
+        return result
 
     def _stream(
         self,
@@ -228,25 +270,20 @@ class TokenThrottledChatGroq(ChatGroq):
         **kwargs: Any,
     ) -> Iterator[ChatGenerationChunk]:
         #Throttle
-        #for message in messages:
-        #    logger.debug("Debug: Type of message.content is", type(message.content))
-        #    logger.debug("Debug: message.content is", message.content)
-
-        input_text = ""
-        for message in messages:
-            input_text = input_text + message.content
-        input_tokens = self.throttle.calculate_tokens(input_text)  # Simplistic token count for input
-        total_tokens = input_tokens + self.max_tokens  
+        total_tokens = self._tokens_needed(messages)
         self.throttle.wait(total_tokens)
 
         message_dicts, params = self._create_message_dicts(messages, stop)
 
         # groq api does not support streaming with tools yet
         if "tools" in kwargs:
-            response = self.client.create(
-                messages=message_dicts, **{**params, **kwargs}
-            )
+            try:
+                response = self._create(message_dicts, {**params, **kwargs})
+            except Exception:
+                self.throttle.settle(total_tokens, {'total_tokens': 0})
+                raise
             chat_result = self._create_chat_result(response)
+            self.throttle.settle(total_tokens, chat_result.llm_output.get("token_usage"))
             generation = chat_result.generations[0]
             message = generation.message
             tool_call_chunks = [
@@ -279,27 +316,37 @@ class TokenThrottledChatGroq(ChatGroq):
         params = {**params, **kwargs, "stream": True}
 
         default_chunk_class = AIMessageChunk
-        for chunk in self.client.create(messages=message_dicts, **params):
-            if not isinstance(chunk, dict):
-                chunk = chunk.dict()
-            if len(chunk["choices"]) == 0:
-                continue
-            choice = chunk["choices"][0]
-            chunk = _convert_delta_to_message_chunk(choice["delta"], AIMessageChunk)
-            generation_info = {}
-            if finish_reason := choice.get("finish_reason"):
-                generation_info["finish_reason"] = finish_reason
-            logprobs = choice.get("logprobs")
-            if logprobs:
-                generation_info["logprobs"] = logprobs
-            default_chunk_class = chunk.__class__
-            chunk = ChatGenerationChunk(
-                message=chunk, generation_info=generation_info or None
-            )
-
-            if run_manager:
-                run_manager.on_llm_new_token(chunk.text, chunk=chunk, logprobs=logprobs)
-            yield chunk
+        usage, texts = None, []
+        try:
+            for chunk in self._create(message_dicts, params):
+                if not isinstance(chunk, dict):
+                    chunk = chunk.dict()
+                usage = (chunk.get("x_groq") or {}).get("usage") or usage   # Sent with the last chunk
+                if len(chunk["choices"]) == 0:
+                    continue
+                choice = chunk["choices"][0]
+                chunk = _convert_delta_to_message_chunk(choice["delta"], AIMessageChunk)
+                generation_info = {}
+                if finish_reason := choice.get("finish_reason"):
+                    generation_info["finish_reason"] = finish_reason
+                logprobs = choice.get("logprobs")
+                if logprobs:
+                    generation_info["logprobs"] = logprobs
+                default_chunk_class = chunk.__class__
+                chunk = ChatGenerationChunk(
+                    message=chunk, generation_info=generation_info or None
+                )
+                texts.append(chunk.text)
+
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.text, chunk=chunk, logprobs=logprobs)
+                yield chunk
+        except Exception:
+            if not texts:
+                usage = {'total_tokens': 0}                             # Rejected before anything was generated
+            raise
+        finally:
+            self.throttle.settle(total_tokens, usage or self._streamed_usage(total_tokens, texts))
 
     async def _astream(
         self,
@@ -308,27 +355,22 @@ class TokenThrottledChatGroq(ChatGroq):
         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
         **kwargs: Any,
     ) -> AsyncIterator[ChatGenerationChunk]:
-               #Throttle
-        #for message in messages:
-        #    logger.debug("Debug: Type of message.content is", type(message.content))
-        #    logger.debug("Debug: message.content is", message.content)
-
-        input_text = ""
-        for message in messages:
-            input_text = input_text + message.content
-        input_tokens = self.throttle.calculate_tokens(input_text)  # Simplistic token count for input
-        total_tokens = input_tokens + self.max_tokens
-        self.throttle.wait(total_tokens) 
+        #Throttle
+        total_tokens = self._tokens_needed(messages)
+        await self.throttle.await_(total_tokens)
 
         
         message_dicts, params = self._create_message_dicts(messages, stop)
 
         # groq api does not support streaming with tools yet
         if "tools" in kwargs:
-            response = await self.async_client.create(
-                messages=message_dicts, **{**params, **kwargs}
-            )
+            try:
+                response = await self._acreate(message_dicts, {**params, **kwargs})
+            except Exception:
+                await self.throttle.asettle(total_tokens, {'total_tokens': 0})
+                raise
             chat_result = self._create_chat_result(response)
+            await self.throttle.asettle(total_tokens, chat_result.llm_output.get("token_usage"))
             generation = chat_result.generations[0]
             message = generation.message
             tool_call_chunks = [
@@ -361,33 +403,41 @@ class TokenThrottledChatGroq(ChatGroq):
         params = {**params, **kwargs, "stream": True}
 
         default_chunk_class = AIMessageChunk
-        async for chunk in await self.async_client.create(
-            messages=message_dicts, **params
-        ):
-            if not isinstance(chunk, dict):
-                chunk = chunk.dict()
-            if len(chunk["choices"]) == 0:
-                continue
-            choice = chunk["choices"][0]
-            chunk = _convert_delta_to_message_chunk(
-                choice["delta"], default_chunk_class
-            )
-            generation_info = {}
-            if finish_reason := choice.get("finish_reason"):
-                generation_info["finish_reason"] = finish_reason
-            logprobs = choice.get("logprobs")
-            if logprobs:
-                generation_info["logprobs"] = logprobs
-            default_chunk_class = chunk.__class__
-            chunk = ChatGenerationChunk(
-                message=chunk, generation_info=generation_info or None
-            )
-
-            if run_manager:
-                await run_manager.on_llm_new_token(
-                    token=chunk.text, chunk=chunk, logprobs=logprobs
+        usage, texts = None, []
+        try:
+            async for chunk in await self._acreate(message_dicts, params):
+                if not isinstance(chunk, dict):
+                    chunk = chunk.dict()
+                usage = (chunk.get("x_groq") or {}).get("usage") or usage
+                if len(chunk["choices"]) == 0:
+                    continue
+                choice = chunk["choices"][0]
+                chunk = _convert_delta_to_message_chunk(
+                    choice["delta"], default_chunk_class
+                )
+                generation_info = {}
+                if finish_reason := choice.get("finish_reason"):
+                    generation_info["finish_reason"] = finish_reason
+                logprobs = choice.get("logprobs")
+                if logprobs:
+                    generation_info["logprobs"] = logprobs
+                default_chunk_class = chunk.__class__
+                chunk = ChatGenerationChunk(
+                    message=chunk, generation_info=generation_info or None
                 )
-            yield chunk
+                texts.append(chunk.text)
+
+                if run_manager:
+                    await run_manager.on_llm_new_token(
+                        token=chunk.text, chunk=chunk, logprobs=logprobs
+                    )
+                yield chunk
+        except Exception:
+            if not texts:
+                usage = {'total_tokens': 0}
+            raise
+        finally:
+            await self.throttle.asettle(total_tokens, usage or self._streamed_usage(total_tokens, texts))
 
     def _create_chat_result(self, response: Union[dict, BaseModel]) -> ChatResult:
         generations = []
@@ -410,6 +460,4 @@ class TokenThrottledChatGroq(ChatGroq):
             "system_fingerprint": response.get("system_fingerprint", ""),
         }
         #logger.debug("token_usage: ", token_usage)
-        self.throttle.ratelimit_remaining_tokens += self.max_tokens - token_usage['total_tokens'] #Trottle: release unused tokens TODO: call function
-        self.throttle._update_tokens()
         return ChatResult(generations=generations, llm_output=llm_output) 
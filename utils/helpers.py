@@ -38,7 +38,7 @@ To get you started, copy this sheet template and create your agents and tasks. I
     console.print("\n")
 
 
-def after_read_sheet_print(agents_df, tasks_df):
+def after_read_sheet_print(agents, tasks):
     console = Console()
     terminal_width = console.width  # Get the current width of the terminal
     terminal_width = max(terminal_width, 120)
@@ -52,9 +52,9 @@ def after_read_sheet_print(agents_df, tasks_df):
     agents_table.add_column("Goal", width=goal_width)
     agents_table.add_column("Backstory", width=backstory_width)
 
-    for index, row in agents_df.iterrows():
+    for agent in agents:
         agents_table.add_row()
-        agents_table.add_row(row['Agent Role'], row['Goal'], row['Backstory'])
+        agents_table.add_row(agent.role, agent.goal, agent.backstory)
 
 
     # Tasks Table
@@ -66,9 +66,9 @@ def after_read_sheet_print(agents_df, tasks_df):
     tasks_table.add_column("Agent", width=agent_width)
     tasks_table.add_column("Instructions", width=instructions_width)
 
-    for index, row in tasks_df.iterrows():
+    for task in tasks:
         tasks_table.add_row()
-        tasks_table.add_row(row['Task Name'], row['Agent'], row['Instructions'])
+        tasks_table.add_row(task.name, task.agent, task.instructions)
 
     
     console.print("\nI found these agents and tasks in the google sheet. Let's get your crew runing:")
@@ -126,9 +126,18 @@ def is_valid_google_sheets_url(url):
         print(f"The computer says: Error parsing URL... {e}")
         return False
 
+workbook_extensions = ('.xlsx', '.xlsm', '.ods')
+
+def is_local_workbook(path):
+    """True for an existing .xlsx/.xlsm/.ods workbook or a directory of worksheet CSV files."""
+    if not path:
+        return False
+    path = os.path.expanduser(path)
+    return os.path.isdir(path) or (os.path.isfile(path) and path.lower().endswith(workbook_extensions))
+
 def get_sheet_url_from_user():
-    sheet_url = input("Let's copy paste the Google Sheet url and get started: ")
-    while not is_valid_google_sheets_url(sheet_url):
+    sheet_url = input("Let's copy paste the Google Sheet url (or the path to a workbook) and get started: ")
+    while not (is_local_workbook(sheet_url) or is_valid_google_sheets_url(sheet_url)):
         sheet_url = input("Could you doule check the URL? This silly box is saying it's invalid :/ : ")
     return sheet_url
 
@@ -1,46 +1,181 @@
 import logging
 logger = logging.getLogger(__name__)
 logger.debug(f"Entered {__file__}")
+import ast
+import os
+import sys
+import json
+import hashlib
 import pkgutil
 import importlib
+import importlib.util
+import importlib.metadata
 
 logger = logging.getLogger(__name__)
 logger.debug(f"Entered the module {__file__}")
 #from utils.helpers import load_env
 #load_env("../../ENV/.env", ["OPENAI_API_KEY","OPENAI_BASE_URL"])
 
-def import_package_modules(package, modules_list, integration_dict, recursive=False):
+_manifest_format_version = 1                                            # Bump when the manifest entry layout changes
+
+
+def _public_names(module_path, origin):
+    """
+    Parses the source of a module without importing it and yields (name, kind) for every public
+    top level member: classes, functions, assignments and re-exported imports.
+    """
+    try:
+        with open(origin, 'rb') as source_file:
+            tree = ast.parse(source_file.read(), filename=origin)
+    except (OSError, SyntaxError, ValueError) as e:
+        logger.warning(f"Failed to scan {module_path}: {e}")
+        return
+
+    statements = list(tree.body)
+    while statements:
+        node = statements.pop(0)
+        if isinstance(node, ast.Try):                                   # try: import x except ImportError: ...
+            statements[:0] = node.body
+            continue
+        if isinstance(node, ast.ClassDef):
+            yield node.name, "class"
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            yield node.name, "function"
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    yield target.id, "attribute"
+        elif isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+            yield node.target.id, "attribute"
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                if alias.name != '*':
+                    yield (alias.asname or alias.name).split('.')[0], "import"
+
+
+def _iter_module_specs(package_name, recursive):
+    """Yields the specs of a package's submodules by walking the file system, nothing is imported."""
+    try:
+        spec = importlib.util.find_spec(package_name)
+    except ModuleNotFoundError:                                         # A parent package is missing
+        spec = None
+    if spec is None:
+        logger.warning(f"Package {package_name} is not installed.")
+        return
+    if not recursive or spec.submodule_search_locations is None:
+        yield spec
+        return
+
+    pending = [(list(spec.submodule_search_locations), package_name)]
+    while pending:
+        search_locations, prefix = pending.pop(0)
+        for module_info in pkgutil.iter_modules(search_locations, prefix=prefix + '.'):
+            module_spec = module_info.module_finder.find_spec(module_info.name)
+            if module_spec is None:
+                continue
+            yield module_spec
+            if module_info.ispkg and module_spec.submodule_search_locations:
+                pending.append((list(module_spec.submodule_search_locations), module_info.name))
+
+
+def scan_package_modules(package_name, alias=None, recursive=False):
     """
-    Dynamically imports all submodules from the specified package, appends them to modules_list,
-    and populates an integration dictionary with all public members of the modules.
+    Builds a manifest of the public members of a package by reading module sources instead of
+    importing them, so that only the modules that are actually used need to be imported later.
 
     Args:
-        package (module): The package from which to import all submodules.
-        modules_list (list): List to which module references will be appended.
-        integration_dict (dict): Dictionary to which public module members are added.
-        recursive (bool): If True, imports submodules recursively.
+        package_name (str): Dotted name of the package to scan.
+        alias (str): Prefix used for qualified names instead of the module path.
+        recursive (bool): If True, scans all submodules of the package instead of the package itself.
 
     Returns:
-        None: Modifies modules_list and integration_dict in-place.
+        list: Manifest entries as (qualified_name, name, module_path, kind) tuples.
     """
-    package_path = package.__path__  # This gets the package path iterable
-    package_name = package.__name__  # Get the full package name
+    manifest = []
+    for spec in _iter_module_specs(package_name, recursive):
+        if not spec.origin or not spec.origin.endswith('.py'):
+            logger.debug(f"Skipping {spec.name}, no python source to scan.")
+            continue
+        prefix = alias if alias else spec.name
+        for name, kind in _public_names(spec.name, spec.origin):
+            if not name.startswith('_'):
+                manifest.append((f"{prefix}.{name}", name, spec.name, kind))
+        logger.info(f"Scanned module: {spec.name}")
+    return manifest
+
 
-    # Iterate through the package modules
-    for loader, name, ispkg in pkgutil.walk_packages(package_path, prefix=package_name + '.'):
+def _package_version(package_name):
+    """
+    Returns the installed distribution version of a package's top level package. Local packages that are
+    not installed get a fingerprint of their sources instead, so edits invalidate the cache as well.
+    """
+    top_level = package_name.split('.')[0]
+    for distribution in (top_level, top_level.replace('_', '-')):
         try:
-            module = importlib.import_module(name)
-            modules_list.append((module, name))
-            # Integrate public members, irrespective of whether the module is a package
-            for attr_name in dir(module):
-                if not attr_name.startswith('_'):  # Include only public members
-                    obj = getattr(module, attr_name)
-                    integration_dict[attr_name] = obj
-
-            logger.info(f"Imported and added module: {name}")
-            # Recursively import submodules if it is a package and recursive is True
-            if recursive and ispkg:
-                import_package_modules(module, modules_list, integration_dict, recursive=True)
-        except ImportError as e:
-            logger.warning(f"Failed to import {name}: {e}")
+            return importlib.metadata.version(distribution)
+        except importlib.metadata.PackageNotFoundError:
+            continue
+
+    spec = importlib.util.find_spec(top_level)
+    if spec is None:
+        return None
+    locations = spec.submodule_search_locations or [os.path.dirname(spec.origin)]
+    fingerprint = hashlib.sha1()
+    for location in locations:
+        for root, dirs, files in os.walk(location):
+            dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+            for file_name in sorted(files):
+                if file_name.endswith('.py'):
+                    stat = os.stat(os.path.join(root, file_name))
+                    fingerprint.update(f"{root}/{file_name}:{stat.st_mtime_ns}:{stat.st_size}".encode())
+    return f"src-{fingerprint.hexdigest()}"
 
+
+def _manifest_cache_key(packages_list):
+    """Key of the cached manifest: the package configuration, their installed versions and the python version."""
+    return {
+        'format':   _manifest_format_version,
+        'python':   sys.version.split()[0],
+        'packages': [[name, alias, recursive, _package_version(name)] for name, alias, recursive in packages_list],
+    }
+
+
+def load_package_manifest(packages_list, cache_path=None):
+    """
+    Returns the manifest of all packages in packages_list (see scan_package_modules), reusing the manifest
+    cached at cache_path as long as the installed versions of the packages did not change.
+
+    Args:
+        packages_list (list): (package_name, alias, recursive) tuples.
+        cache_path (str): JSON file the manifest is cached in. None disables the cache.
+
+    Returns:
+        list: Manifest entries as (qualified_name, name, module_path, kind) tuples.
+    """
+    key = _manifest_cache_key(packages_list) if cache_path else None
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as cache_file:
+                cached = json.load(cache_file)
+            if cached.get('key') == key:
+                logger.info(f"Loaded registry manifest from {cache_path}.")
+                return [tuple(entry) for entry in cached['entries']]
+            logger.info(f"Registry manifest at {cache_path} is outdated, rebuilding it.")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Failed to read registry manifest {cache_path}: {e}")
+
+    manifest = []
+    for package_name, alias, recursive in packages_list:
+        manifest.extend(scan_package_modules(package_name, alias=alias, recursive=recursive))
+
+    if cache_path:
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            temp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as cache_file:
+                json.dump({'key': key, 'entries': manifest}, cache_file)
+            os.replace(temp_path, cache_path)                           # Atomic, concurrent runs never see half a file
+            logger.info(f"Saved registry manifest to {cache_path}.")
+        except OSError as e:
+            logger.warning(f"Failed to save registry manifest {cache_path}: {e}")
+    return manifest
@@ -0,0 +1,399 @@
+import   logging
+logger = logging.getLogger(__name__)
+from     config.config import LLMLimitsConfig, RetryConfig
+from     utils.rate_limit import TokenBucket, AsyncRateLimiter, _off_loop
+from     utils.llm_retry import next_delay
+from     utils.token_count import get_token_counter
+from     contextlib import contextmanager, asynccontextmanager
+import   asyncio
+import   collections
+import   contextvars
+import   threading
+import   time
+
+# Client side limits for the LLM of any provider. get_llm wraps its LLM in a subclass created on the fly,
+# whose _generate, _agenerate, _stream and _astream run inside the limits of an LLMLimiter and are retried
+# with backoff when the provider fails with 429, 5xx or a dropped connection (see utils/llm_retry.py).
+
+_active = contextvars.ContextVar('llm_limits_active', default=frozenset())   # Limiters whose provider call is running here
+
+
+@contextmanager
+def _holding(limiter):
+    """Marks limiter as running its provider call in this context, so a nested call of the same model, e.g.
+    _agenerate -> _astream, neither takes its limits again nor retries. Set only around the call itself."""
+    token = _active.set(_active.get() | {limiter})
+    try:
+        yield
+    finally:
+        _active.reset(token)
+
+
+def _nested(limiter):
+    return limiter in _active.get()
+
+
+class ConcurrencyLimiter:
+    """
+    Semaphore for threads and coroutines alike, serving them in arrival order. The limit can be changed while
+    calls are in flight: lowering it lets the running calls finish, raising it wakes waiters right away.
+    """
+
+    def __init__(self, limit):
+        self.limit = max(1, int(limit))
+        self.active = 0
+        self._waiters = collections.deque()                             # threading.Event or (loop, future)
+        self._lock = threading.Lock()
+
+    def _wake(self):
+        while self._waiters and self.active < self.limit:
+            waiter = self._waiters.popleft()
+            self.active += 1                                            # The slot is handed over to the waiter
+            if isinstance(waiter, threading.Event):
+                waiter.set()
+            else:
+                loop, future = waiter
+                loop.call_soon_threadsafe(lambda future=future: future.done() or future.set_result(None))
+
+    def acquire(self):
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                return
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+        waiter.wait()
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    waiter = None
+            if waiter is not None:                                      # Got the slot while being cancelled
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+            self._wake()
+
+    def set_limit(self, limit):
+        with self._lock:
+            self.limit = max(1, int(limit))
+            self._wake()
+
+
+class LLMLimiter:
+    """
+    Limits of one model. Requests and tokens per minute come from TokenBuckets shared by every process on
+    the host (see RateLimitConfig), requests in flight are limited per process. The concurrency adapts AIMD
+    style: cut by RetryConfig.decrease_factor when the provider is saturated, raised by one after a limit's
+    worth of successful calls, up to max_concurrent. A model without max_concurrent gets a concurrency
+    limit the first time its provider is saturated.
+    """
+
+    def __init__(self, key, rpm=None, tpm=None, max_concurrent=None, backend=None):
+        self.key = key
+        self.rpm, self.tpm, self.max_concurrent = rpm, tpm, max_concurrent
+        self.requests_bucket = TokenBucket(f"{key}:requests", rpm, 60, backend) if rpm else None
+        self.tokens_bucket = TokenBucket(f"{key}:tokens", tpm, 60, backend) if tpm else None
+        self.concurrency = ConcurrencyLimiter(max_concurrent) if max_concurrent else None
+        self.async_limiter = AsyncRateLimiter()
+        self.counter = get_token_counter(LLMLimitsConfig.token_estimator) if tpm else None
+        self.ceiling = max_concurrent or RetryConfig.max_concurrency   # Highest concurrency AIMD goes back up to
+        self.in_flight = 0
+        self.successes = 0                                              # Since the concurrency last changed
+        self.decreased_at = 0.0
+        self.calls = 0
+        self.waited_seconds = 0.0                                       # Waiting for a slot or for the buckets
+        self._lock = threading.Lock()
+
+    def saturated(self):
+        """Multiplicative decrease, at most once per RetryConfig.decrease_cooldown."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self.decreased_at < RetryConfig.decrease_cooldown:
+                return
+            self.decreased_at, self.successes = now, 0
+            if self.concurrency is None:                                # Calls already running are not counted
+                self.concurrency = ConcurrencyLimiter(max(1, int(self.in_flight * RetryConfig.decrease_factor)))
+            else:
+                self.concurrency.set_limit(max(1, int(self.concurrency.limit * RetryConfig.decrease_factor)))
+            logger.warning(f"{self.key} is saturated, sending at most {self.concurrency.limit} request(s) at a time.")
+
+    def succeeded(self):
+        """Additive increase once a limit's worth of calls succeeded."""
+        if self.concurrency is None or self.concurrency.limit >= self.ceiling:
+            return
+        with self._lock:
+            self.successes += 1
+            if self.successes >= self.concurrency.limit:
+                self.successes = 0
+                self.concurrency.set_limit(self.concurrency.limit + 1)
+
+    def _demands(self, inputs, max_tokens):
+        demands = []
+        if self.requests_bucket:
+            demands.append((self.requests_bucket, 1))
+        if self.tokens_bucket:
+            tokens = self.counter.count_messages(inputs or ()) + (max_tokens or 0)
+            demands.append((self.tokens_bucket, min(tokens, self.tokens_bucket.capacity)))
+        return demands
+
+    @contextmanager
+    def limit(self, inputs, max_tokens=0):
+        """Holds a request slot and the estimated tokens of inputs while the block runs. Yields the tokens reserved."""
+        start = time.monotonic()
+        concurrency = self.concurrency                                  # Released to the limiter it was taken from
+        if concurrency:
+            concurrency.acquire()
+        self._enter()
+        try:
+            demands = self._demands(inputs, max_tokens)
+            wait = max([bucket.reserve(amount) for bucket, amount in demands], default=0.0)
+            if wait > 0:
+                time.sleep(wait)
+            self._count(start)
+            yield sum(amount for bucket, amount in demands if bucket is self.tokens_bucket)
+        finally:
+            self._exit()
+            if concurrency:
+                concurrency.release()
+
+    @asynccontextmanager
+    async def alimit(self, inputs, max_tokens=0):
+        """Asynchronous version of limit. Waiting coroutines queue in the AsyncRateLimiter, not the event loop."""
+        start = time.monotonic()
+        concurrency = self.concurrency
+        if concurrency:
+            await concurrency.aacquire()
+        self._enter()
+        try:
+            demands = self._demands(inputs, max_tokens)
+            if demands:
+                await self.async_limiter.acquire(demands)
+            self._count(start)
+            yield sum(amount for bucket, amount in demands if bucket is self.tokens_bucket)
+        finally:
+            self._exit()
+            if concurrency:
+                concurrency.release()
+
+    def _enter(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def _exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _count(self, start):
+        with self._lock:
+            self.calls += 1
+            self.waited_seconds += time.monotonic() - start
+
+    def settle(self, reserved, result):
+        """Returns the reserved tokens a result didn't use, if the provider reports its token usage."""
+        usage = ((getattr(result, 'llm_output', None) or {}).get('token_usage') or {})
+        used = usage.get('total_tokens') if isinstance(usage, dict) else None
+        if self.tokens_bucket and reserved and used:
+            self.tokens_bucket.release(reserved - used)
+
+    async def asettle(self, reserved, result):
+        """Asynchronous version of settle. A shared backend is called from a worker thread."""
+        if self.tokens_bucket:
+            await _off_loop(self.tokens_bucket.backend, self.settle, reserved, result)
+
+    def summary(self):
+        limits = ", ".join(f"{name}={value:g}" for name, value in
+                           (('rpm', self.rpm), ('tpm', self.tpm), ('max_concurrent', self.max_concurrent)) if value)
+        concurrency = f", concurrency now {self.concurrency.limit}" if self.concurrency else ""
+        return f"{self.key} ({limits or 'no limits'}): {self.calls} call(s), {self.waited_seconds:.2f}s waiting{concurrency}"
+
+
+limiters = {}                                                           # key -> LLMLimiter, shared by the LLMs of a model
+_lock = threading.Lock()
+
+
+def get_limiter(provider, model_name, base_url=None, deployment=None, rpm=None, tpm=None, max_concurrent=None):
+    """The limiter of a model. LLMs of the same model and limits share it, and with it their retry state."""
+    rpm, tpm, max_concurrent = LLMLimitsConfig.get_limits(provider, rpm, tpm, max_concurrent)
+    key = f"{(provider or '').lower()}:{base_url or ''}:{deployment or (model_name or '').strip()}"
+    with _lock:
+        limiter = limiters.get(key)
+        if limiter is None or (limiter.rpm, limiter.tpm, limiter.max_concurrent) != (rpm, tpm, max_concurrent):
+            limiter = limiters[key] = LLMLimiter(key, rpm, tpm, max_concurrent)
+        return limiter
+
+
+def _inputs(args, kwargs):
+    """Messages of a chat model call or prompts of an LLM call."""
+    return args[0] if args else kwargs.get('messages', kwargs.get('prompts', ()))
+
+
+def _max_tokens(llm):
+    return getattr(llm, 'max_tokens', None) or 0
+
+
+def _call(llm, inputs, call):
+    """Runs call() inside the limits of llm, retrying it with backoff while next_delay allows."""
+    limiter = llm.limiter
+    if _nested(limiter):                                                # The outer call limits and retries
+        return call()
+    attempt = 0
+    while True:
+        try:
+            with limiter.limit(inputs, _max_tokens(llm)) as reserved, _holding(limiter):
+                result = call()
+        except Exception as e:
+            delay = next_delay(limiter, e, attempt)
+            if delay is None:
+                raise
+            time.sleep(delay)                                           # Outside the limits, the slot is free meanwhile
+            attempt += 1
+            continue
+        limiter.succeeded()
+        limiter.settle(reserved, result)
+        return result
+
+
+async def _acall(llm, inputs, call):
+    """Asynchronous version of _call."""
+    limiter = llm.limiter
+    if _nested(limiter):
+        return await call()
+    attempt = 0
+    while True:
+        try:
+            async with limiter.alimit(inputs, _max_tokens(llm)) as reserved:
+                with _holding(limiter):
+                    result = await call()
+        except Exception as e:
+            delay = next_delay(limiter, e, attempt)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        limiter.succeeded()
+        await limiter.asettle(reserved, result)
+        return result
+
+
+_limited_classes = {}                                                   # LLM class -> its limited subclass
+_done = object()                                                        # End of a stream
+
+
+def _limited_class(base):
+    """
+    Subclass of an LLM class whose calls run inside self.limiter. Only the methods the class implements are
+    overridden: langchain falls back to _generate for streaming, or to a thread for async calls, when a
+    class doesn't implement them, and a call doesn't take its limits twice when one method calls another.
+    A stream is only retried if it failed before its first chunk. Its limits are marked as held only while
+    a chunk is produced, never while the caller consumes it.
+    """
+    from langchain_core.language_models import BaseChatModel, BaseLLM
+    from langchain_core.pydantic_v1 import PrivateAttr
+
+    def _generate(self, *args, **kwargs):
+        return _call(self, _inputs(args, kwargs), lambda: base._generate(self, *args, **kwargs))
+
+    async def _agenerate(self, *args, **kwargs):
+        return await _acall(self, _inputs(args, kwargs), lambda: base._agenerate(self, *args, **kwargs))
+
+    def _stream(self, *args, **kwargs):
+        if _nested(self.limiter):
+            yield from base._stream(self, *args, **kwargs)
+            return
+        attempt = 0
+        while True:
+            started = False
+            try:
+                with self.limiter.limit(_inputs(args, kwargs), _max_tokens(self)):
+                    chunks = base._stream(self, *args, **kwargs)
+                    while True:
+                        with _holding(self.limiter):
+                            chunk = next(chunks, _done)
+                        if chunk is _done:
+                            break
+                        started = True
+                        yield chunk
+            except Exception as e:
+                delay = None if started else next_delay(self.limiter, e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.limiter.succeeded()
+            return
+
+    async def _astream(self, *args, **kwargs):
+        if _nested(self.limiter):
+            async for chunk in base._astream(self, *args, **kwargs):
+                yield chunk
+            return
+        attempt = 0
+        while True:
+            started = False
+            try:
+                async with self.limiter.alimit(_inputs(args, kwargs), _max_tokens(self)):
+                    chunks = base._astream(self, *args, **kwargs)
+                    while True:
+                        with _holding(self.limiter):
+                            chunk = await anext(chunks, _done)
+                        if chunk is _done:
+                            break
+                        started = True
+                        yield chunk
+            except Exception as e:
+                delay = None if started else next_delay(self.limiter, e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self.limiter.succeeded()
+            return
+
+    methods = {'_generate': _generate, '_agenerate': _agenerate, '_stream': _stream, '_astream': _astream}
+    with _lock:
+        if base not in _limited_classes:
+            root = BaseChatModel if issubclass(base, BaseChatModel) else BaseLLM
+            namespace = {name: method for name, method in methods.items()
+                         if getattr(base, name, None) is not getattr(root, name, None)}
+            namespace.update({'__module__': __name__, '_limiter': PrivateAttr(default=None),   # Kept by copy(), not serialised
+                              'limiter': property(lambda self: self._limiter)})
+            _limited_classes[base] = type(f"Limited{base.__name__}", (base,), namespace)
+        return _limited_classes[base]
+
+
+def limit_llm(llm, limiter):
+    """
+    Returns a copy of llm that runs inside the limits of limiter and retries failed calls, sharing the
+    client of llm. Returns llm itself if it is not a langchain model.
+    """
+    if llm is None or limiter is None:
+        return llm
+    try:
+        cls = _limited_class(type(llm))
+        limited = cls.construct(_fields_set=set(llm.__fields_set__), **llm.__dict__)
+        for name in getattr(llm, '__private_attributes__', {}):
+            if hasattr(llm, name):
+                object.__setattr__(limited, name, getattr(llm, name))
+        object.__setattr__(limited, '_limiter', limiter)
+        return limited
+    except Exception as e:
+        logger.warning(f"Can't apply the limits of {limiter.key} to {type(llm).__name__}, calling it without limits and retries: {e}")
+        return llm
@@ -0,0 +1,138 @@
+import   logging
+logger = logging.getLogger(__name__)
+from     config.config import RetryConfig
+from     email.utils import parsedate_to_datetime
+import   random
+import   re
+import   threading
+import   time
+
+# Stdlib only. Decides whether a failed LLM call is retried and how long to back off. The waiting itself is
+# done by the callers in utils/llm_limits.py, with time.sleep or asyncio.sleep.
+
+retryable_statuses = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+saturated_statuses = {429, 503, 529}                                    # The provider is overloaded: back off and send less
+transient_errors   = {'APIConnectionError', 'APITimeoutError', 'ConnectError', 'ConnectTimeout', 'ReadTimeout',
+                      'ReadError', 'RemoteProtocolError', 'ConnectionError', 'TimeoutError'}
+message_status     = re.compile(r"status code:? (\d{3})\b")             # langchain_community's Ollama raises a plain ValueError
+
+
+def status_code(exc):
+    """
+    HTTP status of an SDK exception (openai, anthropic, groq, ollama, httpx, requests), or None. Falls back to
+    a "status code 503" in the message, e.g. "Ollama call failed with status code 503. Details: ...".
+    """
+    for source in (exc, getattr(exc, 'response', None)):
+        code = getattr(source, 'status_code', None)
+        if isinstance(code, int):
+            return code
+    match = message_status.search(str(exc))
+    return int(match.group(1)) if match else None
+
+
+def retry_after(exc):
+    """Seconds the provider asked to wait in the Retry-After header of the error, or None."""
+    headers = getattr(getattr(exc, 'response', None), 'headers', None) or {}
+    try:
+        if headers.get('retry-after-ms') is not None:
+            return float(headers['retry-after-ms']) / 1000
+        value = headers.get('retry-after')
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def classify(exc):
+    """(retryable, saturated) of an exception raised by an LLM call."""
+    code = status_code(exc)
+    if code is not None:
+        return code in retryable_statuses, code in saturated_statuses
+    transient = any(cls.__name__ in transient_errors for cls in type(exc).__mro__)
+    return transient, False
+
+
+def backoff_delay(attempt, after=None):
+    """
+    Seconds to wait before retry number attempt (0 based). Full jitter over the exponential delay, so clients
+    that failed together don't retry together. A Retry-After is honoured with a little jitter on top.
+    """
+    if after is not None:
+        return after + random.uniform(0, min(1.0, after * 0.1))
+    return random.uniform(0, min(RetryConfig.max_delay, RetryConfig.base_delay * 2 ** attempt))
+
+
+class RetryBudget:
+    """Retries left in the current run, shared by every LLM so a failing provider can't retry forever."""
+
+    def __init__(self, retries=RetryConfig.budget):
+        self.retries = retries
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def take(self):
+        with self._lock:
+            if self.used >= self.retries:
+                return False
+            self.used += 1
+            return True
+
+    def reset(self, retries=None):
+        """Starts a new run, optionally with another budget."""
+        with self._lock:
+            self.retries = self.retries if retries is None else retries
+            self.used = 0
+
+
+class BackoffStats:
+    """Retries and time spent backing off per model, for the report after a run."""
+
+    def __init__(self):
+        self.models = {}                                                # key -> {'retries', 'seconds', 'saturated', 'gave_up'}
+        self._lock = threading.Lock()
+
+    def _model(self, key):
+        return self.models.setdefault(key, {'retries': 0, 'seconds': 0.0, 'saturated': 0, 'gave_up': 0})
+
+    def record(self, key, field, amount=1):
+        with self._lock:
+            self._model(key)[field] += amount
+
+    def total(self, field):
+        with self._lock:
+            return sum(stats[field] for stats in self.models.values())
+
+    def reset(self):
+        with self._lock:
+            self.models.clear()
+
+
+retry_budget  = RetryBudget()                                           # Reset by main.py before each run
+backoff_stats = BackoffStats()
+
+
+def next_delay(limiter, exc, attempt):
+    """
+    Seconds to back off before retrying a call that raised exc, or None to give up and raise it. Tells the
+    limiter when the provider is saturated, so it lowers its concurrency.
+    """
+    retryable, saturated = classify(exc)
+    if saturated:
+        backoff_stats.record(limiter.key, 'saturated')
+        limiter.saturated()
+    if not retryable:
+        return None
+    after = retry_after(exc)
+    if attempt + 1 >= RetryConfig.max_attempts or (after or 0) > RetryConfig.max_retry_after or not retry_budget.take():
+        backoff_stats.record(limiter.key, 'gave_up')
+        return None
+    delay = backoff_delay(attempt, after)
+    backoff_stats.record(limiter.key, 'retries')
+    backoff_stats.record(limiter.key, 'seconds', delay)
+    logger.warning(f"{limiter.key}: {type(exc).__name__} ({status_code(exc) or 'no status'}), "
+                   f"retry {attempt + 1} in {delay:.1f}s: {exc}")
+    return delay
@@ -1,11 +1,28 @@
 import   logging
+import   functools
 import   socket
+import   os
+import   threading
+import   time
+from     collections.abc import Mapping
+from     urllib.parse import urlsplit
+from     concurrent.futures import ThreadPoolExecutor
 from     langchain_community.llms.ollama import Ollama
-from     rich.progress import Progress
-from     ollama import list, pull, Client
+from     rich.progress import Progress, TextColumn, BarColumn, DownloadColumn, TransferSpeedColumn
+from     ollama import Client
+from     config.config import OllamaConfig
 logger = logging.getLogger(__name__)
 
+@functools.lru_cache(maxsize=None)
 def running_in_docker():
+        """
+        True when running in a container that can reach the host as host.docker.internal. Detected once per
+        process; OllamaConfig.in_docker ("true"/"false", env CREWAI_SHEETS_IN_DOCKER) skips the detection.
+        """
+        if OllamaConfig.in_docker is not None:
+            return str(OllamaConfig.in_docker).strip().lower() in ('1', 'true', 'yes')
+        if not (os.path.exists('/.dockerenv') or os.path.exists('/run/.containerenv')):
+            return False                                                # No container, no need to ask the resolver
         try:
             # This will try to resolve the special Docker DNS name for the host.
             host_ip = socket.gethostbyname('host.docker.internal')
@@ -13,74 +30,239 @@ def running_in_docker():
             #print(f"There was no base_url set for this model, so I'll assume it's {host_ip}:11434.")                      
             return True if host_ip else False
         except socket.gaierror:
-            # The name is not known, which likely means not running inside Docker
+            # The name is not known, the host is not reachable under it
             return False
-    
+
+
+def normalize_host(host):
+    """
+    URL of an OLLAMA_HOST value, the way the ollama client reads it: 'localhost:11434' or '0.0.0.0' get http://
+    and the default port, so langchain's requests can use it too. A bind-all address means this host.
+    """
+    host = host.strip()
+    scheme, separator, rest = host.partition('://')
+    if not separator:
+        scheme, rest = 'http', host
+    default_port = 11434 if not separator else (443 if scheme == 'https' else 80)
+    split = urlsplit(f"{scheme}://{rest}")
+    hostname = split.hostname or '127.0.0.1'
+    if hostname in ('0.0.0.0', '::'):
+        hostname = '127.0.0.1'
+    if ':' in hostname:
+        hostname = f"[{hostname}]"                                      # IPv6
+    return f"{scheme}://{hostname}:{split.port or default_port}{split.path.rstrip('/')}"
+
+
+def normalize_model_name(model_name):
+    """Ollama lists untagged models as <model>:latest."""
+    model_name = model_name.strip()
+    return model_name if ':' in model_name else f"{model_name}:latest"
+
+
 class OllamaLoader:
-    
-    
-    def handle_progress_updates(progress_update, progress, llm_task):
+    _available = {}                                                     # base_url -> names of the models on that server
+    _clients   = {}                                                     # base_url -> ollama.Client, one per server
+    _failed    = {}                                                     # (model name, base_url) -> error of its last pull
+    _lock = threading.Lock()
+    _clients_lock = threading.Lock()
+    _pull_lock = threading.Lock()                                       # Agents built concurrently pull one at a time
+
+    def resolve_base_url(base_url=None):
+        """The server of a model: its base_url, else OllamaConfig.base_url or OLLAMA_HOST, else the Docker host when
+        running in a container. None means the default of the ollama client. OLLAMA_HOST is read here, after
+        main.py loaded the .env file."""
+        if isinstance(base_url, str) and base_url.strip():
+            return base_url.strip().rstrip('/')
+        host = OllamaConfig.base_url or os.environ.get("OLLAMA_HOST")
+        if host and host.strip():
+            return normalize_host(host)
+        return OllamaConfig.docker_base_url if running_in_docker() else None
+
+    def client(base_url=None):
+        """The shared client of a server."""
+        with OllamaLoader._clients_lock:
+            if base_url not in OllamaLoader._clients:
+                OllamaLoader._clients[base_url] = Client(host=base_url)
+            return OllamaLoader._clients[base_url]
+
+    def list_models(base_url=None, refresh=False):
+        """Names of the models available on a server. The server is only asked once unless refresh is set."""
+        with OllamaLoader._lock:
+            if refresh or base_url not in OllamaLoader._available:
+                models = OllamaLoader.client(base_url).list()['models']
+                OllamaLoader._available[base_url] = {model.get('name') or model.get('model') for model in models}
+            return OllamaLoader._available[base_url]
+
+    def handle_progress_updates(progress_update, progress, llm_task, label="LLM"):
         """
         Handles progress updates during model download and initialization.
         """
         if 'total' in progress_update:
             progress.update(llm_task, total=progress_update['total'])
         if 'completed' in progress_update:
-            current_completed = progress.tasks[llm_task].completed
-            new_advance = progress_update['completed'] - current_completed
-            progress.advance(llm_task, advance=new_advance)
+            progress.update(llm_task, completed=progress_update['completed'])
         if 'status' in progress_update:
-            progress.update(llm_task, advance=0, description=f"[cyan]LLM: {progress_update['status']}")
+            progress.update(llm_task, advance=0, description=f"[cyan]{label}: {progress_update['status']}")
 
-    def load(model_name=None, temperature=0.8, num_ctx=None, base_url=None, **kwargs):
+    def pull(model_name, base_url, progress, retries=None):
         """
-        Loads the specified model from Ollama, or pulls it if it does not exist.
+        Pulls a model into a server, showing its own bar in progress. A failed pull is retried; Ollama keeps the
+        layers already downloaded, so a retry resumes instead of starting over. Returns None or the last error.
         """
+        retries = OllamaConfig.pull_retries if retries is None else retries
+        llm_task = progress.add_task(f"[cyan]{model_name}: waiting", total=None)
+        error = None
+        for attempt in range(1, retries + 1):
+            try:
+                for response in OllamaLoader.client(base_url).pull(model=model_name, stream=True):
+                    OllamaLoader.handle_progress_updates(response, progress, llm_task, label=model_name)
+            except Exception as e:
+                error = e
+                logger.warning(f"Pulling '{model_name}' failed (attempt {attempt}/{retries}): {e}")
+                if attempt < retries:                                   # No backoff after the last attempt
+                    progress.update(llm_task, description=f"[yellow]{model_name}: retrying ({attempt}/{retries})")
+                    time.sleep(min(2 ** attempt, 30))
+                continue
+            with OllamaLoader._lock:
+                OllamaLoader._available.setdefault(base_url, set()).add(normalize_model_name(model_name))
+            progress.update(llm_task, description=f"[green]{model_name}: ready")
+            logger.info(f"Model '{model_name}' successfully pulled")
+            return None
+        progress.update(llm_task, description=f"[red]{model_name}: failed")
+        return error
 
-        if running_in_docker():
-            if base_url is None:
-                base_url = 'http://host.docker.internal:11434'                  #TODO: Move to config
-            ollama_client = Client(host=base_url)
-        else:
-            ollama_client = None    
-            
+    def pull_models(models, workers=None):
+        """
+        Pulls (model_name, base_url) pairs concurrently with one progress bar per model.
+        Returns {model_name: error} for the models that could not be pulled.
+        """
+        if not models:
+            return {}
+        print(f"I'm downloading {len(models)} model(s) from Ollama: {', '.join(name for name, _ in models)}. "
+              f"This may take a while. Why not grab a cup of coffee...")
+        progress = Progress(TextColumn("{task.description}"), BarColumn(), DownloadColumn(), TransferSpeedColumn(),
+                            expand=True, transient=True)
+        with progress, ThreadPoolExecutor(max_workers=workers or OllamaConfig.pull_workers) as executor:
+            futures = {name: executor.submit(OllamaLoader.pull, name, base_url, progress) for name, base_url in models}
+        errors = {name: future.result() for name, future in futures.items() if future.result() is not None}
+        with OllamaLoader._lock:                                        # load() doesn't try these again
+            for name, base_url in models:
+                if name in errors:
+                    OllamaLoader._failed[(normalize_model_name(name), base_url)] = errors[name]
+                else:
+                    OllamaLoader._failed.pop((normalize_model_name(name), base_url), None)
+        return errors
+
+    def referenced_models(spec):
+        """
+        {model_name: (base_url, is_embedding_model)} of every Ollama model referenced by the Agents, Crew and
+        enabled Tools of a CrewSpec.
+        """
+        names = {}
+        def add(name, is_embedding_model):
+            if isinstance(name, str) and name.strip():                  # A model used both ways stays an embedder
+                names[name.strip()] = names.get(name.strip(), False) or is_embedding_model
+        for agent in spec.agents:
+            add(agent.model_name, False)
+            add(agent.function_calling_model, False)
+        for crew in spec.crew[:1]:
+            add(crew.manager_llm, False)
+            add(crew.embedding_model, True)
+        for tool in spec.tools_by_name.values():
+            add(tool.model, False)
+            add(tool.embedding_model, True)
+
+        models = {}
+        for name, is_embedding_model in sorted(names.items()):
+            model = spec.get_model(name)
+            if model is not None and (model.provider or '').lower() == 'ollama':
+                models[name] = (OllamaLoader.resolve_base_url(model.base_url), is_embedding_model)
+        return models
+
+    def preflight(spec):
+        """
+        Makes sure every Ollama model referenced by the Agents, Crew and Tools of a CrewSpec is available.
+        Each server is listed once, and all missing models are pulled concurrently.
+        Returns {model_name: error} for the models that are still missing.
+        """
+        missing, errors = [], {}
+        for name, (base_url, _) in OllamaLoader.referenced_models(spec).items():
+            try:
+                available = OllamaLoader.list_models(base_url)
+            except Exception as e:
+                errors[name] = e
+                continue
+            if normalize_model_name(name) not in available:
+                missing.append((name, base_url))
+        errors.update(OllamaLoader.pull_models(missing))
+        return errors
+
+    def warm_up_model(model_name, base_url, is_embedding_model=False, keep_alive=None):
+        """
+        Loads a model into server memory with an empty request. Returns a dict with the server side load
+        time, the wall time of the request and the error, if any.
+        """
+        start = time.perf_counter()
+        options = {} if keep_alive is None else {'keep_alive': keep_alive}
+        try:
+            client = OllamaLoader.client(base_url)
+            if is_embedding_model:
+                response = client.embeddings(model=model_name, prompt='', **options)
+            else:
+                response = client.generate(model=model_name, prompt='', **options)
+            load_duration = (response.get('load_duration') if isinstance(response, Mapping)
+                             else getattr(response, 'load_duration', None))  # Newer clients return response objects
+            load_duration = load_duration / 1e9 if load_duration is not None else None
+            error = None
+        except Exception as e:
+            load_duration, error = None, e
+            logger.warning(f"Warming up '{model_name}' failed: {e}")
+        return {'model': model_name, 'base_url': base_url, 'load_seconds': load_duration,
+                'wall_seconds': time.perf_counter() - start, 'error': error}
+
+    def warm_up(spec, keep_alive=None, executor=None):
+        """
+        Starts loading every Ollama model of a CrewSpec into server memory in the background.
+        Returns the futures of the warm_up_model results.
+        """
+        executor = executor or ThreadPoolExecutor(max_workers=OllamaConfig.pull_workers, thread_name_prefix="warm_up")
+        futures = [executor.submit(OllamaLoader.warm_up_model, name, base_url, is_embedding_model, keep_alive)
+                   for name, (base_url, is_embedding_model) in OllamaLoader.referenced_models(spec).items()]
+        executor.shutdown(wait=False)
+        return futures
+
+    def load(model_name=None, temperature=0.8, num_ctx=None, base_url=None, keep_alive=None, **kwargs):
+        """
+        Loads the specified model from Ollama, or pulls it if it does not exist. Runs in the agent build threads:
+        a model whose pull already failed, e.g. in preflight, raises that error instead of being pulled again.
+        """
+        keep_alive = OllamaConfig.keep_alive if keep_alive is None else keep_alive
+        options = {} if keep_alive is None else {'keep_alive': keep_alive}    # Every call keeps the model loaded
+        base_url = OllamaLoader.resolve_base_url(base_url)
 
         parts = model_name.split(':')
         if len(parts) < 2 :
             print (f"Ollama models usually have a version, like {model_name}:instruct, or {model_name}:latest. That's ok, I'll take a guess and use the latest version.")
 
-        
-        model_list = list()['models'] if ollama_client is None else ollama_client.list()['models']
-        
-        for model in model_list:
-            if model['name'] == model_name:
-                logger.info(f"Model '{model_name}' found in Ollama, loading directly.")
-                
-                if base_url is not None:
-                    return Ollama(model=model_name, temperature=temperature, num_ctx=num_ctx, base_url=base_url)
-                else:
-                    return Ollama(model=model_name, temperature=temperature, num_ctx=num_ctx)
-        
-        logger.info(f"No local matching model found for '{model_name}' in Ollama.")
-        print(f"I'm trying to download '{model_name}' from Ollama... This may take a while. Why not grab a cup of coffee...")
-        
-        progress = Progress(expand=True, transient=True)
-        with progress:
-            llm_task = progress.add_task(f"Downloading '{model_name}'", total=1000)
-            if ollama_client is None:
-                for response in pull(model=model_name, stream=True):
-                    OllamaLoader.handle_progress_updates(response, progress, llm_task)
-            else:
-                for response in ollama_client.pull(model=model_name, stream=True):
-                    OllamaLoader.handle_progress_updates(response, progress, llm_task)
+        if normalize_model_name(model_name) in OllamaLoader.list_models(base_url):    # Listed once, usually by preflight
+            logger.info(f"Model '{model_name}' found in Ollama, loading directly.")
+        else:
+            with OllamaLoader._pull_lock:                               # One progress display, one pull per model
+                error = OllamaLoader._failed.get((normalize_model_name(model_name), base_url))
+                if error is not None:
+                    raise error
+                if normalize_model_name(model_name) not in OllamaLoader.list_models(base_url):   # Pulled meanwhile?
+                    logger.info(f"No local matching model found for '{model_name}' in Ollama.")
+                    error = OllamaLoader.pull_models([(model_name, base_url)]).get(model_name)
+                    if error is not None:
+                        raise error
+                    logger.info(f"Attempting to load model '{model_name}'...")
+                    print(f"Model '{model_name}' successfully pulled. Now I'm trying to load it...")
 
-        logger.info(f"Model '{model_name}' successfully pulled")
-        logger.info(f"Attempting to load model '{model_name}'...")
-        print(f"Model '{model_name}' successfully pulled. Now I'm trying to load it...")
         if base_url is not None:
-            return Ollama(model=model_name, temperature=temperature, num_ctx=num_ctx, base_url=base_url)
+            return Ollama(model=model_name, temperature=temperature, num_ctx=num_ctx, base_url=base_url, **options)
         else:
-            return Ollama(model=model_name, temperature=temperature, num_ctx=num_ctx)
+            return Ollama(model=model_name, temperature=temperature, num_ctx=num_ctx, **options)
         
           
     
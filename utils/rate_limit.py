@@ -0,0 +1,325 @@
+import   logging
+logger = logging.getLogger(__name__)
+from     config.config import RateLimitConfig
+import   asyncio
+import   collections
+import   hashlib
+import   json
+import   os
+import   sqlite3
+import   struct
+import   threading
+import   time
+import   weakref
+from     contextlib import contextmanager
+
+# Stdlib only. A bucket's state is (tokens, updated_at). Backends only store the state and apply an update
+# function to it atomically, the token bucket logic is the same for all of them.
+
+
+def bucket_key(api_key, model_name):
+    """Key of the bucket shared by every user of an API key and model. The API key itself is never stored."""
+    key_hash = hashlib.sha256((api_key or '').encode()).hexdigest()[:16]
+    return f"{key_hash}:{model_name}"
+
+
+class MemoryBackend:
+    """Buckets in a dict, shared by the threads of this process only."""
+
+    def __init__(self, path=None):
+        self.states = {}
+        self.lock = threading.Lock()
+
+    def update(self, key, fn):
+        """Applies fn(state or None) -> (state, result) atomically and returns result."""
+        with self.lock:
+            self.states[key], result = fn(self.states.get(key))
+            return result
+
+
+@contextmanager
+def _file_lock(path):
+    import fcntl                                                        # Unix only
+    with open(path, 'a+') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield lock_file
+        finally:
+            lock_file.flush()                                           # Written before the next holder reads
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class FileLockBackend:
+    """One JSON file per bucket, updated under an exclusive fcntl lock. Shared by all processes on the host."""
+
+    def __init__(self, path=None):
+        import fcntl                                                    # Fail here, get_backend falls back to memory
+        self.path = path or RateLimitConfig.path
+        os.makedirs(self.path, exist_ok=True)
+        self.lock = threading.Lock()                                    # flock doesn't exclude threads of one process
+
+    def update(self, key, fn):
+        file_name = hashlib.sha1(key.encode()).hexdigest() + '.json'
+        with self.lock, _file_lock(os.path.join(self.path, file_name)) as bucket_file:
+            bucket_file.seek(0)
+            try:
+                state = tuple(json.loads(bucket_file.read()))
+            except ValueError:
+                state = None                                            # New or unreadable bucket
+            state, result = fn(state)
+            bucket_file.seek(0)
+            bucket_file.truncate()
+            bucket_file.write(json.dumps(state))
+            return result
+
+
+class SQLiteBackend:
+    """Buckets in a SQLite table, updated in IMMEDIATE transactions. Shared by all processes on the host."""
+
+    def __init__(self, path=None):
+        path = path or RateLimitConfig.path
+        os.makedirs(path, exist_ok=True)
+        self.db_path = os.path.join(path, "buckets.sqlite")
+        self.local = threading.local()                                  # sqlite3 connections are per thread
+        with self._connection() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated_at REAL)")
+
+    def _connection(self):
+        if not hasattr(self.local, 'connection'):
+            self.local.connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        return self.local.connection
+
+    def update(self, key, fn):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")                           # Takes the write lock before reading
+        try:
+            row = connection.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+            state, result = fn(tuple(row) if row else None)
+            connection.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)", (key, *state))
+            connection.execute("COMMIT")
+            return result
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+
+class SharedMemoryBackend:
+    """
+    Buckets in named shared memory segments, one per bucket, guarded by a fcntl lock file. The fastest of the
+    shared backends. The segments stay in /dev/shm until the host restarts or unlink() is called.
+    """
+    _format = 'dd?'                                                     # tokens, updated_at, initialised
+
+    def __init__(self, path=None):
+        import fcntl                                                    # Fail here, get_backend falls back to memory
+        self.path = path or RateLimitConfig.path
+        os.makedirs(self.path, exist_ok=True)
+        self.segments = {}
+        self.lock = threading.Lock()
+
+    def _segment(self, key):
+        from multiprocessing import shared_memory, resource_tracker
+        if key not in self.segments:
+            name = "crewai_rl_" + hashlib.sha1(key.encode()).hexdigest()[:16]
+            size = struct.calcsize(self._format)
+            try:
+                segment = shared_memory.SharedMemory(name=name, create=True, size=size)
+            except FileExistsError:
+                segment = shared_memory.SharedMemory(name=name)
+            try:                                                        # The bucket must outlive this process
+                resource_tracker.unregister(segment._name, 'shared_memory')
+            except Exception:
+                pass
+            self.segments[key] = segment
+        return self.segments[key]
+
+    def update(self, key, fn):
+        lock_path = os.path.join(self.path, hashlib.sha1(key.encode()).hexdigest() + '.lock')
+        with self.lock, _file_lock(lock_path):
+            segment = self._segment(key)
+            tokens, updated_at, initialised = struct.unpack_from(self._format, segment.buf)
+            state, result = fn((tokens, updated_at) if initialised else None)
+            struct.pack_into(self._format, segment.buf, 0, *state, True)
+            return result
+
+    def unlink(self, key):
+        from multiprocessing import resource_tracker
+        segment = self._segment(key)
+        resource_tracker.register(segment._name, 'shared_memory')      # unlink() unregisters it again
+        segment.unlink()
+        del self.segments[key]
+
+
+backends = {
+    'memory':        MemoryBackend,
+    'file':          FileLockBackend,
+    'sqlite':        SQLiteBackend,
+    'shared_memory': SharedMemoryBackend,
+}
+_backend_instances = {}
+_backend_lock = threading.Lock()
+
+
+def get_backend(name=None, path=None):
+    """The process wide instance of a backend. Falls back to memory if the backend can't be set up."""
+    name = (name or RateLimitConfig.backend).lower()
+    with _backend_lock:
+        if (name, path) not in _backend_instances:
+            if name not in backends:
+                raise ValueError(f"Unknown rate limit backend '{name}'. Use one of: {', '.join(backends)}.")
+            try:
+                _backend_instances[(name, path)] = backends[name](path)
+            except (OSError, ImportError, sqlite3.Error) as e:
+                logger.warning(f"Rate limit backend '{name}' is not available, limiting this process only: {e}")
+                _backend_instances[(name, path)] = MemoryBackend()
+        return _backend_instances[(name, path)]
+
+
+class TokenBucket:
+    """
+    Token bucket holding up to capacity tokens that refills capacity tokens per period seconds.
+    acquire() reserves tokens right away, letting the balance go negative, and returns how long the caller
+    has to wait before using them. Concurrent callers are therefore served in the order they arrived, and
+    one atomic update per call is enough for every backend.
+    """
+
+    def __init__(self, key, capacity, period=60.0, backend=None):
+        self.key = key
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period                              # Tokens per second
+        self.backend = backend or get_backend()
+
+    def _refilled(self, state, now):
+        if state is None:
+            return self.capacity
+        tokens, updated_at = state
+        return min(self.capacity, tokens + max(0.0, now - updated_at) * self.rate)
+
+    def reserve(self, amount):
+        """Reserves amount tokens and returns the seconds to wait before they are available."""
+        def take(state):
+            now = time.time()
+            tokens = self._refilled(state, now) - amount
+            return (tokens, now), max(0.0, -tokens / self.rate)
+        return self.backend.update(self.key, take)
+
+    def release(self, amount):
+        """Returns tokens that were reserved but not used."""
+        if amount <= 0:
+            return
+        def give(state):
+            now = time.time()
+            return (min(self.capacity, self._refilled(state, now) + amount), now), None
+        self.backend.update(self.key, give)
+
+    def calibrate(self, limit, remaining, reset_seconds=None):
+        """
+        Adjusts the bucket to what the server reports: limit becomes the capacity, the refill rate follows from
+        how long the server needs to refill the missing tokens, and the balance never exceeds remaining.
+        """
+        if limit and limit > 0:
+            self.capacity = float(limit)
+            if reset_seconds and reset_seconds > 0 and remaining < limit:
+                self.rate = (limit - remaining) / reset_seconds
+        def adjust(state):
+            now = time.time()
+            return (min(self._refilled(state, now), float(remaining)), now), None
+        self.backend.update(self.key, adjust)
+
+    def wait_time(self, amount):
+        """Seconds until amount tokens are available, without taking them. An amount larger than the capacity
+        is available once the bucket is full."""
+        def check(state):
+            now = time.time()
+            state = state or (self.capacity, now)
+            return state, max(0.0, (min(amount, self.capacity) - self._refilled(state, now)) / self.rate)
+        return self.backend.update(self.key, check)
+
+    def available(self):
+        return self.backend.update(self.key, lambda state: (state or (self.capacity, time.time()),
+                                                             self._refilled(state, time.time())))
+
+    def acquire(self, amount):
+        """Blocks until amount tokens are available and takes them. Returns the seconds waited."""
+        wait = self.reserve(amount)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self, amount):
+        """Asynchronous version of acquire. A shared backend is called from a worker thread."""
+        wait = await _off_loop(self.backend, self.reserve, amount)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+async def _off_loop(backend, fn, *args):
+    """
+    Calls a bucket method without blocking the event loop: the sqlite and file backends lock across processes
+    and may wait for another process, so they run in a worker thread. The memory backend is called directly.
+    """
+    if isinstance(backend, MemoryBackend):
+        return fn(*args)
+    return await asyncio.to_thread(fn, *args)
+
+
+class AsyncRateLimiter:
+    """
+    asyncio front for one or more TokenBuckets. Waiting coroutines form a FIFO queue per event loop and only
+    the head of the queue waits for tokens, so tokens are never reserved for a coroutine that gets cancelled
+    while it waits, and neither the sleeping nor the backends block the loop. Other processes keep drawing
+    from the same buckets.
+    """
+
+    def __init__(self):
+        self._queues = weakref.WeakKeyDictionary()                      # event loop -> deque of waiter futures
+        self.recheck_seconds = 0.5
+        self.waits = 0                                                  # Acquisitions that had to wait
+        self.waited_seconds = 0.0
+
+    @staticmethod
+    async def _reserve(demands):
+        """Takes the demands. If the caller is cancelled while a worker thread reserves them, they are given back."""
+        def reserve():
+            for bucket, amount in demands:
+                bucket.reserve(amount)
+        def release():
+            for bucket, amount in demands:
+                bucket.release(amount)
+        if all(isinstance(bucket.backend, MemoryBackend) for bucket, _ in demands):
+            return reserve()
+        reservation = asyncio.ensure_future(asyncio.to_thread(reserve))
+        try:
+            await asyncio.shield(reservation)
+        except asyncio.CancelledError:
+            loop = asyncio.get_running_loop()
+            reservation.add_done_callback(lambda done: done.cancelled() or done.exception() is not None
+                                          or loop.run_in_executor(None, release))
+            raise
+
+    async def acquire(self, demands):
+        """Waits for its turn and then until every (bucket, amount) of demands is available, and takes them."""
+        loop = asyncio.get_running_loop()
+        queue = self._queues.setdefault(loop, collections.deque())
+        waiter = loop.create_future()
+        queue.append(waiter)
+        start = loop.time()
+        try:
+            if queue[0] is not waiter:
+                await waiter                                            # Woken once it's the head of the queue
+            while True:
+                wait = max([await _off_loop(bucket.backend, bucket.wait_time, amount) for bucket, amount in demands])
+                if wait <= 0:
+                    break
+                await asyncio.sleep(min(wait, self.recheck_seconds))     # Notices refunds and recalibrated rates
+            await self._reserve(demands)
+        finally:
+            queue.remove(waiter)
+            if queue and not queue[0].done():
+                queue[0].set_result(None)                               # Hand over to the next in line
+        waited = loop.time() - start
+        if waited > 0.001:
+            self.waits += 1
+            self.waited_seconds += waited
+        return waited
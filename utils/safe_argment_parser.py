@@ -2,75 +2,139 @@ import logging
 
 logger = logging.getLogger(__name__)
 from RestrictedPython.PrintCollector import PrintCollector
-from RestrictedPython.Guards import safe_builtins
-from RestrictedPython.Eval import default_guarded_getitem
+from RestrictedPython.Guards import safe_builtins, guarded_iter_unpack_sequence
+from RestrictedPython.Eval import default_guarded_getitem, default_guarded_getiter
 from RestrictedPython import compile_restricted
 from config.config import ToolsConfig
-import pandas as pd
+from utils.callable_registry import LazyNamespace
+from collections import ChainMap
+import functools
+import ast
+import io
+import tokenize
 
 integration_dict = ToolsConfig.integration_dict
+max_length = 1000
 
+_namespace = None                                                       # LazyNamespace, created on first use
 
-def get_safe_execution_environment(integration_dict):
+
+def _lazy_namespace():
+    global _namespace
+    if _namespace is None:
+        _namespace = LazyNamespace(extra=integration_dict)
+    return _namespace
+
+
+class _SafeGlobals(dict):
+    """Globals of the evaluated Args: the safe builtins and the guards. Other names resolve lazily."""
+
+    def __missing__(self, name):                                        # Names looked up inside comprehensions
+        return _lazy_namespace()[name]
+
+
+# Built once and never mutated: __builtins__ is set, so eval doesn't add the unrestricted builtins.
+_safe_globals = _SafeGlobals(safe_builtins, __builtins__=safe_builtins, _getitem_=default_guarded_getitem,
+                             _getiter_=default_guarded_getiter, _iter_unpack_sequence_=guarded_iter_unpack_sequence)
+
+
+def get_safe_execution_environment():
     """
-    Prepare a safe execution environment for RestrictedPython using an integration dictionary
-    populated with dynamically imported module members.
-    
-    Args:
-        integration_dict (dict): Dictionary containing public members from dynamically imported modules.
-    
+    Prepare a safe execution environment for RestrictedPython. The globals hold the safe builtins and are
+    shared by every evaluation. The locals resolve every other name lazily through a LazyNamespace, so
+    only the module members an argument string actually uses are imported.
+
     Returns:
-        tuple: A tuple containing dictionaries for globals and locals for the execution environment.
+        tuple: The globals dictionary and the locals mapping for the execution environment.
     """
-    safe_globals = safe_builtins.copy()
-    # Update safe_globals with the contents of integration_dict
-    safe_globals.update(integration_dict)
-
     safe_locals = {
             '_print_':   PrintCollector(),
             '_getitem_': default_guarded_getitem
     }
-    return safe_globals, safe_locals
+    return _safe_globals, ChainMap(safe_locals, _lazy_namespace())
+
+
+@functools.lru_cache(maxsize=512)
+def compile_argument(source):
+    """Restricted byte code of one argument expression, compiled once per distinct source text."""
+    return compile_restricted(source, '<string>', 'eval')
+
+
+def _pieces(arg_str):
+    """The comma separated pieces of an argument string, leaving out commas inside brackets and strings."""
+    source = f"({arg_str})"                                             # Inside brackets line breaks don't matter
+    line_starts = [0]
+    for line in source.splitlines(keepends=True):
+        line_starts.append(line_starts[-1] + len(line))
+    pieces, depth, start = [], 0, 1
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(source).readline):
+            if token.type != tokenize.OP:
+                continue
+            if token.string in ('(', '[', '{'):
+                depth += 1
+            elif token.string in (')', ']', '}'):
+                depth -= 1
+            elif token.string == ',' and depth == 1:
+                offset = line_starts[token.start[0] - 1] + token.start[1]
+                pieces.append(source[start:offset])
+                start = offset + 1
+    except (tokenize.TokenError, SyntaxError) as e:
+        logger.error(f"Malformed argument string '{arg_str}': {e}")
+        raise ValueError("Malformed argument. Use 'key=value' for kwargs.")
+    pieces.append(source[start:-1])
+    return [piece.strip() for piece in pieces if piece.strip()]
+
+
+@functools.lru_cache(maxsize=256)
+def split_arguments(arg_str):
+    """
+    Splits an argument string into ((keyword or None, expression source), ...). Commas and '=' inside
+    brackets and strings are part of their argument. Each piece is parsed on its own, so like the original
+    splitter, positional arguments may follow keywords and empty pieces are skipped: 'a=1, b' is accepted.
+    """
+    arguments = []
+    for piece in _pieces(arg_str):
+        source = f"_({piece})"
+        try:
+            call = ast.parse(source, mode='eval').body
+        except SyntaxError as e:
+            logger.error(f"Malformed argument '{piece}' in '{arg_str}': {e.msg}")
+            raise ValueError("Malformed argument. Use 'key=value' for kwargs.")
+        if len(call.args) + len(call.keywords) != 1:
+            raise ValueError("Malformed argument. Use 'key=value' for kwargs.")
+        for node in call.args:
+            if isinstance(node, ast.Starred):
+                raise ValueError("Malformed argument. *args can't be used in tool arguments.")
+            arguments.append((None, ast.get_source_segment(source, node)))
+        for keyword in call.keywords:
+            if keyword.arg is None:
+                raise ValueError("Malformed argument. **kwargs can't be used in tool arguments.")
+            arguments.append((keyword.arg, ast.get_source_segment(source, keyword.value)))
+    return tuple(arguments)
 
 
 def parse_arguments(arg_str):
-    max_length = 1000
-    if pd.isna(arg_str):
+    if not isinstance(arg_str, str):                                   # Empty cell
         return [], {}
     if len(arg_str) > max_length:
         logger.error(f"Argument string exceeds maximum length of {max_length} characters.")
         raise ValueError(f"Input too long. Maximum allowed length is {max_length} characters.")
 
     args, kwargs = [], {}
-    globals_dict, locals_dict = get_safe_execution_environment(integration_dict)
-
-    for pair in arg_str.split(','):
-        pair = pair.strip()
-        if not pair:
-            continue
-
-        key_value = pair.split('=')
-        if len(key_value) == 2:
-            key, value = map(str.strip, key_value)
-            if not key.isidentifier():
-                logger.error(f"Invalid keyword '{key}'. Must be a valid identifier.")
-                raise ValueError(f"Invalid keyword '{key}'. Must be a valid identifier.")
-            byte_code = compile_restricted(value, '<string>', 'eval')
-            try:
-                kwargs[key] = eval(byte_code, globals_dict, locals_dict)
-            except Exception as e:
-                logger.error(f"Error evaluating expression '{value}': {e}")
-                raise ValueError(f"Error evaluating expression: {e}")
-        elif len(key_value) == 1:
-            value = key_value[0].strip()
-            byte_code = compile_restricted(value, '<string>', 'eval')
-            try:
-                args.append(eval(byte_code, globals_dict, locals_dict))
-            except Exception as e:
-                logger.error(f"Error evaluating expression '{value}': {e}")
-                raise ValueError(f"Error evaluating expression: {e}")
+    arguments = split_arguments(arg_str.strip())
+    globals_dict, locals_dict = get_safe_execution_environment()
+
+    for key, value in arguments:
+        try:
+            byte_code = compile_argument(value)
+            result = eval(byte_code, globals_dict, locals_dict)
+        except Exception as e:
+            logger.error(f"Error evaluating expression '{value}': {e}")
+            raise ValueError(f"Error evaluating expression: {e}")
+        if key is None:
+            args.append(result)
         else:
-            logger.error("Malformed argument. Use 'key=value' for kwargs.")
-            raise ValueError("Malformed argument. Use 'key=value' for kwargs.")
+            kwargs[key] = result
 
     return args, kwargs
@@ -0,0 +1,101 @@
+import   logging
+logger = logging.getLogger(__name__)
+from     config.config import SheetsConfig
+from     urllib.error import URLError
+import   requests
+import   hashlib
+import   json
+import   time
+import   re
+import   os
+
+
+class SheetCache:
+    """
+    Disk cache of worksheet CSV exports, keyed by sheet ID and worksheet name. Cached copies are revalidated
+    with ETag / Last-Modified, or trusted without a request while they are younger than ttl seconds.
+    In offline mode the network is never used, and when the network is unavailable the cached copy is used.
+    """
+
+    def __init__(self, cache_dir=None, ttl=None, offline=False):
+        self.cache_dir = cache_dir or SheetsConfig.cache_dir
+        self.ttl = SheetsConfig.cache_ttl if ttl is None else ttl
+        self.offline = offline
+
+    @staticmethod
+    def sheet_id(base_url):
+        """The Google sheet ID of a URL, or a hash of the URL for anything else."""
+        match = re.search(r'/spreadsheets/d/([a-zA-Z0-9-_]+)', base_url)
+        return match.group(1) if match else hashlib.sha1(base_url.encode()).hexdigest()
+
+    def _paths(self, sheet_id, worksheet):
+        directory = os.path.join(self.cache_dir, sheet_id)
+        return os.path.join(directory, f"{worksheet}.csv"), os.path.join(directory, f"{worksheet}.json")
+
+    def _read(self, sheet_id, worksheet):
+        """Returns (content, meta) of the cached copy, or (None, {}) if there is none."""
+        csv_path, meta_path = self._paths(sheet_id, worksheet)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as meta_file:
+                meta = json.load(meta_file)
+            with open(csv_path, 'rb') as csv_file:
+                return csv_file.read(), meta
+        except (OSError, ValueError):
+            return None, {}
+
+    def _write(self, sheet_id, worksheet, content, meta):
+        csv_path, meta_path = self._paths(sheet_id, worksheet)
+        try:
+            os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+            for path, data, mode in ((csv_path, content, 'wb'), (meta_path, json.dumps(meta), 'w')):
+                temp_path = f"{path}.{os.getpid()}.tmp"
+                with open(temp_path, mode) as cache_file:
+                    cache_file.write(data)
+                os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to cache worksheet '{worksheet}': {e}")
+
+    def fetch(self, session, url, base_url, worksheet):
+        """Returns the CSV content of a worksheet, from the cache whenever it's still valid."""
+        sheet_id = self.sheet_id(base_url)
+        content, meta = self._read(sheet_id, worksheet)
+
+        if self.offline:
+            if content is None:
+                raise URLError(f"Worksheet '{worksheet}' is not cached and I'm running offline.")
+            logger.info(f"Offline, using cached worksheet '{worksheet}' from {time.ctime(meta.get('fetched_at', 0))}.")
+            return content
+
+        if content is not None and self.ttl and time.time() - meta.get('fetched_at', 0) < self.ttl:
+            logger.info(f"Using cached worksheet '{worksheet}', younger than {self.ttl}s.")
+            return content
+
+        headers = {}
+        if content is not None and meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if content is not None and meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+        try:
+            response = session.get(url, headers=headers, timeout=SheetsConfig.request_timeout)
+            if response.status_code == 304 and content is not None:
+                logger.info(f"Worksheet '{worksheet}' not modified, using cached copy.")
+                meta['fetched_at'] = time.time()
+                self._write(sheet_id, worksheet, content, meta)
+                return content
+            response.raise_for_status()
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if content is None:
+                raise URLError(e)
+            logger.warning(f"Network unavailable, using cached worksheet '{worksheet}': {e}")
+            return content
+        except requests.RequestException as e:
+            raise URLError(e)                                           # parse_table asks for another URL
+
+        self._write(sheet_id, worksheet, response.content, {
+            'url':           url,
+            'etag':          response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched_at':    time.time(),
+        })
+        return response.content
@@ -1,83 +1,270 @@
 import   logging
 logger = logging.getLogger(__name__)
-from     config.config import AppConfig 
+from     config.config import AppConfig, SheetsConfig
+from     collections import namedtuple
+from     concurrent.futures import ThreadPoolExecutor
 from     urllib.error import URLError
 from     textwrap import dedent
-from     utils.helpers import get_sheet_url_from_user
+from     utils.helpers import get_sheet_url_from_user, is_local_workbook
+import   importlib.util
 import   pandas as pd
+import   requests
+import   io
+import   os
 import   sys
 
 template_sheet_url = AppConfig.template_sheet_url
+
+# Column schema of each worksheet. Cells that are empty or equal to one of the null tokens get the default.
+#   type:     'str', 'bool', 'float' or 'int'
+#   dedent:   remove common leading whitespace from multi-line text
+#   newlines: keep line breaks (False joins the lines, e.g. comma separated tool lists)
+#   nulls:    extra values that mean "not set", e.g. 0 for a context size
+#   required: rows without a value are dropped
+#   optional: the column may be missing from the sheet, e.g. one added after the template
+Column = namedtuple('Column', ['type', 'default', 'dedent', 'newlines', 'nulls', 'required', 'optional'],
+                    defaults=['str', None, False, True, (), False, False])
+
+null_tokens  = ('', 'None', 'none', 'nan', 'NaN', 'null')
+true_tokens  = ('true', 't', 'yes', 'y', '1', '1.0')
+false_tokens = ('false', 'f', 'no', 'n', '0', '0.0')
+
+column_schema = {
+    'Agents': {
+        'Agent Role':             Column('str', dedent=True, required=True),
+        'Goal':                   Column('str', dedent=True),
+        'Backstory':              Column('str', dedent=True),
+        'Tools':                  Column('str', dedent=True, newlines=False),
+        'Allow delegation':       Column('bool', False),
+        'Verbose':                Column('bool', True),
+        'Memory':                 Column('bool', True),
+        'Max_iter':               Column('int', 15),
+        'Model Name':             Column('str', dedent=True),
+        'Temperature':            Column('float', 0.8),
+        'Function Calling Model': Column('str', dedent=True),
+    },
+    'Tasks': {
+        'Task Name':              Column('str'),
+        'Agent':                  Column('str'),
+        'Instructions':           Column('str'),
+        'Expected Output':        Column('str'),
+    },
+    'Crew': {
+        'Team Name':              Column('str', dedent=True),
+        'Assignment':             Column('str', dedent=True),
+        'Verbose':                Column('bool', True),
+        'Process':                Column('str', dedent=True),
+        'Memory':                 Column('bool', False),
+        'Embedding model':        Column('str', dedent=True),
+        'Manager LLM':            Column('str', dedent=True),
+        't':                      Column('float'),
+        'num_ctx':                Column('int', nulls=(0,)),
+    },
+    'Models': {
+        'Model':                  Column('str'),
+        'Context size (local only)': Column('int', nulls=(0,)),
+        'Provider':               Column('str'),
+        'base_url':               Column('str'),
+        'Deployment':             Column('str'),
+        'RPM':                    Column('float', nulls=(0,), optional=True),   # Client side limits, see utils/llm_limits.py
+        'TPM':                    Column('float', nulls=(0,), optional=True),
+        'Max concurrent':         Column('int', nulls=(0,), optional=True),
+    },
+    'Tools': {
+        'Tool':                   Column('str'),
+        'On':                     Column('bool', False),
+        'Class':                  Column('str'),
+        'Args':                   Column('str'),
+        'Model':                  Column('str'),
+        'Embedding Model':        Column('str'),
+    },
+}
+
+# Define the worksheets and their respective columns to be read
+worksheets = {worksheet: list(columns) for worksheet, columns in column_schema.items()}
+
+
+class SheetSchemaError(ValueError):
+    """Cells that don't match the column schema, reported with their worksheet, row and column."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("Some cells don't have the expected type:\n" + "\n".join(f"- {error}" for error in errors))
+
+    @staticmethod
+    def raise_combined(exceptions):
+        """Raises all schema errors of several worksheets at once, or the first other exception."""
+        for exception in exceptions:
+            if not isinstance(exception, SheetSchemaError):
+                raise exception
+        if exceptions:
+            raise SheetSchemaError([error for exception in exceptions for error in exception.errors])
+
+
+def _dedent(values):
+    """Dedents only the cells that can change, the rest of the column is left as is."""
+    mask = values.str.contains('\n', regex=False) | values.str.match(r'[ \t]')
+    if mask.any():
+        values = values.copy()
+        values[mask] = values[mask].map(dedent)
+    return values
+
+
+def _coerce_column(worksheet, column, schema, series, errors):
+    """Converts one column according to its schema in a single vectorised pass. Returns an object column."""
+    text = series.astype(str).str.strip()
+    null = series.isna().to_numpy() | text.isin(null_tokens).to_numpy()
+
+    if schema.type == 'str':
+        values = series.astype(str)
+        if schema.dedent:
+            values = _dedent(values)
+        if not schema.newlines:
+            values = values.str.replace('\n', '', regex=False)
+        valid = ~null
+    elif schema.type == 'bool':
+        lowered = text.str.lower()
+        values = pd.Series(lowered.isin(true_tokens).to_numpy(), index=series.index, dtype=object)
+        valid = lowered.isin(true_tokens).to_numpy() | lowered.isin(false_tokens).to_numpy()
+    else:
+        numeric = pd.to_numeric(series.where(~null), errors='coerce')
+        valid = numeric.notna().to_numpy()
+        if schema.type == 'int':
+            valid &= (numeric % 1 == 0).to_numpy()
+            values = numeric.where(valid).astype('Int64').astype(object)
+        else:
+            values = numeric.astype(object)
+        null |= numeric.isin(schema.nulls).to_numpy()
+
+    for index in series.index[~null & ~valid]:
+        errors.append(f"{worksheet}, row {index + 2}, column '{column}': '{series[index]}' is not of type {schema.type}.")
+
+    return values.where(valid & ~null, schema.default).astype(object)
+
 class Sheets:
     @staticmethod
-    def read_google_sheet(sheet_url):
+    def sanitize_worksheet(worksheet, data, columns):
+        """
+        Converts the columns of one worksheet according to column_schema, one vectorised pass per column.
+        Raises SheetSchemaError listing every cell that doesn't match, not just the first one.
+        """
+        schema = column_schema[worksheet]
+        errors = []
+        missing = [column for column in columns if column not in data.columns]
+        if any(not schema[column].optional for column in missing):
+            raise ValueError(f"Worksheet '{worksheet}' is missing the columns "
+                             f"{[column for column in missing if not schema[column].optional]}.")
+        data = data.reindex(columns=columns)                            # Optional columns not in the sheet are empty
+        data = data.dropna(how='all')                                   # Empty rows at the end of the sheet
+        required = [column for column in columns if schema[column].required]
+        if required:
+            data = data.dropna(subset=required)
+        data = pd.DataFrame({column: _coerce_column(worksheet, column, schema[column], data[column], errors)
+                             for column in columns}, index=data.index)
+        if errors:
+            raise SheetSchemaError(errors)
+        if required:
+            data = data[data[required].notna().all(axis=1)]            # Cells holding a null token
+        return data.reset_index(drop=True)
+
+    @staticmethod
+    def new_session():
+        """HTTP session whose connection pool is large enough to download all worksheets at once."""
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=len(worksheets))
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    @staticmethod
+    def fetch_worksheet(session, base_url, worksheet, columns, cache=None):
+        """Downloads the CSV export of one worksheet, or takes it from the cache, and parses it. Runs in a worker thread."""
+        url = f'{base_url}/gviz/tq?tqx=out:csv&sheet={worksheet}'
+        if cache is not None:
+            content = cache.fetch(session, url, base_url, worksheet)
+        else:
+            try:
+                response = session.get(url, timeout=SheetsConfig.request_timeout)
+                response.raise_for_status()
+            except requests.RequestException as e:
+                raise URLError(e)                                       # parse_table asks for another URL
+            content = response.content
+        # Read the worksheet into a DataFrame, selecting only the specified columns
+        data = pd.read_csv(io.BytesIO(content), usecols=lambda column: column in columns)
+        return Sheets.sanitize_worksheet(worksheet, data, columns)
+
+    @staticmethod
+    def read_google_sheet(sheet_url, session=None, cache=None):
+        """
+        Downloads all worksheets concurrently over one connection pool. Each worksheet is parsed as soon as
+        it arrives, so the load takes about as long as the slowest worksheet. With a SheetCache, unchanged
+        worksheets are read from disk.
+        """
         # Extract the base URL from the provided Google Sheet URL
         base_url = sheet_url.split('/edit')[0]
-        dataframes = []
-        # Define the worksheets and their respective columns to be read
-        worksheets = {
-            'Agents': ['Agent Role', 'Goal', 'Backstory', 'Tools', 'Allow delegation', 'Verbose', 'Memory', 'Max_iter','Model Name', 'Temperature', 'Function Calling Model'],
-            'Tasks' : ['Task Name', 'Agent', 'Instructions', 'Expected Output'],
-            'Crew'  : ['Team Name',	'Assignment','Verbose', 'Process', 'Memory', 'Embedding model', 'Manager LLM', 't', 'num_ctx'],
-            'Models': ['Model', 'Context size (local only)', 'Provider', 'base_url','Deployment'],
-            'Tools' : ['Tool', 'On', 'Class', 'Args',  'Model', 'Embedding Model']
-        }
-        
-        for worksheet, columns in worksheets.items():
-            url = f'{base_url}/gviz/tq?tqx=out:csv&sheet={worksheet}'
-            # Read the worksheet into a DataFrame, selecting only the specified columns
-            try:
-                data = pd.read_csv(url, usecols=columns)
-                if worksheet == 'Agents': # sanitize the data
-                    data.dropna(subset=['Agent Role'], inplace=True)
-
-                    for col in ['Agent Role', 'Goal','Backstory', 'Tools', 'Model Name', 'Function Calling Model']:
-                        data[col] = data[col].astype(str).apply(dedent).replace('None', None)
-
-                    for col in ['Tools']:
-                        data[col] = data[col].replace('\n','')
-                    for col in ['Allow delegation', 'Verbose', 'Memory']:
-                        data[col] = data[col].astype(bool)
-                    
-                    data['Temperature'] = data['Temperature'].astype(float)
-                    data['Max_iter'] = data['Max_iter'].astype(int)
-
-                if worksheet == 'Models':
-                    data['Context size (local only)'] = data['Context size (local only)'].replace(0, None)
-                    data['base_url'] = data['base_url'].replace("None", None)
-                    data['Deployment'] = data['Deployment'].replace("None", None)
-                if worksheet == 'Tasks':
-                    #check if all columns are present are string. If not, print error and exit
-                    for col in columns:
-                        #convert all columns to string
-                        data[col] = data[col].astype(str)
-                        if data[col].dtype != 'object':
-                            raise ValueError(f"Column '{col}' is not of type 'Plain Text'.")                  
-                if worksheet == "Crew":
-                    for col in ['Team Name', 'Assignment', 'Process', 'Embedding model', 'Manager LLM']:                    
-                        data[col] = data[col].astype(str).apply(dedent).replace('None', None).replace('nan', None)
-                    for col in ['Verbose', 'Memory']:
-                        data[col] = data[col].astype(bool)
-                    data['t'] = data['t'].astype(float)
-                    data['num_ctx'] = data['num_ctx'].astype(int).replace(0, None)
-                if worksheet == 'Tools':
-                    data.replace('None', None, inplace=True)
-            except Exception as e:
-                return e
+        own_session = session is None
+        if own_session:
+            session = Sheets.new_session()
+
+        try:
+            with ThreadPoolExecutor(max_workers=len(worksheets), thread_name_prefix="sheets") as executor:
+                futures = [executor.submit(Sheets.fetch_worksheet, session, base_url, worksheet, columns, cache)
+                           for worksheet, columns in worksheets.items()]
+                exceptions = [future.exception() for future in futures]
+                SheetSchemaError.raise_combined([exception for exception in exceptions if exception is not None])
+                return [future.result() for future in futures]         # In worksheet order
+        except Exception as e:
+            return e
+        finally:
+            if own_session:
+                session.close()
     
-            data = data.where(pd.notnull(data), None) # Replace NaN values with None
+    @staticmethod
+    def excel_engine(path):
+        """Fastest available reader for a workbook. calamine streams both .xlsx and .ods."""
+        if importlib.util.find_spec('python_calamine') is not None:
+            return 'calamine'
+        return 'odf' if path.lower().endswith('.ods') else 'openpyxl'  # pandas opens openpyxl workbooks read-only
+
+    @staticmethod
+    def read_workbook(path):
+        """
+        Reads the worksheets from a local .xlsx/.ods workbook, opened once for all tabs, or from a directory
+        with one '<Worksheet>.csv' file per tab.
+        """
+        path = os.path.expanduser(path)
+        try:
+            if os.path.isdir(path):
+                frames = {worksheet: pd.read_csv(os.path.join(path, f'{worksheet}.csv'),
+                                                 usecols=lambda column, columns=columns: column in columns)
+                          for worksheet, columns in worksheets.items()}
+            else:
+                frames = pd.read_excel(path, sheet_name=list(worksheets), engine=Sheets.excel_engine(path))
+                for worksheet, columns in worksheets.items():
+                    frames[worksheet] = frames[worksheet][[col for col in columns if col in frames[worksheet].columns]].copy()
 
-            # Append the DataFrame to the list of dataframes
-            dataframes.append(data)
+            dataframes, exceptions = [], []
+            for worksheet, columns in worksheets.items():
+                try:
+                    dataframes.append(Sheets.sanitize_worksheet(worksheet, frames[worksheet], columns))
+                except SheetSchemaError as e:
+                    exceptions.append(e)
+            SheetSchemaError.raise_combined(exceptions)
+            return dataframes
+        except FileNotFoundError as e:
+            return URLError(e)                                          # parse_table asks for another location
+        except Exception as e:
+            return e
 
-        return dataframes
-    
     @staticmethod
-    def parse_table(url=template_sheet_url):
+    def parse_table(url=template_sheet_url, cache=None):
         num_att = 0
         while num_att < 10:
             try:
-                dataframes = Sheets.read_google_sheet(url)
+                if is_local_workbook(url):
+                    dataframes = Sheets.read_workbook(url)
+                else:
+                    dataframes = Sheets.read_google_sheet(url, cache=cache)
                 if isinstance(dataframes, Exception):
                     raise dataframes
                 break
@@ -0,0 +1,175 @@
+import   logging
+logger = logging.getLogger(__name__)
+import   importlib.abc
+import   json
+import   os
+import   sys
+import   threading
+import   time
+from     contextlib import contextmanager
+
+# Stdlib only: this module is imported before anything heavy so that it can time those imports.
+
+
+def _rss_bytes():
+    """Current resident set size of the process in bytes, or None if it can't be determined."""
+    try:
+        with open('/proc/self/statm', 'r') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss    # Peak, not current, on platforms without /proc
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, ValueError):
+        return None
+
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    """Meta path finder that delegates to the other finders and times the execution of every module it finds."""
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+
+        loader = spec.loader
+        if loader is None or isinstance(loader, type):                  # Namespace packages, builtin and frozen modules
+            return spec
+        try:
+            if 'exec_module' not in vars(loader):                       # Loaders can be shared between modules, wrap once
+                loader.exec_module = self._timed(loader.exec_module)
+        except (TypeError, AttributeError):
+            pass                                                        # Loader with __slots__, leave it untimed
+        return spec
+
+    def _timed(self, exec_module):
+        def timed_exec_module(module):
+            self.profiler._time_import(module.__name__, exec_module, module)
+        return timed_exec_module
+
+
+class StartupProfiler:
+    """
+    Records wall time and resident memory of the startup phases and the cumulative time spent importing
+    each module. Disabled by default, phase() is then a no-op.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.started = None
+        self.phases = []                                                # Dicts in the order the phases were entered
+        self.imports = {}                                               # module -> [cumulative seconds, self seconds]
+        self._local = threading.local()                                # Phase depth and import stack per thread
+
+    def enable(self):
+        """Starts recording phases and installs the import timer."""
+        if self.enabled:
+            return
+        self.enabled = True
+        self.started = time.perf_counter()
+        sys.meta_path.insert(0, _ImportTimer(self))
+
+    def _stack(self):
+        if not hasattr(self._local, 'import_stack'):
+            self._local.import_stack = []
+        return self._local.import_stack
+
+    def _time_import(self, name, exec_module, module):
+        import_stack = self._stack()
+        import_stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = import_stack.pop()
+            if import_stack:
+                import_stack[-1] += elapsed
+            self.imports[name] = [elapsed, elapsed - children]
+
+    @contextmanager
+    def phase(self, name):
+        """Records wall time and memory of the enclosed block as a phase."""
+        if not self.enabled:
+            yield
+            return
+        depth = getattr(self._local, 'depth', 0)
+        record = {'phase': name, 'depth': depth, 'start': time.perf_counter() - self.started,
+                  'thread': threading.current_thread().name, 'rss_before': _rss_bytes()}
+        self.phases.append(record)
+        self._local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            record['seconds'] = time.perf_counter() - start
+            record['rss_after'] = _rss_bytes()
+
+    def report(self, top=25):
+        """Returns the recorded phases and the heaviest imports as a JSON serialisable dict."""
+        heaviest = sorted(self.imports.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        return {
+            'total_seconds':         time.perf_counter() - self.started if self.started else 0.0,
+            'import_self_seconds':   sum(self_seconds for _, self_seconds in self.imports.values()),
+            'modules_imported':      len(self.imports),
+            'phases':                self.phases,
+            'heaviest_imports':      [{'module': name, 'cumulative_seconds': cumulative, 'self_seconds': self_seconds}
+                                      for name, (cumulative, self_seconds) in heaviest],
+        }
+
+    def finish(self, json_path=None, console=None):
+        """Writes the JSON report and prints it as Rich tables. Does nothing unless the profiler is enabled."""
+        if not self.enabled:
+            return
+        report = self.report()
+        if json_path:
+            try:
+                with open(json_path, 'w', encoding='utf-8') as report_file:
+                    json.dump(report, report_file, indent=2)
+            except OSError as e:
+                logger.error(f"Failed to write startup profile to {json_path}: {e}")
+
+        from rich.console import Console
+        from rich.table import Table
+        console = console or Console()
+        mb = lambda value: f"{value / 2**20:,.1f}" if value is not None else "-"
+
+        phases_table = Table(title="Startup phases", show_header=True, header_style="bold magenta")
+        for column in ("Phase", "Start (s)", "Wall time (s)", "RSS after (MB)", "RSS delta (MB)"):
+            phases_table.add_column(column, justify="left" if column == "Phase" else "right")
+        for record in self.phases:
+            seconds = record.get('seconds')
+            delta = record['rss_after'] - record['rss_before'] \
+                if record.get('rss_after') is not None and record['rss_before'] is not None else None
+            thread = f" [{record['thread']}]" if record['thread'] != threading.main_thread().name else ""
+            phases_table.add_row("  " * record['depth'] + record['phase'] + thread, f"{record['start']:.3f}",
+                                 f"{seconds:.3f}" if seconds is not None else "running",
+                                 mb(record.get('rss_after')), mb(delta))
+
+        imports_table = Table(title=f"Heaviest imports ({report['modules_imported']} modules, "
+                                    f"{report['import_self_seconds']:.2f}s in total)",
+                              show_header=True, header_style="bold magenta")
+        imports_table.add_column("Module")
+        imports_table.add_column("Cumulative (s)", justify="right")
+        imports_table.add_column("Self (s)", justify="right")
+        for entry in report['heaviest_imports']:
+            imports_table.add_row(entry['module'], f"{entry['cumulative_seconds']:.3f}", f"{entry['self_seconds']:.3f}")
+
+        console.print(phases_table)
+        console.print(imports_table)
+        if json_path:
+            console.print(f"Startup profile written to {json_path}")
+
+
+profiler = StartupProfiler()                                            # Process wide, enabled by --profile-startup
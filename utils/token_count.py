@@ -0,0 +1,105 @@
+import   logging
+logger = logging.getLogger(__name__)
+from     collections import OrderedDict
+import   functools
+import   re
+import   threading
+
+# Token estimates for throttling. crewai sends an agent's scratchpad inside one prompt message that grows by
+# a Thought/Action/Observation every step, so texts are split into chunks at paragraph breaks and at those
+# markers and the counts are memoised per chunk: a step only encodes its new tail, the rest are cache hits.
+
+estimator_modes = ("tiktoken", "approximate")
+chunk_boundary  = re.compile(r"\n\n+|\n(?=(?:Thought|Action|Action Input|Observation|Final Answer):)")
+
+
+def chunks(text):
+    """Splits a text after its paragraph breaks and before its scratchpad markers. The chunks join to the text."""
+    start = 0
+    for match in chunk_boundary.finditer(text):
+        yield text[start:match.end()]
+        start = match.end()
+    if start < len(text):
+        yield text[start:]
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(name="cl100k_base"):
+    """The tiktoken encoding, loaded once per process. None if tiktoken or the encoding is not available."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(name)
+    except Exception as e:                                              # e.g. the encoding can't be downloaded
+        logger.warning(f"Failed to load the tiktoken encoding '{name}', estimating tokens from text length: {e}")
+        return None
+
+
+class TokenCounter:
+    """
+    Estimates tokens with a margin, either by encoding with tiktoken or, in approximate mode, from the text
+    length in constant time. Counts are memoised per chunk in a bounded LRU keyed by hash and length, so the
+    texts themselves are not kept alive. Tokens spanning a chunk boundary make the sum a slight overestimate.
+    """
+
+    def __init__(self, mode="tiktoken", encoding_name="cl100k_base", chars_per_token=4.0, margin=None, maxsize=4096):
+        if mode not in estimator_modes:
+            raise ValueError(f"Unknown token estimator '{mode}'. Use one of: {', '.join(estimator_modes)}.")
+        self.encoding = get_encoding(encoding_name) if mode == "tiktoken" else None
+        self.mode = "tiktoken" if self.encoding is not None else "approximate"
+        self.chars_per_token = chars_per_token
+        self.margin = margin if margin is not None else (1.1 if self.mode == "tiktoken" else 1.25)
+        self.maxsize = maxsize
+        self.cache = OrderedDict()                                      # (hash, len) -> tokens
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def _count(self, text):
+        if self.mode == "tiktoken":
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return len(text) / self.chars_per_token
+
+    def count_text(self, text):
+        """Estimated tokens of a text, margin included."""
+        return self.count_messages((text,))
+
+    def count_messages(self, messages):
+        """
+        Estimated tokens of a conversation: the sum of its per-chunk counts. Chunks seen before cost a dict
+        lookup, so a step of an agent loop only encodes what it added to the prompt.
+        """
+        texts = [self._text(message) for message in messages]
+        if self.mode == "approximate":                                  # Already constant time per message
+            return sum(self._count(text) for text in texts) * self.margin
+        texts = [chunk for text in texts for chunk in chunks(text)]
+        total, missing = 0, []
+        with self.lock:
+            for text in texts:
+                key = (hash(text), len(text))                           # str caches its hash
+                tokens = self.cache.get(key)
+                if tokens is None:
+                    missing.append((key, text))
+                else:
+                    self.cache.move_to_end(key)
+                    total += tokens
+            self.hits += len(texts) - len(missing)
+        if missing:
+            counted = [(key, self._count(text)) for key, text in missing]   # Encode outside the lock
+            with self.lock:
+                self.misses += len(counted)
+                for key, tokens in counted:
+                    self.cache[key] = tokens
+                    total += tokens
+                while len(self.cache) > self.maxsize:
+                    self.cache.popitem(last=False)
+        return total * self.margin
+
+    @staticmethod
+    def _text(message):
+        text = getattr(message, 'content', message)
+        return text if isinstance(text, str) else str(text or "")
+
+
+@functools.lru_cache(maxsize=None)
+def get_token_counter(mode="tiktoken"):
+    """The process wide counter of a mode, so every LLM shares one cache."""
+    return TokenCounter(mode=mode)
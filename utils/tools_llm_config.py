@@ -1,36 +1,35 @@
 import os
 import logging
-import pandas as pd
 from utils.helpers import load_env
 logger = logging.getLogger(__name__)
 #load_env("../../ENV/.env", ["OPENAI_API_KEY",])
 
 #Class to manage the configuration of the LLM to Tools
 class ConfigurationManager:
-    def __init__(self, models_df):
-        self.df = models_df
-
-    def select(self, target_column, where_column, equals):
-        try:
-            result = self.df.loc[self.df[where_column] == equals, target_column].iloc[0]
-            return result if not pd.isna(result) else None
-        except IndexError:
-            logger.info(f"No match found for {equals} in {where_column}")
+    def __init__(self, spec):
+        self.spec = spec                                                # CrewSpec, models are looked up in its index
+
+    def select(self, field, model):
+        """Returns a field of the Models row of a model, or None."""
+        record = self.spec.get_model(model)
+        if record is None:
+            logger.info(f"No match found for {model} in Models")
             return None
+        return getattr(record, field)
 
     def get_model_details(self, model=None, embedding_model=None):
         # Default settings for OpenAI if specific model details are not provided
         
         details = {
             'model'                     : model if model else 'gpt-4-turbo-preview',
-            'provider'                  : self.select('Provider', 'Model', model) if model else None,
-            'deployment_name'           : self.select('Deployment', 'Model', model) if model else None,
-            'base_url'                  : self.select('base_url', 'Model', model) if model else None,
+            'provider'                  : self.select('provider', model) if model else None,
+            'deployment_name'           : self.select('deployment', model) if model else None,
+            'base_url'                  : self.select('base_url', model) if model else None,
             'api_key'                   : "NA",
             'embedding_model'           : embedding_model if embedding_model else 'text-embedding-3-small',
-            'provider_embedding'        : self.select('Provider', 'Model', embedding_model) if embedding_model else None,
-            'deployment_name_embedding' : self.select('Deployment', 'Model', embedding_model) if embedding_model else None,
-            'base_url_embedding'        : self.select('base_url', 'Model', embedding_model) if embedding_model else None,
+            'provider_embedding'        : self.select('provider', embedding_model) if embedding_model else None,
+            'deployment_name_embedding' : self.select('deployment', embedding_model) if embedding_model else None,
+            'base_url_embedding'        : self.select('base_url', embedding_model) if embedding_model else None,
             'api_key_embedding'         : "NA"
         }
         return details
@@ -61,11 +60,11 @@ class ConfigurationManager:
         }
         return config
 
-def get_config(model=None, embedding_model=None, models_df=None):
+def get_config(model=None, embedding_model=None, spec=None):
     if not model and not embedding_model:
         return None
     
-    config_manager = ConfigurationManager(models_df)
+    config_manager = ConfigurationManager(spec)
     config = config_manager.build_config(model=model, embedding_model=embedding_model)
     
     # Define actions based on provider specific settings.
@@ -83,7 +82,7 @@ def get_config(model=None, embedding_model=None, models_df=None):
         
         #Provider specific settings:
         #Additional API key handling based on provider specifications
-        if provider is None or pd.isna(provider):
+        if provider is None:
             logger.info(f"No provider found for {component_key}")
             config.pop(component_key)
             continue
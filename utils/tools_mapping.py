@@ -9,81 +9,108 @@ from utils.safe_argment_parser  import parse_arguments
 from utils.tools_llm_config     import get_config
 
 
+import threading
 import os
 import re
 
 
 
 class ToolsMapping:
-    def __init__(self, tools_df, models_df):
+    @staticmethod
+    def tool_fingerprint(tool_record, spec):
+        """Identifies a tool instance: its Tools row and the Models rows its config is built from."""
+        return (tool_record.fingerprint(), spec.model_fingerprint(tool_record.model),
+                spec.model_fingerprint(tool_record.embedding_model))
+
+    def __init__(self, spec, cache=None):
         self.tool_registry = CallableRegistry()     ## Registry of all callables from all modules defined in tools_config.py... 
                                                     ## CallableRegistry itaretes through all allowed tool modules and registers all callables... 
-                                                    ##...so that we can add tools by configuation in the tools_df
-        self.tools = {}
-        self.load_tools(tools_df, models_df)
-    
-    def load_tools(self, tools_df, models_df):
-        """ Load tools from a DataFrame, considering only enabled tools. """
-        for idx, row in tools_df.iterrows():
-            if not row['On']:
-                continue
-
-            tool_name, class_or_func_details = row['Tool'], row['Class']
-            if class_or_func_details is None:
-                logger.warning(f"No class or function found for tool '{tool_name}'. Tool not created.")
-                continue
-
-            # Extract the base function or class name and any indices or arguments
-            base_name = re.sub(r"\(.*$", "", class_or_func_details).strip()
-            arguments = re.search(r"\((.*)\)", class_or_func_details)
-            index_match = re.search(r"\)\[(\d+)\]", class_or_func_details)
-            # Get the callable from the registry
-            logger.info(f"Loading tool '{tool_name}' with base name '{base_name}' and arguments '{arguments.group(1) if arguments else ''}'.")
-            class_or_func = self.tool_registry.get_callable(base_name)
-            if class_or_func is None:
-                logger.warning(f"No callable found for '{base_name}'. Tool '{tool_name}' not created.")
-                continue
-
-            if isinstance(class_or_func, list) and index_match:
-                index = int(index_match.group(1))
-                class_or_func = class_or_func[index]
-
-            args, kwargs = parse_arguments(arguments.group(1) if arguments else '')
-            if callable(class_or_func):
-                    if row['Model'] is not None or row['Embedding Model'] is not None:
-                        model = row['Model']
-                        embedding_model = row['Embedding Model']
-                        config = get_config(model=model, embedding_model=embedding_model, models_df=models_df)
-                        if config is not None:
-                            kwargs['config'] = config
-                        else:
-                            logger.info(f"'{tool_name}' does not have llm config.")
-                
-                    logger.info(f"Creating tool '{tool_name}' with allable {class_or_func} and arguments '{args}' and keyword arguments '{kwargs}'.")
-                    #look at kwargs if ['congig]['llm'][provider] is "azure_openai" or ['congig]['embedder'][provider] is "azure_openai"  load the enviroment variables
-                    # if 'config' in kwargs:
-                    #     if 'llm' in kwargs['config']:
-                    #         if 'provider' in kwargs['config']['llm']:
-                    #             if kwargs['config']['llm']['provider'] == "azure_openai":
-                    #                 load_env("../../ENV/.env", ["OPENAI_API_KEY","OPENAI_BASE_URL"])
-                    #     if 'embedder' in kwargs['config']:
-                    #         if 'provider' in kwargs['config']['embedder']:
-                    #             if kwargs['config']['embedder']['provider'] == "azure_openai":
-                    #load_env("../../ENV/.env", ["OPENAI_API_KEY","OPENAI_BASE_URL"])
-                    #TODO see if more processing is neede here. There is potentia; to change up env variables for each tool and stay in the
-                        #also print the config
-                    #print(f"ToolsMapping about to add kwargs callable '{tool_name}': {kwargs['config']}")
-                    self.tools[tool_name] = class_or_func(*args, **kwargs)
-            else:
-                logger.error(f"Callable for '{base_name}' is not a function or class constructor.")
-        
-        for tool_name, tool in self.tools.items():
-            if isinstance(tool, list) and tool:
-                self.tools[tool_name] = tool[0]
+                                                    ##...so that we can add tools by configuation in the Tools sheet
+        self.spec = spec
+        self.tools = {}                                                 # Tool name -> instance, filled on first reference
+        self.cache = cache if cache is not None else {}            # tool_fingerprint -> instance, may outlive this mapping
+        self._locks = {}                                                # Tool name -> lock, agents may be built concurrently
+        self._lock = threading.Lock()
+
+    def get_tool(self, tool_name):
+        """ The instance of an enabled tool, created the first time it is referenced and shared afterwards. None if
+        the tool is not enabled or can't be created. """
+        tool_name = tool_name.strip()
+        with self._lock:
+            lock = self._locks.setdefault(tool_name, threading.Lock())
+        with lock:
+            if tool_name not in self.tools:
+                tool_record = self.spec.tools_by_name.get(tool_name)
+                self.tools[tool_name] = self.load_tool(tool_record) if tool_record is not None else None
+            return self.tools[tool_name]
+
+    def load_tool(self, tool_record):
+        """ Creates the tool of a Tools record, or reuses the instance of an unchanged record. """
+        spec = self.spec
+        tool_name, class_or_func_details = tool_record.tool, tool_record.class_spec
+        fingerprint = ToolsMapping.tool_fingerprint(tool_record, spec)
+        if fingerprint in self.cache:                                   # Row and models unchanged, reuse the instance
+            logger.info(f"Reusing tool '{tool_name}'.")
+            return self.cache[fingerprint]
+        if class_or_func_details is None:
+            logger.warning(f"No class or function found for tool '{tool_name}'. Tool not created.")
+            return None
+
+        # Extract the base function or class name and any indices or arguments
+        base_name = re.sub(r"\(.*$", "", class_or_func_details).strip()
+        arguments = re.search(r"\((.*)\)", class_or_func_details)
+        index_match = re.search(r"\)\[(\d+)\]", class_or_func_details)
+        # Get the callable from the registry
+        logger.info(f"Loading tool '{tool_name}' with base name '{base_name}' and arguments '{arguments.group(1) if arguments else ''}'.")
+        class_or_func = self.tool_registry.get_callable(base_name)
+        if class_or_func is None:
+            logger.warning(f"No callable found for '{base_name}'. Tool '{tool_name}' not created.")
+            return None
+
+        if isinstance(class_or_func, list) and index_match:
+            index = int(index_match.group(1))
+            class_or_func = class_or_func[index]
+
+        args, kwargs = parse_arguments(arguments.group(1) if arguments else '')
+        if callable(class_or_func):
+                if tool_record.model is not None or tool_record.embedding_model is not None:
+                    model = tool_record.model
+                    embedding_model = tool_record.embedding_model
+                    config = get_config(model=model, embedding_model=embedding_model, spec=spec)
+                    if config is not None:
+                        kwargs['config'] = config
+                    else:
+                        logger.info(f"'{tool_name}' does not have llm config.")
+            
+                logger.info(f"Creating tool '{tool_name}' with allable {class_or_func} and arguments '{args}' and keyword arguments '{kwargs}'.")
+                #look at kwargs if ['congig]['llm'][provider] is "azure_openai" or ['congig]['embedder'][provider] is "azure_openai"  load the enviroment variables
+                # if 'config' in kwargs:
+                #     if 'llm' in kwargs['config']:
+                #         if 'provider' in kwargs['config']['llm']:
+                #             if kwargs['config']['llm']['provider'] == "azure_openai":
+                #                 load_env("../../ENV/.env", ["OPENAI_API_KEY","OPENAI_BASE_URL"])
+                #     if 'embedder' in kwargs['config']:
+                #         if 'provider' in kwargs['config']['embedder']:
+                #             if kwargs['config']['embedder']['provider'] == "azure_openai":
+                #load_env("../../ENV/.env", ["OPENAI_API_KEY","OPENAI_BASE_URL"])
+                #TODO see if more processing is neede here. There is potentia; to change up env variables for each tool and stay in the
+                    #also print the config
+                #print(f"ToolsMapping about to add kwargs callable '{tool_name}': {kwargs['config']}")
+                tool = class_or_func(*args, **kwargs)
+                if isinstance(tool, list) and tool:
+                    tool = tool[0]
+                self.cache[fingerprint] = tool
+                return tool
+        else:
+            logger.error(f"Callable for '{base_name}' is not a function or class constructor.")
+            return None
+
 
     def get_tools(self):
-        """ Retrieve the dictionary of all tools. """
-        return self.tools
+        """ Retrieve the dictionary of all enabled tools, creating the ones not referenced yet. """
+        for tool_name in self.spec.tools_by_name:
+            self.get_tool(tool_name)
+        return {tool_name: tool for tool_name, tool in self.tools.items() if tool is not None}
 
 # TODO
 #   def tool_wrapper(tool_func, max_output_size):